@@ -58,6 +58,8 @@ INSTALLED_APPS = [
     'users',
     'notifications',
     'core',
+    'jobs',
+    'uploads',
 ]
 
 SITE_ID = 1
@@ -113,6 +115,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {
+            # File-backed so tests can exercise concurrent connections.
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -169,8 +175,55 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # core.renderers.JSONRenderer encodes with orjson when it is installed.
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Items per chunk of a streamed JSON array (core.renderers.JSONArrayRenderer)
+    'JSON_STREAM_CHUNK_SIZE': 500,
+}
+
+# Local memory by default. Set CACHE_BACKEND to
+# django.core.cache.backends.filebased.FileBasedCache and CACHE_LOCATION to a
+# directory to share one cache between server processes.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'protobytes'),
+    }
+}
+
+# Cached anonymous responses of the public complaint endpoints (see core.cache)
+RESPONSE_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+# Background jobs (run them with `python manage.py runworker`)
+JOBS = {
+    'CONCURRENCY': int(os.getenv('JOBS_CONCURRENCY', 4)),
+    'MODE': os.getenv('JOBS_MODE', 'thread'),
+    'LEASE_SECONDS': 300,
+    'MAX_ATTEMPTS': 5,
 }
 
+# Live notifications (/api/notifications/stream/). DatabaseBroker works across
+# processes; InProcessBroker only when notifications are created in the server itself.
+NOTIFICATIONS_BROKER = 'notifications.broker.DatabaseBroker'
+
+# Chunked, resumable image uploads (/api/uploads/)
+UPLOADS = {
+    'MAX_SIZE': 20 * 1024 * 1024,
+    'MAX_CHUNK_SIZE': 5 * 1024 * 1024,
+    'PARTIAL_DIR': BASE_DIR / 'upload_parts',
+    'PROCESSES': int(os.getenv('UPLOADS_PROCESSES', 2)),
+}
+
+# Full-text search for complaints. SQLiteSearchBackend needs the FTS5 table
+# created by the complaints migrations; DatabaseSearchBackend works anywhere.
+COMPLAINTS_SEARCH_BACKEND = 'complaints.search.SQLiteSearchBackend'
+
 # JWT settings
 from datetime import timedelta
 SIMPLE_JWT = {
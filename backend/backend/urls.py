@@ -25,6 +25,8 @@ urlpatterns = [
     path('api/', include('complaints.urls')),
     path('api/', include('users.urls')),
     path('api/', include('notifications.urls')),
+    path('api/', include('uploads.urls')),
+    path('api/', include('core.urls')),
 ]
 
 # Serve media files in development
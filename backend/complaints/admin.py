@@ -1,5 +1,7 @@
 from django.contrib import admin
+from django.db.models import Q
 from .models import Complaint, ComplaintImage, Department, AdminProfile
+from .search import filter_matches
 
 
 class ComplaintImageInline(admin.TabularInline):
@@ -38,6 +40,15 @@ class ComplaintAdmin(admin.ModelAdmin):
         """Optimize queryset for admin list view"""
         return super().get_queryset(request).select_related('assigned_department', 'assigned_to')
 
+    def get_search_results(self, request, queryset, search_term):
+        """Search the full-text index instead of scanning every row with icontains."""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        matches = filter_matches(queryset, search_term)
+        exact = queryset.filter(Q(complaint_id=search_term.upper()) | Q(user__username=search_term))
+        return matches | exact, False
+
 
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
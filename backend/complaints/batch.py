@@ -0,0 +1,60 @@
+"""
+Batch ingestion of complaints from other intake channels (call centre, SMS
+gateway, file imports).
+
+ingest_complaints() validates every item and reserves one block of
+complaint IDs for the valid ones. It routes them in one pass and inserts
+them with bulk_create. A single complaints_changed batch then carries
+them to the notification, stats, search and other receivers, which do
+their own writes in bulk.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+
+from .models import Complaint, ComplaintSequence
+from .routing import route_many
+from .serializers import ComplaintBatchItemSerializer
+from .signals import complaints_changed
+
+MAX_ITEMS = 1000
+
+
+def ingest_complaints(items, user=None):
+    """
+    Create complaints from a list of field dicts, on behalf of `user` if
+    given. Invalid items are skipped. Returns one result per item, in
+    order: {"index", "id", "complaint_id"} or {"index", "errors"}.
+    """
+    results = [None] * len(items)
+    valid = []
+    # One serializer for every item, so its fields are only built once.
+    serializer = ComplaintBatchItemSerializer()
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, serializer.run_validation(item)))
+        except ValidationError as error:
+            results[index] = {'index': index, 'errors': as_serializer_error(error)}
+    if not valid:
+        return results
+
+    with transaction.atomic():
+        year = timezone.now().year
+        numbers = ComplaintSequence.reserve(year, len(valid))
+        assignments = route_many([data['category'] for _, data in valid])
+        complaints = []
+        for (_, data), number, assignment in zip(valid, numbers, assignments):
+            complaint = Complaint(
+                user=user, complaint_id=Complaint.format_complaint_id(year, number), **data, **assignment,
+            )
+            complaint.update_geohash()
+            complaints.append(complaint)
+        Complaint.objects.bulk_create(complaints, batch_size=500)
+        for complaint in complaints:
+            complaint._loaded_values = complaint._get_tracked_values()
+        complaints_changed.send(sender=Complaint, changes=[(c, {}) for c in complaints], created=True)
+
+    for (index, _), complaint in zip(valid, complaints):
+        results[index] = {'index': index, 'id': complaint.pk, 'complaint_id': complaint.complaint_id}
+    return results
@@ -0,0 +1,147 @@
+"""
+Reference counting and garbage collection for stored complaint photos.
+
+Complaint.image and ComplaintImage.image hold content-addressed names (see
+complaints.storage), and many rows can share one file. complaints.signals
+calls retain() and release() as those rows come and go. Files are never
+deleted inline, because an upload of the same bytes may be about to
+reference the file again. Chunked uploads that are ready but not yet
+claimed by a complaint also keep their file (see is_referenced()).
+collect_garbage() deletes files later, once they have been unreferenced
+for a grace period.
+"""
+import os
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .images import variant_dir
+from .models import Complaint, ComplaintImage, MediaBlob
+from .storage import image_storage, is_content_addressed
+
+IMAGE_DIR = 'complaint_images'
+
+
+def retain(names):
+    """Count one more reference to each stored file name."""
+    now = timezone.now()
+    for name in filter(None, names):
+        with transaction.atomic():
+            if MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1, updated_at=now):
+                continue
+            try:
+                with transaction.atomic():
+                    MediaBlob.objects.create(name=name, refcount=1)
+            except IntegrityError:
+                MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1, updated_at=now)
+
+
+def release(names):
+    """Count one reference fewer to each stored file name."""
+    now = timezone.now()
+    for name in filter(None, names):
+        MediaBlob.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1, updated_at=now)
+
+
+def is_referenced(name):
+    # Finished chunked uploads point at their file until a complaint claims
+    # them (the complaint then counts) or they expire.
+    from uploads.models import Upload
+
+    return (
+        Complaint.objects.filter(image=name).exists()
+        or ComplaintImage.objects.filter(image=name).exists()
+        or Upload.objects.filter(file=name, complaint__isnull=True).exists()
+    )
+
+
+def stored_files():
+    """Names of the photo files in storage (variants excluded), with their modification times."""
+    directory = image_storage.path(IMAGE_DIR)
+    if not os.path.isdir(directory):
+        return
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and not entry.name.startswith('.'):
+                yield f'{IMAGE_DIR}/{entry.name}', entry.stat().st_mtime
+
+
+def is_older(name, cutoff):
+    """Whether the stored file `name` was last written or touched before `cutoff`."""
+    try:
+        return os.stat(image_storage.path(name)).st_mtime <= cutoff.timestamp()
+    except FileNotFoundError:
+        return False
+
+
+def delete_file(name):
+    image_storage.delete(name)
+    directory = variant_dir(name)
+    if default_storage.exists(directory):
+        for filename in default_storage.listdir(directory)[1]:
+            default_storage.delete(f'{directory}/{filename}')
+        os.rmdir(default_storage.path(directory))
+
+
+def collect_garbage(grace=timedelta(hours=24), dry_run=False):
+    """
+    Delete photo files (and their variants) that no row has referenced for
+    at least `grace`. Returns the deleted names.
+    """
+    cutoff = timezone.now() - grace
+    live = set(MediaBlob.objects.filter(refcount__gt=0).values_list('name', flat=True))
+    removed = []
+    for name, mtime in stored_files():
+        if name in live or mtime > cutoff.timestamp():
+            continue
+        with transaction.atomic():
+            # Check again with the counter locked: it may have moved, a
+            # dedupe hit may have touched the file since the scan, and files
+            # from before refcounting have no counter at all.
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is not None and (blob.refcount > 0 or blob.updated_at > cutoff):
+                continue
+            if is_referenced(name) or not is_older(name, cutoff):
+                continue
+            if not dry_run:
+                if blob is not None:
+                    blob.delete()
+                delete_file(name)
+        removed.append(name)
+    if not dry_run:
+        # Counters left behind by files that are already gone.
+        for name in MediaBlob.objects.filter(refcount=0, updated_at__lt=cutoff).values_list('name', flat=True):
+            if not image_storage.exists(name):
+                MediaBlob.objects.filter(name=name, refcount=0).delete()
+    return removed
+
+
+def rehash_legacy_files(dry_run=False):
+    """
+    Move photos stored under upload names (from before content addressing)
+    to content-addressed names, so identical copies collapse into one file.
+    The old files become garbage for collect_garbage(). Returns the number
+    of rows updated.
+    """
+    from .tasks import process_image
+
+    updated = 0
+    for Model in (Complaint, ComplaintImage):
+        rows = Model.objects.exclude(image='').exclude(image__isnull=True).values_list('pk', 'image')
+        for pk, name in list(rows):
+            if is_content_addressed(name) or not image_storage.exists(name):
+                continue
+            updated += 1
+            if dry_run:
+                continue
+            with image_storage.open(name, 'rb') as original:
+                new_name = image_storage.save(name, original)
+            with transaction.atomic():
+                Model.objects.filter(pk=pk, image=name).update(image=new_name, variants={})
+                retain([new_name])
+                release([name])
+                process_image.enqueue(model=Model._meta.model_name, id=pk)
+    return updated
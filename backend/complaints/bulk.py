@@ -0,0 +1,58 @@
+"""
+Set-based updates for admin triage.
+
+apply_bulk_change() loads the selected complaints in one query, writes the
+change with one UPDATE per distinct outcome, and sends a single
+complaints_changed batch. Status history, notifications, stats and the
+other derived data are therefore updated in bulk too, rather than once
+per complaint.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Complaint
+from .signals import complaints_changed
+
+MAX_IDS = 5000
+
+
+@transaction.atomic
+def apply_bulk_change(ids, values):
+    """
+    Set `values` (field name -> value, with `_id` names for foreign keys) on
+    the complaints with the given ids. As with the assign endpoint, a
+    Submitted complaint that gets a department or officer becomes Assigned.
+    Returns {id: 'updated' | 'unchanged' | 'not_found'}.
+    """
+    complaints = Complaint.objects.select_for_update().in_bulk(ids)
+    changes = []
+    batches = defaultdict(list)
+    for complaint in complaints.values():
+        new = dict(values)
+        assigning = new.get('assigned_department_id') or new.get('assigned_to_id')
+        if assigning and 'status' not in new and complaint.status == 'Submitted':
+            new['status'] = 'Assigned'
+        changed = {field: getattr(complaint, field) for field, value in new.items() if getattr(complaint, field) != value}
+        if not changed:
+            continue
+        for field in changed:
+            setattr(complaint, field, new[field])
+        batches[tuple(sorted((field, new[field]) for field in changed))].append(complaint.pk)
+        changes.append((complaint, changed))
+
+    now = timezone.now()
+    for assignments, pks in batches.items():
+        Complaint.objects.filter(pk__in=pks).update(**dict(assignments), updated_at=now)
+    for complaint, _ in changes:
+        complaint.updated_at = now
+        complaint._loaded_values = complaint._get_tracked_values()
+    if changes:
+        complaints_changed.send(sender=Complaint, changes=changes, created=False)
+
+    updated = {complaint.pk for complaint, _ in changes}
+    return {
+        pk: 'updated' if pk in updated else 'unchanged' if pk in complaints else 'not_found'
+        for pk in ids
+    }
@@ -0,0 +1,145 @@
+"""
+Precomputed map clusters.
+
+Every located complaint counts towards one ComplaintCluster row per
+clustering precision: the row for its geohash cell, category and status.
+Writes apply the difference a change makes to those rows, so the clusters
+endpoint only reads the handful of cells on screen, however many
+complaints there are.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Substr
+
+from . import geo
+from .models import Complaint, ComplaintCluster
+
+PRECISIONS = range(1, 9)
+CLUSTER_FIELDS = ('category', 'status', 'latitude', 'longitude')
+
+
+def _add(deltas, values, sign):
+    category, status, latitude, longitude = values
+    if latitude is None or longitude is None:
+        return
+    latitude, longitude = float(latitude), float(longitude)
+    geohash = geo.encode(latitude, longitude)
+    for precision in PRECISIONS:
+        delta = deltas[(precision, geohash[:precision], category, status)]
+        delta[0] += sign
+        delta[1] += sign * latitude
+        delta[2] += sign * longitude
+
+
+def collect_deltas(changes, created):
+    """Cluster deltas for a complaints_changed batch."""
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    for complaint, changed in changes:
+        current = tuple(getattr(complaint, field) for field in CLUSTER_FIELDS)
+        if created:
+            _add(deltas, current, 1)
+        elif any(field in changed for field in CLUSTER_FIELDS):
+            previous = tuple(changed.get(field, value) for field, value in zip(CLUSTER_FIELDS, current))
+            _add(deltas, previous, -1)
+            _add(deltas, current, 1)
+    return deltas
+
+
+def removal_deltas(complaint):
+    """Cluster deltas for a deleted complaint, as it was last saved."""
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    saved = {**complaint.__dict__, **getattr(complaint, '_loaded_values', {})}
+    _add(deltas, tuple(saved.get(field) for field in CLUSTER_FIELDS), -1)
+    return deltas
+
+
+def apply_deltas(deltas):
+    """Add the deltas to their cluster rows, creating and dropping rows as needed."""
+    for (precision, cell, category, status), (count, latitude, longitude) in deltas.items():
+        if not (count or latitude or longitude):
+            continue
+        key = {'precision': precision, 'cell': cell, 'category': category, 'status': status}
+        rows = ComplaintCluster.objects.filter(**key)
+        increment = {
+            'count': F('count') + count,
+            'latitude_sum': F('latitude_sum') + latitude,
+            'longitude_sum': F('longitude_sum') + longitude,
+        }
+        with transaction.atomic():
+            if rows.update(**increment):
+                if count < 0:
+                    rows.filter(count__lte=0).delete()
+                continue
+            try:
+                with transaction.atomic():
+                    ComplaintCluster.objects.create(
+                        **key, count=count, latitude_sum=latitude, longitude_sum=longitude
+                    )
+            except IntegrityError:
+                # Another writer created the row first.
+                rows.update(**increment)
+
+
+@transaction.atomic
+def rebuild_clusters():
+    """Recompute every cluster row from the complaints table. Returns the number of rows."""
+    ComplaintCluster.objects.all().delete()
+    located = Complaint.objects.exclude(geohash='')
+    rows = []
+    for precision in PRECISIONS:
+        groups = (
+            located.annotate(cell=Substr('geohash', 1, precision))
+            .values('cell', 'category', 'status')
+            .annotate(total=Count('id'), latitude_total=Sum('latitude'), longitude_total=Sum('longitude'))
+            .order_by()
+        )
+        rows.extend(
+            ComplaintCluster(
+                precision=precision,
+                cell=group['cell'],
+                category=group['category'],
+                status=group['status'],
+                count=group['total'],
+                latitude_sum=float(group['latitude_total']),
+                longitude_sum=float(group['longitude_total']),
+            )
+            for group in groups
+        )
+    ComplaintCluster.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def find_clusters(min_lat, min_lng, max_lat, max_lng, zoom, category=None, status=None):
+    """
+    Return [{cell, latitude, longitude, count}] for the cells at `zoom` whose
+    centroid falls inside the bounding box.
+    """
+    precision = geo.precision_for_zoom(zoom, max_precision=PRECISIONS[-1])
+    rows = ComplaintCluster.objects.filter(
+        geo.cell_ranges(min_lat, min_lng, max_lat, max_lng, field='cell', max_precision=precision),
+        precision=precision,
+        count__gt=0,
+    )
+    if category:
+        rows = rows.filter(category=category)
+    if status:
+        rows = rows.filter(status=status)
+    groups = (
+        rows.values('cell')
+        .annotate(total=Sum('count'), latitude_total=Sum('latitude_sum'), longitude_total=Sum('longitude_sum'))
+        .order_by('cell')
+    )
+    clusters = []
+    for group in groups:
+        latitude = group['latitude_total'] / group['total']
+        longitude = group['longitude_total'] / group['total']
+        if min_lat <= latitude <= max_lat and min_lng <= longitude <= max_lng:
+            clusters.append({
+                'cell': group['cell'],
+                'latitude': round(latitude, 6),
+                'longitude': round(longitude, 6),
+                'count': group['total'],
+            })
+    return clusters
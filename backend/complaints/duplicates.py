@@ -0,0 +1,106 @@
+"""
+Duplicate-complaint detection.
+
+Each complaint stores a MinHash signature of the character shingles in its
+title and description (ComplaintFingerprint). A duplicate check narrows
+the candidates through indexes first: same category, not yet resolved,
+and either within DUPLICATE_RADIUS_M of the new report or, without
+coordinates, among the most recent reports. It then compares the stored
+signatures against the new text. No complaint text is re-read or
+re-hashed at lookup time.
+"""
+import random
+import re
+import struct
+import zlib
+from datetime import timedelta
+
+from django.utils import timezone
+
+from . import geo
+from .models import Complaint, ComplaintFingerprint
+
+SHINGLE_SIZE = 4
+NUM_HASHES = 64
+DUPLICATE_RADIUS_M = 250
+DUPLICATE_THRESHOLD = 0.35
+RECENT_WINDOW = timedelta(days=30)
+MAX_CANDIDATES = 500
+MAX_RESULTS = 5
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+# Fixed seed: stored signatures are only comparable if every process uses the same hash family.
+_rng = random.Random(0x5EED)
+_HASHES = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+_SIGNATURE = struct.Struct(f'<{NUM_HASHES}I')
+
+
+def shingles(text):
+    """Set of overlapping character n-grams of the normalised text."""
+    text = ' '.join(re.findall(r'\w+', text.lower()))
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(title, description):
+    """MinHash signature (a tuple of NUM_HASHES ints) of a complaint's text."""
+    hashed = [zlib.crc32(s.encode()) for s in shingles(f'{title} {description}')]
+    if not hashed:
+        return (_MASK,) * NUM_HASHES
+    return tuple(min((a * h + b) % _PRIME for h in hashed) & _MASK for a, b in _HASHES)
+
+
+def pack(sig):
+    return _SIGNATURE.pack(*sig)
+
+
+def unpack(data):
+    return _SIGNATURE.unpack(bytes(data))
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_HASHES
+
+
+def store_fingerprints(complaints):
+    """Compute and save signatures for the given complaints in one upsert."""
+    rows = [
+        ComplaintFingerprint(complaint_id=c.pk, signature=pack(signature(c.title, c.description)))
+        for c in complaints
+    ]
+    ComplaintFingerprint.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['complaint'], update_fields=['signature'],
+    )
+
+
+def candidate_complaints(category, latitude=None, longitude=None):
+    candidates = Complaint.objects.filter(category=category).exclude(status='Resolved')
+    if latitude is not None and longitude is not None:
+        return geo.filter_near(candidates, float(latitude), float(longitude), DUPLICATE_RADIUS_M)
+    return candidates.filter(created_at__gte=timezone.now() - RECENT_WINDOW).order_by('-created_at')
+
+
+def find_duplicates(title, description, category, latitude=None, longitude=None):
+    """
+    Return up to MAX_RESULTS (complaint, similarity) pairs that look like the
+    same report, most similar first.
+    """
+    candidate_ids = list(
+        candidate_complaints(category, latitude, longitude).values_list('id', flat=True)[:MAX_CANDIDATES]
+    )
+    if not candidate_ids:
+        return []
+    sig = signature(title, description)
+    scores = {}
+    for complaint_id, stored in ComplaintFingerprint.objects.filter(
+        complaint_id__in=candidate_ids
+    ).values_list('complaint_id', 'signature'):
+        score = similarity(sig, unpack(stored))
+        if score >= DUPLICATE_THRESHOLD:
+            scores[complaint_id] = score
+    best = sorted(scores, key=lambda pk: (-scores[pk], -pk))[:MAX_RESULTS]
+    complaints = Complaint.objects.in_bulk(best)
+    return [(complaints[pk], scores[pk]) for pk in best if pk in complaints]
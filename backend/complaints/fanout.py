@@ -0,0 +1,88 @@
+"""
+Notification fan-out for complaint changes.
+
+Works out who should hear about each change (the assigned department's
+officers, the assigned officer and the citizen who filed it) and writes every
+notification row with a single bulk insert.
+"""
+from django.contrib.auth.models import User
+
+from .models import AdminProfile, Department
+
+# Complaint fields whose changes are worth telling people about.
+NOTIFY_FIELDS = ('status', 'assigned_department_id', 'assigned_to_id')
+
+
+def build_complaint_notifications(changes, created):
+    """
+    Build unsaved Notification rows for a batch of complaint changes.
+
+    `changes` is a list of (complaint, changed_fields) pairs as sent with the
+    `complaints_changed` signal. Updates that touch none of the tracked fields
+    produce nothing.
+    """
+    from notifications.models import Notification
+
+    if not created:
+        changes = [(complaint, changed) for complaint, changed in changes if changed]
+    if not changes:
+        return []
+
+    department_ids = {c.assigned_department_id for c, _ in changes if c.assigned_department_id}
+    officers = {}
+    department_names = {}
+    if department_ids:
+        for department_id, user_id in AdminProfile.objects.filter(
+            department_id__in=department_ids
+        ).values_list('department_id', 'user_id'):
+            officers.setdefault(department_id, set()).add(user_id)
+        department_names = dict(
+            Department.objects.filter(id__in=department_ids).values_list('id', 'name')
+        )
+
+    superusers = None
+    notifications = []
+    for complaint, changed in changes:
+        recipients = set(officers.get(complaint.assigned_department_id, ()))
+        if complaint.assigned_to_id:
+            recipients.add(complaint.assigned_to_id)
+
+        if created:
+            kind = 'new_complaint'
+            message = f"New complaint submitted: {complaint.title} ({complaint.complaint_id})"
+            if not recipients:
+                # Nobody owns it yet, so it goes to the triage admins.
+                if superusers is None:
+                    superusers = set(User.objects.filter(is_superuser=True).values_list('id', flat=True))
+                recipients = superusers
+        else:
+            if complaint.user_id:
+                recipients.add(complaint.user_id)
+            if 'status' in changed:
+                kind = 'status_update'
+                message = f"Complaint {complaint.complaint_id} status updated to: {complaint.status}"
+            elif complaint.assigned_department_id:
+                kind = 'assignment'
+                message = (
+                    f"Complaint {complaint.complaint_id} assigned to "
+                    f"{department_names.get(complaint.assigned_department_id, 'a department')}"
+                )
+            else:
+                kind = 'assignment'
+                message = f"Complaint {complaint.complaint_id} assignment updated"
+
+        notifications.extend(
+            Notification(user_id=user_id, complaint=complaint, kind=kind, message=message)
+            for user_id in sorted(recipients)
+        )
+    return notifications
+
+
+def fan_out_complaint_notifications(changes, created):
+    """Create the notifications for a batch of complaint changes in one INSERT and push them live."""
+    from notifications.models import Notification
+
+    notifications = build_complaint_notifications(changes, created)
+    if notifications:
+        Notification.objects.deliver(notifications)
+    return notifications
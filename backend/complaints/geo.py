@@ -0,0 +1,143 @@
+"""
+Geohash helpers for spatial lookups on complaints.
+
+A geohash interleaves latitude and longitude bits, so points in the same
+cell share a string prefix. "Everything in this cell" then becomes a range
+scan on an ordinary index: geohash >= prefix AND geohash < prefix + '~'.
+"""
+import math
+
+from django.db.models import FloatField, Q
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+STORED_PRECISION = 9  # cells of roughly 5m x 5m
+EARTH_RADIUS_M = 6371008.8
+
+
+def encode(latitude, longitude, precision=STORED_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coord = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(lat_degrees, lng_degrees) covered by one cell at `precision`."""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def cover(min_lat, min_lng, max_lat, max_lng, max_cells=24):
+    """
+    Return geohash prefixes whose cells together cover the bounding box,
+    using the finest precision that needs at most `max_cells` cells.
+    """
+    chosen = 1
+    for precision in range(1, STORED_PRECISION + 1):
+        lat_size, lng_size = cell_size(precision)
+        rows = math.floor(max_lat / lat_size) - math.floor(min_lat / lat_size) + 1
+        cols = math.floor(max_lng / lng_size) - math.floor(min_lng / lng_size) + 1
+        if rows * cols > max_cells:
+            break
+        chosen = precision
+
+    lat_size, lng_size = cell_size(chosen)
+    prefixes = set()
+    lat = min_lat
+    while True:
+        lng = min_lng
+        while True:
+            prefixes.add(encode(min(lat, 90.0), min(lng, 180.0), chosen))
+            if lng >= max_lng:
+                break
+            lng = min(lng + lng_size, max_lng)
+        if lat >= max_lat:
+            break
+        lat = min(lat + lat_size, max_lat)
+    return sorted(prefixes)
+
+
+def prefix_range(prefix):
+    """(low, high) bounds matching every geohash that starts with `prefix`."""
+    return prefix, prefix + '~'
+
+
+def radius_bbox(latitude, longitude, radius_m):
+    """Bounding box (min_lat, min_lng, max_lat, max_lng) around a circle."""
+    lat_delta = math.degrees(radius_m / EARTH_RADIUS_M)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-12)
+    lng_delta = min(math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat)), 180.0)
+    return (
+        max(latitude - lat_delta, -90.0),
+        max(longitude - lng_delta, -180.0),
+        min(latitude + lat_delta, 90.0),
+        min(longitude + lng_delta, 180.0),
+    )
+
+
+def distance_m(latitude, longitude, lat_field='latitude', lng_field='longitude'):
+    """Expression for the great-circle distance in metres from a point to each row's coordinates (haversine)."""
+    lat1, lng1 = math.radians(latitude), math.radians(longitude)
+    lat2 = Radians(Cast(lat_field, FloatField()))
+    lng2 = Radians(Cast(lng_field, FloatField()))
+    a = Power(Sin((lat2 - lat1) / 2), 2) + math.cos(lat1) * Cos(lat2) * Power(Sin((lng2 - lng1) / 2), 2)
+    return 2 * EARTH_RADIUS_M * ASin(Sqrt(a))
+
+
+def cell_ranges(min_lat, min_lng, max_lat, max_lng, field='geohash', max_precision=STORED_PRECISION):
+    """Q matching rows whose `field` geohash lies in a cell covering the box."""
+    query = Q()
+    for prefix in {p[:max_precision] for p in cover(min_lat, min_lng, max_lat, max_lng)}:
+        low, high = prefix_range(prefix)
+        query |= Q(**{f'{field}__gte': low, f'{field}__lt': high})
+    return query
+
+
+def precision_for_zoom(zoom, max_precision=8, cell_pixels=64):
+    """
+    Finest geohash precision whose cells are still at least `cell_pixels`
+    wide on a web-mercator map at `zoom`, so one screen holds a bounded
+    number of cells whatever the zoom.
+    """
+    world_pixels = 256 * 2 ** zoom
+    for precision in range(max_precision, 0, -1):
+        if cell_size(precision)[1] / 360 * world_pixels >= cell_pixels:
+            return precision
+    return 1
+
+
+def filter_bbox(queryset, min_lat, min_lng, max_lat, max_lng):
+    """Complaints inside the box: index range scans, then an exact coordinate check."""
+    return queryset.filter(
+        cell_ranges(min_lat, min_lng, max_lat, max_lng),
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lng, max_lng),
+    )
+
+
+def filter_near(queryset, latitude, longitude, radius_m):
+    """Complaints within `radius_m` metres of a point: the bounding box first, then the exact distance."""
+    return filter_bbox(queryset, *radius_bbox(latitude, longitude, radius_m)).alias(
+        distance=distance_m(latitude, longitude),
+    ).filter(distance__lte=radius_m)
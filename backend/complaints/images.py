@@ -0,0 +1,105 @@
+"""
+Resized variants of complaint photos.
+
+Every uploaded photo is rendered once, off the request path, into each size
+in SIZES and each format in FORMATS, next to the original:
+
+    complaint_images/variants/<original name>/<size>.<ext>
+
+The paths are stored on the row's `variants` field as
+{"source": <original name>, "thumb": {"webp": <path>, "jpeg": <path>}, ...}.
+"source" records which upload they were rendered from, so a replaced image
+gets re-rendered. Variants are written to the default storage, under a
+directory named after the original; for content-addressed originals that
+directory is shared by every upload of the same bytes.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .storage import is_content_addressed
+
+# Longest edge in pixels; images are only ever scaled down.
+SIZES = {
+    'thumb': 160,
+    'card': 640,
+    'full': 1600,
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def needs_variants(field_file, variants):
+    return bool(field_file) and variants.get('source') != field_file.name
+
+
+def variant_path(source_name, size, ext):
+    # Keyed by the whole file name: a.jpg and a.png are different images.
+    directory, filename = os.path.split(source_name)
+    return f'{directory}/variants/{filename}/{size}.{ext}'
+
+
+def variant_dir(source_name):
+    return os.path.dirname(variant_path(source_name, 'thumb', 'jpeg'))
+
+
+def existing_variants(source_name):
+    """The variants of an identical, already processed upload, if there are any."""
+    if not is_content_addressed(source_name):
+        return None
+    variants = {'source': source_name}
+    for size in SIZES:
+        variants[size] = {ext: variant_path(source_name, size, ext) for ext in FORMATS}
+        if not all(default_storage.exists(path) for path in variants[size].values()):
+            return None
+    return variants
+
+
+def render_variants(field_file):
+    """Render every size and format of an image file and return the new `variants` value."""
+    reused = existing_variants(field_file.name)
+    if reused:
+        return reused
+
+    storage = default_storage
+    with field_file.open('rb') as source:
+        original = Image.open(source)
+        # Let the JPEG decoder skip detail we'd throw away anyway.
+        original.draft('RGB', (max(SIZES.values()),) * 2)
+        original = ImageOps.exif_transpose(original)
+        if original.mode != 'RGB':
+            original = original.convert('RGB')
+
+    variants = {'source': field_file.name}
+    for size, edge in sorted(SIZES.items(), key=lambda item: -item[1]):
+        image = original.copy()
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        variants[size] = {}
+        for ext, (pil_format, options) in FORMATS.items():
+            buffer = BytesIO()
+            image.save(buffer, pil_format, **options)
+            path = variant_path(field_file.name, size, ext)
+            if storage.exists(path):
+                storage.delete(path)
+            variants[size][ext] = storage.save(path, ContentFile(buffer.getvalue()))
+        # Each smaller size starts from the previous one, which is cheaper than the original.
+        original = image
+    return variants
+
+
+def variant_urls(name, variants, request=None):
+    """{size: {format: url}} of the image file `name` for a serializer, or None until the variants exist."""
+    if not name or variants.get('source') != name:
+        return None
+    urls = {}
+    for size in SIZES:
+        urls[size] = {}
+        for ext, path in variants.get(size, {}).items():
+            url = default_storage.url(path)
+            urls[size][ext] = request.build_absolute_uri(url) if request else url
+    return urls
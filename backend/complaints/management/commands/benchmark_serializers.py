@@ -0,0 +1,104 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from complaints.models import Complaint, ComplaintImage, Department
+from complaints.row_serializers import ComplaintListRowSerializer, PublicComplaintRowSerializer
+from complaints.serializers import ComplaintListSerializer, PublicComplaintSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the list endpoints' row serializers against the ModelSerializers on "
+        "synthetic complaints, after checking both produce the same output. "
+        "Nothing is left in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help="Complaints to serialize (default: 10000).")
+        parser.add_argument('--repeat', type=int, default=3, help="Runs of each serializer; the best is reported.")
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['repeat'] < 1:
+            raise CommandError("--rows and --repeat must be positive.")
+        try:
+            with transaction.atomic():
+                self.create_complaints(options['rows'])
+                for line in self.run(options['repeat']):
+                    self.stdout.write(line)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_complaints(self, rows):
+        user = User.objects.create(username='benchmark-serializers')
+        department = Department.objects.first()
+        categories = [code for code, _ in Complaint.CATEGORY_CHOICES]
+        complaints = Complaint.objects.bulk_create([
+            Complaint(
+                complaint_id=f'BENCH-{i:06d}',
+                user=user if i % 2 else None,
+                title=f'Complaint {i}',
+                category=categories[i % len(categories)],
+                description='Synthetic complaint for benchmark_serializers',
+                location=f'Ward {i % 30}',
+                latitude=f'27.{i % 1000000:06d}' if i % 4 else None,
+                longitude=f'85.{i % 1000000:06d}' if i % 4 else None,
+                image=f'complaint_images/bench{i}.jpg' if i % 3 == 0 else None,
+                upvote_count=i % 7,
+                assigned_department=department if i % 5 else None,
+                assigned_to=user if i % 5 == 1 else None,
+            )
+            for i in range(rows)
+        ], batch_size=500)
+        ComplaintImage.objects.bulk_create([
+            ComplaintImage(complaint=complaint, image=f'complaint_images/bench{complaint.pk}-extra.jpg')
+            for complaint in complaints[::5]
+        ], batch_size=500)
+
+    def run(self, repeat):
+        queryset = Complaint.objects.filter(complaint_id__startswith='BENCH-').order_by('-created_at', '-id')
+        upvoted_ids = set(queryset.filter(upvote_count__gt=3).values_list('id', flat=True))
+        # No request, so URLs stay relative and work whatever ALLOWED_HOSTS is.
+        context = {'upvoted_ids': upvoted_ids}
+
+        cases = [
+            (
+                'list',
+                lambda: ComplaintListSerializer(
+                    queryset.select_related('assigned_department', 'assigned_to'), many=True, context=context,
+                ).data,
+                lambda: ComplaintListRowSerializer(context).serialize(ComplaintListRowSerializer().rows(queryset)),
+            ),
+            (
+                'public',
+                lambda: PublicComplaintSerializer(
+                    queryset.select_related('user').prefetch_related('images'), many=True, context=context,
+                ).data,
+                lambda: PublicComplaintRowSerializer(context).serialize(PublicComplaintRowSerializer().rows(queryset)),
+            ),
+        ]
+        for name, model_serializer, row_serializer in cases:
+            if json.dumps(model_serializer()) != json.dumps(row_serializer()):
+                raise CommandError(f"{name}: the row serializer's output differs from the ModelSerializer's.")
+            model_time = self.best_of(repeat, model_serializer)
+            row_time = self.best_of(repeat, row_serializer)
+            yield (
+                f"{name}: {queryset.count()} rows, ModelSerializer {model_time * 1000:.0f} ms, "
+                f"row serializer {row_time * 1000:.0f} ms ({model_time / row_time:.1f}x)"
+            )
+
+    def best_of(self, repeat, serialize):
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            serialize()
+            times.append(time.perf_counter() - started)
+        return min(times)
@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from complaints.blobs import collect_garbage, rehash_legacy_files
+
+
+class Command(BaseCommand):
+    help = "Delete complaint photos (and their resized variants) that no complaint references any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            default=24,
+            help="Only delete files unreferenced for at least this long (default: 24).",
+        )
+        parser.add_argument(
+            '--rehash',
+            action='store_true',
+            help="First move photos saved under upload names to content-addressed names.",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Report what would be done without changing anything.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        if options['rehash']:
+            moved = rehash_legacy_files(dry_run=dry_run)
+            verb = "would be moved" if dry_run else "moved"
+            self.stdout.write(f"{moved} photo(s) {verb} to content-addressed names.")
+
+        removed = collect_garbage(grace=timedelta(hours=options['grace_hours']), dry_run=dry_run)
+        for name in removed:
+            self.stdout.write(name)
+        verb = "would be deleted" if dry_run else "deleted"
+        self.stdout.write(self.style.SUCCESS(f"{len(removed)} unreferenced file(s) {verb}."))
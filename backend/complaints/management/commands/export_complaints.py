@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+from rest_framework.exceptions import ValidationError
+
+from complaints.export import FORMATS, export_lines
+from complaints.models import Complaint
+from complaints.search import filter_matches
+from complaints.views import filter_public_complaints
+
+FILTERS = ('category', 'status', 'date_from', 'date_to', 'bbox', 'near', 'radius', 'q')
+
+
+class Command(BaseCommand):
+    help = "Stream complaints as CSV or NDJSON, with the same filters as the public feed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help="File to write to (default: standard output).")
+        for name in FILTERS:
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=name, help=f"Public feed `{name}` filter.")
+
+    def handle(self, *args, **options):
+        params = QueryDict(mutable=True)
+        params.update({name: options[name] for name in FILTERS if options[name]})
+        try:
+            queryset = filter_public_complaints(Complaint.objects.all(), params)
+        except ValidationError as error:
+            raise CommandError(error.detail)
+        if params.get('q'):
+            queryset = filter_matches(queryset, params['q'])
+
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else self.stdout
+        try:
+            for line in export_lines(queryset, options['format']):
+                output.write(line)
+        finally:
+            if options['output']:
+                output.close()
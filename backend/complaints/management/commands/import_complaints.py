@@ -0,0 +1,60 @@
+import json
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.batch import MAX_ITEMS, ingest_complaints
+
+
+class Command(BaseCommand):
+    help = "File complaints from a newline-delimited JSON file, one complaint object per line."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="NDJSON file to read ('-' for standard input).")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--user', help="Username to file the complaints as (default: none).")
+
+    def handle(self, *args, **options):
+        batch_size = min(max(options['batch_size'], 1), MAX_ITEMS)
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['user']!r}.")
+
+        self.created = self.failed = 0
+        source = sys.stdin if options['path'] == '-' else open(options['path'], encoding='utf-8')
+        try:
+            batch = []
+            for line_number, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    batch.append((line_number, json.loads(line)))
+                except ValueError as error:
+                    self.report(line_number, f"invalid JSON: {error}")
+                    continue
+                if len(batch) == batch_size:
+                    self.ingest(batch, user)
+                    batch = []
+            if batch:
+                self.ingest(batch, user)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        self.stdout.write(self.style.SUCCESS(f"{self.created} complaint(s) filed, {self.failed} line(s) rejected."))
+
+    def ingest(self, batch, user):
+        results = ingest_complaints([item for _, item in batch], user=user)
+        for (line_number, _), result in zip(batch, results):
+            if 'errors' in result:
+                self.report(line_number, json.dumps(result['errors']))
+            else:
+                self.created += 1
+
+    def report(self, line_number, message):
+        self.failed += 1
+        self.stderr.write(f"line {line_number}: {message}")
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from complaints.images import needs_variants, render_variants
+from complaints.models import Complaint, ComplaintImage
+from complaints.tasks import process_image
+
+
+class Command(BaseCommand):
+    help = "Render thumb/card/full variants for complaint photos that don't have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Re-render variants even for photos that already have them.",
+        )
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help="Queue a complaints.process_image job per photo instead of rendering here.",
+        )
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        for Model in (Complaint, ComplaintImage):
+            photos = Model.objects.exclude(image='').exclude(image__isnull=True).only('image', 'variants')
+            for instance in photos.iterator():
+                if not options['force'] and not needs_variants(instance.image, instance.variants):
+                    continue
+                if options['queue']:
+                    process_image.enqueue(model=Model._meta.model_name, id=instance.pk)
+                    processed += 1
+                    continue
+                try:
+                    variants = render_variants(instance.image)
+                except (OSError, ValueError) as exc:
+                    self.stderr.write(f"{instance.image.name}: {exc}")
+                    failed += 1
+                    continue
+                Model.objects.filter(pk=instance.pk).update(variants=variants)
+                processed += 1
+
+        verb = "queued" if options['queue'] else "processed"
+        self.stdout.write(self.style.SUCCESS(f"{processed} photo(s) {verb}, {failed} failed."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from complaints.clusters import rebuild_clusters
+
+
+class Command(BaseCommand):
+    help = "Recompute the map cluster aggregates from the complaints table."
+
+    def handle(self, *args, **options):
+        rows = rebuild_clusters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} cluster row(s)."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from complaints.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the complaint full-text search index from the complaints table."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        indexed = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} complaint(s) with {type(backend).__name__}."
+        ))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from complaints.models import Complaint, Upvote
+
+
+class Command(BaseCommand):
+    help = "Recompute Complaint.upvote_count from Upvote rows and fix any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Report drifted complaints without updating them.",
+        )
+
+    def handle(self, *args, **options):
+        actual = (
+            Upvote.objects.filter(complaint=OuterRef('pk'))
+            .values('complaint')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        with transaction.atomic():
+            drifted = (
+                Complaint.objects.annotate(actual=Coalesce(Subquery(actual), 0))
+                .exclude(upvote_count=F('actual'))
+                .values_list('pk', 'complaint_id', 'upvote_count', 'actual')
+            )
+            fixed = 0
+            for pk, complaint_id, stored, real in list(drifted):
+                self.stdout.write(f"{complaint_id}: stored {stored}, actual {real}")
+                if not options['dry_run']:
+                    # Recompute inside the UPDATE so votes landing meanwhile are counted.
+                    Complaint.objects.filter(pk=pk).update(upvote_count=Coalesce(Subquery(actual), 0))
+                fixed += 1
+
+        verb = "would be fixed" if options['dry_run'] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"{fixed} complaint(s) {verb}."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from complaints.sla import refresh_sla_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the time-in-status and time-to-resolve percentiles from the status history."
+
+    def handle(self, *args, **options):
+        rows = refresh_sla_stats()
+        self.stdout.write(self.style.SUCCESS(f"Computed {rows} SLA row(s)."))
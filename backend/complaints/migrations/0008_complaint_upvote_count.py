@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:17
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_upvote_counts(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    Upvote = apps.get_model('complaints', 'Upvote')
+    counts = (
+        Upvote.objects.filter(complaint=OuterRef('pk'))
+        .values('complaint')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Complaint.objects.update(upvote_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0007_create_initial_officers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='upvote_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['-upvote_count', '-created_at', '-id'], name='complaint_upvotes_idx'),
+        ),
+        migrations.RunPython(backfill_upvote_counts, migrations.RunPython.noop),
+    ]
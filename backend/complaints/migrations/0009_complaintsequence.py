@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:18
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each year's counter after the highest number already issued."""
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintSequence = apps.get_model('complaints', 'ComplaintSequence')
+    highest = {}
+    for complaint_id in Complaint.objects.values_list('complaint_id', flat=True).iterator():
+        try:
+            _, year, number = complaint_id.split('-')
+            year, number = int(year), int(number)
+        except ValueError:
+            continue
+        highest[year] = max(highest.get(year, 0), number)
+    ComplaintSequence.objects.bulk_create(
+        ComplaintSequence(year=year, last_value=number) for year, number in highest.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0008_complaint_upvote_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintSequence',
+            fields=[
+                ('year', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:30
+
+from django.db import migrations, models
+
+from complaints import geo
+
+
+def backfill_geohashes(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    located = Complaint.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    batch = []
+    for complaint in located.only('id', 'latitude', 'longitude').iterator():
+        complaint.geohash = geo.encode(complaint.latitude, complaint.longitude)
+        batch.append(complaint)
+        if len(batch) >= 1000:
+            Complaint.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    Complaint.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0009_complaintsequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:32
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Substr
+
+
+def build_clusters(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintCluster = apps.get_model('complaints', 'ComplaintCluster')
+    located = Complaint.objects.exclude(geohash='')
+    rows = []
+    for precision in range(1, 9):
+        groups = (
+            located.annotate(cell=Substr('geohash', 1, precision))
+            .values('cell', 'category', 'status')
+            .annotate(total=Count('id'), latitude_total=Sum('latitude'), longitude_total=Sum('longitude'))
+            .order_by()
+        )
+        rows.extend(
+            ComplaintCluster(
+                precision=precision,
+                cell=group['cell'],
+                category=group['category'],
+                status=group['status'],
+                count=group['total'],
+                latitude_sum=float(group['latitude_total']),
+                longitude_sum=float(group['longitude_total']),
+            )
+            for group in groups
+        )
+    ComplaintCluster.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0010_complaint_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precision', models.PositiveSmallIntegerField()),
+                ('cell', models.CharField(max_length=12)),
+                ('category', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('latitude_sum', models.FloatField(default=0)),
+                ('longitude_sum', models.FloatField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('precision', 'cell', 'category', 'status'), name='complaint_cluster_key')],
+            },
+        ),
+        migrations.RunPython(build_clusters, migrations.RunPython.noop),
+    ]
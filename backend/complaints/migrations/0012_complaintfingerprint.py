@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:33
+
+import random
+import re
+import struct
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of complaints.duplicates as of this migration, so later
+# changes to the live hashing can't change what this backfill computes.
+SHINGLE_SIZE = 4
+NUM_HASHES = 64
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+_rng = random.Random(0x5EED)
+_HASHES = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+_SIGNATURE = struct.Struct(f'<{NUM_HASHES}I')
+
+
+def shingles(text):
+    text = ' '.join(re.findall(r'\w+', text.lower()))
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(title, description):
+    hashed = [zlib.crc32(s.encode()) for s in shingles(f'{title} {description}')]
+    if not hashed:
+        return (_MASK,) * NUM_HASHES
+    return tuple(min((a * h + b) % _PRIME for h in hashed) & _MASK for a, b in _HASHES)
+
+
+def pack(sig):
+    return _SIGNATURE.pack(*sig)
+
+
+def backfill_fingerprints(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintFingerprint = apps.get_model('complaints', 'ComplaintFingerprint')
+    rows = (
+        ComplaintFingerprint(complaint_id=pk, signature=pack(signature(title, description)))
+        for pk, title, description in Complaint.objects.values_list('pk', 'title', 'description').iterator()
+    )
+    ComplaintFingerprint.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0011_complaintcluster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintFingerprint',
+            fields=[
+                ('complaint', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='complaints.complaint')),
+                ('signature', models.BinaryField()),
+            ],
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:35
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS complaints_search "
+        "USING fts5(title, description, location, tokenize='porter unicode61')"
+    )
+    schema_editor.execute(
+        "INSERT INTO complaints_search (rowid, title, description, location) "
+        "SELECT id, title, description, location FROM complaints_complaint"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS complaints_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0012_complaintfingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:39
+
+import complaints.storage
+from collections import Counter
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintImage = apps.get_model('complaints', 'ComplaintImage')
+    MediaBlob = apps.get_model('complaints', 'MediaBlob')
+    counts = Counter(Complaint.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True))
+    counts.update(ComplaintImage.objects.exclude(image='').values_list('image', flat=True))
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name, refcount=refcount) for name, refcount in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0014_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='complaint',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=complaints.storage.get_image_storage, upload_to='complaint_images/'),
+        ),
+        migrations.AlterField(
+            model_name='complaintimage',
+            name='image',
+            field=models.ImageField(storage=complaints.storage.get_image_storage, upload_to='complaint_images/'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
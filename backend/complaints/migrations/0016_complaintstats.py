@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def build_stats(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintStats = apps.get_model('complaints', 'ComplaintStats')
+    groups = (
+        Complaint.objects.annotate(day=TruncDate('created_at'))
+        .values('day', 'category', 'status', 'assigned_department_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    ComplaintStats.objects.bulk_create(
+        [
+            ComplaintStats(
+                day=group['day'],
+                category=group['category'],
+                status=group['status'],
+                assigned_department_id=group['assigned_department_id'],
+                count=group['total'],
+            )
+            for group in groups
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0015_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('assigned_department', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='complaints.department')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'category', 'status', 'assigned_department'), name='complaint_stats_key')],
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
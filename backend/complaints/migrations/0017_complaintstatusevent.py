@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_history(apps, schema_editor):
+    # Only the current state is known: record the filing, and the current
+    # status as of the last update when it has moved on since.
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintStatusEvent = apps.get_model('complaints', 'ComplaintStatusEvent')
+    events = []
+    for complaint in Complaint.objects.order_by('id').iterator(chunk_size=1000):
+        state = {
+            'complaint_id': complaint.pk,
+            'category': complaint.category,
+            'department_id': complaint.assigned_department_id,
+            'assigned_to_id': complaint.assigned_to_id,
+        }
+        if complaint.status == 'Submitted':
+            events.append(ComplaintStatusEvent(**state, status='Submitted', created_at=complaint.created_at))
+        else:
+            events.append(ComplaintStatusEvent(
+                **{**state, 'department_id': None, 'assigned_to_id': None},
+                status='Submitted', created_at=complaint.created_at,
+            ))
+            events.append(ComplaintStatusEvent(
+                **state, status=complaint.status, previous_status='Submitted', created_at=complaint.updated_at,
+            ))
+    ComplaintStatusEvent.objects.bulk_create(events, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0016_complaintstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintSLAStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('in_status', 'Time in status'), ('to_resolve', 'Time to resolve')], max_length=20)),
+                ('status', models.CharField(blank=True, max_length=20)),
+                ('category', models.CharField(max_length=20)),
+                ('samples', models.PositiveIntegerField()),
+                ('p50', models.FloatField()),
+                ('p90', models.FloatField()),
+                ('p99', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='complaints.department')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ComplaintStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20)),
+                ('previous_status', models.CharField(blank=True, max_length=20)),
+                ('category', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('complaint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='complaints.complaint')),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='status_events', to='complaints.department')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['complaint', 'created_at'], name='status_event_history_idx'), models.Index(fields=['department', 'status'], name='status_event_department_idx')],
+            },
+        ),
+        migrations.RunPython(seed_history, migrations.RunPython.noop),
+    ]
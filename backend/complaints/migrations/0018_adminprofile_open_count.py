@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:52
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_open_complaints(apps, schema_editor):
+    AdminProfile = apps.get_model('complaints', 'AdminProfile')
+    Complaint = apps.get_model('complaints', 'Complaint')
+    open_complaints = (
+        Complaint.objects.filter(assigned_to=OuterRef('user_id')).exclude(status='Resolved')
+        .values('assigned_to').annotate(total=Count('id')).values('total')
+    )
+    AdminProfile.objects.update(open_count=Coalesce(Subquery(open_complaints), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0017_complaintstatusevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adminprofile',
+            name='open_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='adminprofile',
+            index=models.Index(fields=['department', 'open_count'], name='adminprofile_workload_idx'),
+        ),
+        migrations.RunPython(count_open_complaints, migrations.RunPython.noop),
+    ]
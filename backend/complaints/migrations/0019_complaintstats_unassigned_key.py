@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:35
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_unassigned_duplicates(apps, schema_editor):
+    # The old key let unassigned rows repeat; fold each group into its first row.
+    ComplaintStats = apps.get_model('complaints', 'ComplaintStats')
+    groups = (
+        ComplaintStats.objects.filter(assigned_department__isnull=True)
+        .values('day', 'category', 'status')
+        .annotate(rows=Count('id'), first=Min('id'), total=Sum('count'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for group in groups:
+        duplicates = ComplaintStats.objects.filter(
+            assigned_department__isnull=True, day=group['day'], category=group['category'], status=group['status'],
+        )
+        duplicates.exclude(id=group['first']).delete()
+        duplicates.filter(id=group['first']).update(count=group['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0018_adminprofile_open_count'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='complaintstats',
+            name='complaint_stats_key',
+        ),
+        migrations.RunPython(merge_unassigned_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='complaintstats',
+            constraint=models.UniqueConstraint(condition=models.Q(('assigned_department__isnull', False)), fields=('day', 'category', 'status', 'assigned_department'), name='complaint_stats_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='complaintstats',
+            constraint=models.UniqueConstraint(condition=models.Q(('assigned_department__isnull', True)), fields=('day', 'category', 'status'), name='complaint_stats_unassigned_key'),
+        ),
+    ]
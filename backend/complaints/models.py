@@ -1,5 +1,10 @@
-from django.db import models
+from django.db import models, connection, transaction, IntegrityError
+from django.db.models import F
 from django.conf import settings
+from django.utils import timezone
+
+from . import geo
+from .storage import get_image_storage
 
 
 class Department(models.Model):
@@ -52,12 +57,69 @@ class AdminProfile(models.Model):
         related_name='admins'
     )
     role = models.CharField(max_length=30, choices=ROLE_CHOICES, default='ward_officer')
+    # Unresolved complaints assigned to this user, maintained by complaints.signals
+    # with database-side increments. Auto-routing picks the officer with the fewest.
+    open_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['department', 'open_count'], name='adminprofile_workload_idx'),
+        ]
 
     def __str__(self):
         dept = self.department.name if self.department else 'No Department'
         return f"{self.user.username} — {self.get_role_display()} ({dept})"
 
 
+class ComplaintSequence(models.Model):
+    """Per-year counter behind the HA-YYYY-NNN complaint IDs"""
+
+    year = models.PositiveIntegerField(primary_key=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.year}: {self.last_value}"
+
+    @classmethod
+    def reserve(cls, year, count=1):
+        """
+        Atomically reserve `count` consecutive numbers for `year` and return
+        them as a range. Bulk paths pass a larger count to allocate a whole
+        block of IDs with a single increment.
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        with transaction.atomic():
+            last_value = cls._increment(year, count)
+            if last_value is None:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(year=year, last_value=count)
+                    last_value = count
+                except IntegrityError:
+                    # Another transaction created this year's row first.
+                    last_value = cls._increment(year, count)
+        return range(last_value - count + 1, last_value + 1)
+
+    @classmethod
+    def _increment(cls, year, count):
+        """Bump the counter and return its new value, or None if the year has no row yet."""
+        if connection.vendor in ('postgresql', 'sqlite') and connection.features.can_return_columns_from_insert:
+            # UPDATE ... RETURNING does the increment and the read in one round-trip.
+            table = connection.ops.quote_name(cls._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {table} SET last_value = last_value + %s WHERE year = %s RETURNING last_value',
+                    [count, year],
+                )
+                row = cursor.fetchone()
+            return row[0] if row else None
+        # The UPDATE takes the row lock, so the read below sees our own increment.
+        if not cls.objects.filter(year=year).update(last_value=F('last_value') + count):
+            return None
+        return cls.objects.values_list('last_value', flat=True).get(year=year)
+
+
 class Complaint(models.Model):
     """Model representing a city complaint/issue report"""
 
@@ -86,8 +148,16 @@ class Complaint(models.Model):
     location = models.CharField(max_length=300)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    # Geohash of (latitude, longitude), kept in sync by save(). Map queries
+    # turn a viewport into a few prefix ranges on this index.
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False, db_index=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Submitted')
-    image = models.ImageField(upload_to='complaint_images/', null=True, blank=True)
+    image = models.ImageField(upload_to='complaint_images/', storage=get_image_storage, null=True, blank=True)
+    # Resized copies of `image`, written by the complaints.process_image job.
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Denormalized count of Upvote rows, maintained by complaints.signals with
+    # database-side increments. Never written by a regular save().
+    upvote_count = models.PositiveIntegerField(default=0, editable=False)
 
     # Department assignment
     assigned_department = models.ForeignKey(
@@ -110,36 +180,92 @@ class Complaint(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-upvote_count', '-created_at', '-id'], name='complaint_upvotes_idx'),
+        ]
+
+    # Fields whose changes drive notifications and other derived data.
+    TRACKED_FIELDS = (
+        'status', 'assigned_department_id', 'assigned_to_id',
+        'category', 'latitude', 'longitude', 'title', 'description', 'location', 'image',
+    )
 
     def __str__(self):
         return f"{self.complaint_id} - {self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = instance._get_tracked_values()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_values = self._get_tracked_values()
+
+    def _get_tracked_values(self):
+        # Read __dict__ directly so deferred fields are never fetched. Files are
+        # compared by stored name, since a FieldFile is updated in place on save.
+        return {
+            f: getattr(self.__dict__[f], 'name', self.__dict__[f])
+            for f in self.TRACKED_FIELDS if f in self.__dict__
+        }
+
+    def get_changed_fields(self):
+        """Return {field: previous value} for tracked fields changed since the last load or save."""
+        loaded = getattr(self, '_loaded_values', None)
+        if not loaded:
+            return {}
+        current = self._get_tracked_values()
+        return {
+            field: old for field, old in loaded.items()
+            if current.get(field, old) != old
+        }
+
+    def update_geohash(self):
+        if self.latitude is None or self.longitude is None:
+            self.geohash = ''
+        else:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+
+    @staticmethod
+    def format_complaint_id(year, number):
+        return f'HA-{year}-{number:03d}'
+
     def save(self, *args, **kwargs):
         """Generate complaint_id on first save"""
-        if not self.complaint_id:
-            # Get the latest complaint to generate next ID
-            import datetime
-            year = datetime.datetime.now().year
-            last_complaint = Complaint.objects.filter(
-                complaint_id__startswith=f'HA-{year}-'
-            ).order_by('-complaint_id').first()
-
-            if last_complaint:
-                # Extract number from last ID and increment
-                last_num = int(last_complaint.complaint_id.split('-')[-1])
-                new_num = last_num + 1
-            else:
-                new_num = 1
-
-            self.complaint_id = f'HA-{year}-{new_num:03d}'
+        deferred = self.get_deferred_fields()
+        if 'complaint_id' not in deferred and not self.complaint_id:
+            year = timezone.now().year
+            number = ComplaintSequence.reserve(year)[0]
+            self.complaint_id = self.format_complaint_id(year, number)
+
+        # Coordinates that weren't loaded aren't saved either, so the stored geohash still fits them.
+        if not {'latitude', 'longitude'} & deferred:
+            self.update_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+
+        # Leave upvote_count out of UPDATEs so a stale in-memory value can't
+        # overwrite increments made by concurrent upvotes. Like a plain save(),
+        # only write the fields that were loaded.
+        if not self._state.adding and not kwargs.get('force_insert') and update_fields is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.attname not in deferred and f.name != 'upvote_count'
+            ]
 
         super().save(*args, **kwargs)
+        self._loaded_values = self._get_tracked_values()
 
 
 class ComplaintImage(models.Model):
     """Model for storing multiple images per complaint"""
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to='complaint_images/')
+    image = models.ImageField(upload_to='complaint_images/', storage=get_image_storage)
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -157,3 +283,135 @@ class Upvote(models.Model):
 
     def __str__(self):
         return f"{self.user.username} upvoted {self.complaint.complaint_id}"
+
+
+class ComplaintCluster(models.Model):
+    """
+    Complaint counts per geohash cell, category and status, at every
+    clustering precision. Kept current by complaints.clusters as complaints
+    change; rebuild with `manage.py rebuild_complaint_clusters`.
+    """
+    precision = models.PositiveSmallIntegerField()
+    cell = models.CharField(max_length=12)
+    category = models.CharField(max_length=20)
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+    # Coordinate sums, so a cell's centroid is latitude_sum / count.
+    latitude_sum = models.FloatField(default=0)
+    longitude_sum = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['precision', 'cell', 'category', 'status'], name='complaint_cluster_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.cell} ({self.category}, {self.status}): {self.count}"
+
+
+class ComplaintStats(models.Model):
+    """
+    Complaint counts per day filed, category, status and assigned
+    department, for the admin dashboard. Kept current by complaints.stats
+    as complaints change; rebuild with `manage.py rebuild_complaint_stats`.
+    """
+    day = models.DateField()
+    category = models.CharField(max_length=20)
+    status = models.CharField(max_length=20)
+    # Not a constraint: rows are recounted when a department is deleted (see complaints.signals).
+    assigned_department = models.ForeignKey(
+        Department, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        # NULLs never clash in a unique index, so unassigned rows get a constraint of their own.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'category', 'status', 'assigned_department'],
+                condition=models.Q(assigned_department__isnull=False),
+                name='complaint_stats_key',
+            ),
+            models.UniqueConstraint(
+                fields=['day', 'category', 'status'],
+                condition=models.Q(assigned_department__isnull=True),
+                name='complaint_stats_unassigned_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.category} ({self.status}): {self.count}"
+
+
+class ComplaintStatusEvent(models.Model):
+    """
+    Append-only history of a complaint's status and assignment: one row per
+    change, holding the state from that moment until the next row. Written
+    by complaints.signals; read by complaints.sla.
+    """
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='status_events')
+    status = models.CharField(max_length=20)
+    previous_status = models.CharField(max_length=20, blank=True)
+    category = models.CharField(max_length=20)
+    department = models.ForeignKey(
+        Department, on_delete=models.SET_NULL, null=True, blank=True, related_name='status_events'
+    )
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['complaint', 'created_at'], name='status_event_history_idx'),
+            models.Index(fields=['department', 'status'], name='status_event_department_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.complaint_id}: {self.previous_status or '-'} -> {self.status}"
+
+
+class ComplaintSLAStats(models.Model):
+    """
+    Percentiles of time spent in each status, and of time to resolve, per
+    department and category. Recomputed as a whole by complaints.sla.
+    """
+    METRIC_CHOICES = [
+        ('in_status', 'Time in status'),
+        ('to_resolve', 'Time to resolve'),
+    ]
+
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    # Blank for time to resolve.
+    status = models.CharField(max_length=20, blank=True)
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    category = models.CharField(max_length=20)
+    samples = models.PositiveIntegerField()
+    # Durations in seconds.
+    p50 = models.FloatField()
+    p90 = models.FloatField()
+    p99 = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.metric} {self.status} {self.category}: p50 {self.p50:.0f}s"
+
+
+class ComplaintFingerprint(models.Model):
+    """MinHash signature of a complaint's title and description, for duplicate detection"""
+    complaint = models.OneToOneField(Complaint, on_delete=models.CASCADE, primary_key=True, related_name='fingerprint')
+    signature = models.BinaryField()
+
+    def __str__(self):
+        return f"Fingerprint for {self.complaint_id}"
+
+
+class MediaBlob(models.Model):
+    """Reference count for a stored photo file, shared by every row that points at the same bytes"""
+    name = models.CharField(max_length=255, primary_key=True)
+    refcount = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
@@ -0,0 +1,15 @@
+from core.pagination import KeysetPagination
+
+
+class PublicFeedPagination(KeysetPagination):
+    """Keyset pagination for the public complaint feed, following its `sort` param."""
+
+    SORT_ORDERINGS = {
+        'recent': ('-created_at', '-id'),
+        'oldest': ('created_at', 'id'),
+        'most_upvoted': ('-upvote_count', '-created_at', '-id'),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        sort = request.query_params.get('sort', 'recent')
+        return self.SORT_ORDERINGS.get(sort, self.SORT_ORDERINGS['recent'])
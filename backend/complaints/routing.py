@@ -0,0 +1,116 @@
+"""
+Automatic routing of new complaints.
+
+A complaint goes to the first department (by id) that lists its category
+and, within it, to the active staff member with the fewest open
+complaints. The category -> department table is built from each
+Department's get_categories_list() once and kept in memory.
+complaints.signals drops it when a department is saved or deleted, and
+other processes rebuild theirs after ROUTING_TTL seconds at most. Workloads come from
+AdminProfile.open_count, which complaints.signals keeps current, so
+routing a complaint, or a whole batch of them, takes a single query.
+"""
+import heapq
+import time
+from collections import defaultdict
+
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import AdminProfile, Department
+
+ROUTING_TTL = 300
+
+_table = None  # (monotonic time built, {category: department id})
+
+
+def routing_table():
+    global _table
+    table = _table
+    if table is None or time.monotonic() - table[0] > ROUTING_TTL:
+        routes = {}
+        for department in Department.objects.order_by('pk').only('pk', 'categories'):
+            for category in department.get_categories_list():
+                routes.setdefault(category, department.pk)
+        table = _table = (time.monotonic(), routes)
+    return table[1]
+
+
+def invalidate_routing_table():
+    global _table
+    _table = None
+
+
+def route_many(categories):
+    """
+    Assignment fields for new complaints in each of `categories`, spread
+    over officers as if the complaints had been filed one by one. An entry
+    is empty when no department takes the category.
+    """
+    table = routing_table()
+    departments = {table[category] for category in categories if category in table}
+    workloads = defaultdict(list)
+    if departments:
+        for department_id, open_count, user_id in (
+            AdminProfile.objects.filter(department_id__in=departments, user__is_active=True, user__is_staff=True)
+            .values_list('department_id', 'open_count', 'user_id')
+        ):
+            workloads[department_id].append((open_count, user_id))
+    for heap in workloads.values():
+        heapq.heapify(heap)
+
+    assignments = []
+    for category in categories:
+        department_id = table.get(category)
+        if department_id is None:
+            assignments.append({})
+            continue
+        officer_id = None
+        heap = workloads[department_id]
+        if heap:
+            open_count, officer_id = heap[0]
+            heapq.heapreplace(heap, (open_count + 1, officer_id))
+        assignments.append({
+            'assigned_department_id': department_id,
+            'assigned_to_id': officer_id,
+            'status': 'Assigned',
+        })
+    return assignments
+
+
+def route(category):
+    """Assignment fields for a new complaint in `category`; empty when no department takes it."""
+    return route_many([category])[0]
+
+
+def is_open(status):
+    return status != 'Resolved'
+
+
+def workload_deltas(changes, created):
+    """Open-count deltas per assigned user for a complaints_changed batch."""
+    deltas = defaultdict(int)
+    for complaint, changed in changes:
+        if not created:
+            if 'assigned_to_id' not in changed and 'status' not in changed:
+                continue
+            previous_user = changed.get('assigned_to_id', complaint.assigned_to_id)
+            if previous_user and is_open(changed.get('status', complaint.status)):
+                deltas[previous_user] -= 1
+        if complaint.assigned_to_id and is_open(complaint.status):
+            deltas[complaint.assigned_to_id] += 1
+    return deltas
+
+
+def removal_deltas(complaint):
+    """Open-count deltas for a deleted complaint, as it was last saved."""
+    saved = {**complaint.__dict__, **getattr(complaint, '_loaded_values', {})}
+    if saved.get('assigned_to_id') and is_open(saved.get('status')):
+        return {saved['assigned_to_id']: -1}
+    return {}
+
+
+def apply_workload_deltas(deltas):
+    for user_id, delta in deltas.items():
+        if delta:
+            AdminProfile.objects.filter(user_id=user_id).update(open_count=Greatest(F('open_count') + delta, 0))
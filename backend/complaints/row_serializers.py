@@ -0,0 +1,166 @@
+"""
+Read-only serializers for the complaint list endpoints.
+
+The ModelSerializers in complaints.serializers build a model instance per
+row and then walk a field per key, which dominates the cost of a long list.
+These produce the same output straight from values() rows: the columns are
+fixed up front, category labels come from a prebuilt map, and each row is
+turned into a dict in a single expression. Related names come from joins
+and gallery images from one extra query, so the query count does not grow
+with the page.
+
+Use them for output only; input still goes through the ModelSerializers.
+`manage.py benchmark_serializers` checks both agree and times them.
+"""
+from rest_framework import fields
+
+from .images import variant_urls
+from .models import Complaint, ComplaintImage, Upvote
+
+CATEGORY_LABELS = dict(Complaint.CATEGORY_CHOICES)
+
+# Formatted exactly as the ModelSerializers' fields would.
+_coordinate = fields.DecimalField(max_digits=9, decimal_places=6)
+_datetime = fields.DateTimeField()
+
+
+def _decimal(value):
+    return None if value is None else _coordinate.to_representation(value)
+
+
+def _date(value):
+    return value.strftime('%Y-%m-%d')
+
+
+class RowSerializer:
+    """
+    Serialize values() rows of a queryset. Subclasses list the columns they
+    read in `values` and build one output dict per row in `to_representation`.
+    """
+    values = ()
+
+    def __init__(self, context=None):
+        self.context = context or {}
+
+    def rows(self, queryset):
+        return queryset.values(*self.values)
+
+    def to_representation(self, row):
+        raise NotImplementedError
+
+    def serialize(self, rows):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
+
+
+class ComplaintListRowSerializer(RowSerializer):
+    """Same output as ComplaintListSerializer."""
+
+    values = (
+        'id', 'complaint_id', 'title', 'category', 'location', 'latitude', 'longitude',
+        'status', 'created_at', 'assigned_department', 'assigned_department__name',
+        'assigned_to', 'assigned_to__username',
+    )
+
+    def to_representation(self, row):
+        category = row['category']
+        return {
+            'id': row['id'],
+            'complaint_id': row['complaint_id'],
+            'title': row['title'],
+            'category': category,
+            'category_display': CATEGORY_LABELS.get(category, category),
+            'location': row['location'],
+            'latitude': _decimal(row['latitude']),
+            'longitude': _decimal(row['longitude']),
+            'status': row['status'],
+            'date': _date(row['created_at']),
+            'assigned_department': row['assigned_department'],
+            'assigned_department_name': row['assigned_department__name'],
+            'assigned_to': row['assigned_to'],
+            'assigned_to_name': row['assigned_to__username'],
+        }
+
+
+class PublicComplaintRowSerializer(RowSerializer):
+    """
+    Same output as PublicComplaintSerializer. Takes the same context:
+    `request`, `upvoted_ids` (loaded in one query if missing) and, for
+    search results, `snippets`.
+    """
+
+    values = (
+        'id', 'complaint_id', 'title', 'category', 'description', 'location', 'latitude',
+        'longitude', 'status', 'image', 'variants', 'created_at', 'upvote_count', 'user__username',
+    )
+
+    def serialize(self, rows):
+        rows = list(rows)
+        ids = [row['id'] for row in rows]
+        self.request = self.context.get('request')
+        self.upvoted_ids = self.context.get('upvoted_ids')
+        if self.upvoted_ids is None:
+            self.upvoted_ids = self.load_upvoted_ids(ids)
+        self.snippets = self.context.get('snippets')
+        self.images = self.load_images(ids)
+        return super().serialize(rows)
+
+    def load_upvoted_ids(self, ids):
+        user = getattr(self.request, 'user', None)
+        if not ids or not (user and user.is_authenticated):
+            return set()
+        return set(
+            Upvote.objects.filter(user=user, complaint_id__in=ids).values_list('complaint_id', flat=True)
+        )
+
+    def load_images(self, ids):
+        """{complaint id: [image dict, ...]} for every gallery image of the rows."""
+        images = {pk: [] for pk in ids}
+        if not ids:
+            return images
+        rows = (
+            ComplaintImage.objects.filter(complaint_id__in=ids)
+            .order_by('id')
+            .values_list('complaint_id', 'id', 'image', 'variants', 'uploaded_at')
+        )
+        for complaint_id, pk, name, variants, uploaded_at in rows:
+            images[complaint_id].append({
+                'id': pk,
+                'image': self.file_url(ComplaintImage, name),
+                'variants': variant_urls(name, variants, self.request),
+                'uploaded_at': _datetime.to_representation(uploaded_at),
+            })
+        return images
+
+    def file_url(self, model, name):
+        if not name:
+            return None
+        url = model._meta.get_field('image').storage.url(name)
+        return self.request.build_absolute_uri(url) if self.request else url
+
+    def to_representation(self, row):
+        pk = row['id']
+        category = row['category']
+        name = row['image']
+        data = {
+            'id': pk,
+            'complaint_id': row['complaint_id'],
+            'title': row['title'],
+            'category': category,
+            'category_display': CATEGORY_LABELS.get(category, category),
+            'description': row['description'],
+            'location': row['location'],
+            'latitude': _decimal(row['latitude']),
+            'longitude': _decimal(row['longitude']),
+            'status': row['status'],
+            'image': self.file_url(Complaint, name),
+            'image_variants': variant_urls(name, row['variants'], self.request),
+            'images': self.images[pk],
+            'date': _date(row['created_at']),
+            'upvote_count': row['upvote_count'],
+            'is_upvoted': pk in self.upvoted_ids,
+            'submitted_by': row['user__username'],
+        }
+        if self.snippets is not None:
+            data['snippet'] = self.snippets.get(pk, '')
+        return data
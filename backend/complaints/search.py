@@ -0,0 +1,200 @@
+"""
+Full-text search over complaints.
+
+A search backend keeps an index of each complaint's title, description and
+location, and answers queries with hits ordered best first. Each hit carries
+an HTML snippet with the matched words wrapped in <mark>.
+SQLiteSearchBackend uses an FTS5 table with BM25 ranking.
+DatabaseSearchBackend works on any database without an index, for
+development on other engines. Choose one with the COMPLAINTS_SEARCH_BACKEND
+setting. complaints.signals keeps the index in sync, and
+`manage.py rebuild_search_index` rebuilds it.
+"""
+import html
+import re
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Complaint
+
+MAX_RESULTS = 500
+SNIPPET_WORDS = 12
+_START, _END = '\x02', '\x03'
+
+
+class SearchHit(NamedTuple):
+    id: int
+    score: float
+    snippet: str
+
+
+def query_terms(query):
+    return re.findall(r'\w+', query.lower())[:16]
+
+
+def render_snippet(text):
+    """HTML-escape a snippet and turn the match markers into <mark> tags."""
+    return html.escape(text).replace(_START, '<mark>').replace(_END, '</mark>')
+
+
+class DatabaseSearchBackend:
+    """Case-insensitive substring search on the complaint table itself. No index to maintain."""
+
+    def index(self, complaints):
+        pass
+
+    def remove(self, ids):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def matches(self, query):
+        """Ids of every complaint matching `query`, as a subquery for an `id__in` filter."""
+        terms = query_terms(query)
+        matches = Complaint.objects.all() if terms else Complaint.objects.none()
+        for term in terms:
+            matches = matches.filter(
+                Q(title__icontains=term) | Q(description__icontains=term) | Q(location__icontains=term)
+            )
+        return matches.values('id')
+
+    def search(self, query, within=None, limit=MAX_RESULTS):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        matches = Complaint.objects.filter(id__in=self.matches(query))
+        if within is not None:
+            matches = matches.filter(id__in=within.values('id'))
+        rows = matches.order_by('-created_at').values_list('id', 'title', 'description')
+        if limit is not None:
+            rows = rows[:limit]
+        hits = [
+            SearchHit(pk, self.score(terms, title, description), self.snippet(terms, title, description))
+            for pk, title, description in rows
+        ]
+        hits.sort(key=lambda hit: -hit.score)
+        return hits
+
+    def score(self, terms, title, description):
+        title, description = title.lower(), description.lower()
+        return float(sum(3 * title.count(term) + description.count(term) for term in terms))
+
+    def snippet(self, terms, title, description):
+        words = description.split() or title.split()
+        pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+        first = next((i for i, word in enumerate(words) if pattern.search(word)), 0)
+        start = max(first - SNIPPET_WORDS // 2, 0)
+        text = ' '.join(words[start:start + SNIPPET_WORDS])
+        text = pattern.sub(lambda m: f'{_START}{m.group(0)}{_END}', text)
+        return render_snippet(('…' if start else '') + text)
+
+
+class SQLiteSearchBackend:
+    """
+    FTS5 inverted index in the `complaints_search` virtual table, keyed by
+    complaint id. Titles weigh most in the BM25 score, then locations.
+    """
+    table = 'complaints_search'
+    weights = (5.0, 1.0, 2.0)  # title, description, location
+
+    def index(self, complaints):
+        rows = [(c.pk, c.title, c.description, c.location) for c in complaints]
+        with connection.cursor() as cursor:
+            self._delete(cursor, [row[0] for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, title, description, location) VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, ids):
+        with connection.cursor() as cursor:
+            self._delete(cursor, list(ids))
+
+    def _delete(self, cursor, ids):
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', chunk)
+
+    def rebuild(self):
+        table = Complaint._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, title, description, location) '
+                f'SELECT id, title, description, location FROM {table}'
+            )
+            return cursor.rowcount
+
+    def match_expression(self, terms):
+        # Quote every term so user input can't use (or break) FTS5 query syntax;
+        # the trailing * also matches words that start with the term.
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def matches(self, query):
+        """Ids of every complaint matching `query`, as a subquery for an `id__in` filter."""
+        terms = query_terms(query)
+        if not terms:
+            return Complaint.objects.none().values('id')
+        return RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [self.match_expression(terms)])
+
+    def search(self, query, within=None, limit=MAX_RESULTS):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        sql = (
+            f'SELECT rowid, bm25({self.table}, %s, %s, %s), '
+            f"snippet({self.table}, -1, '{_START}', '{_END}', '…', {SNIPPET_WORDS}) "
+            f'FROM {self.table} WHERE {self.table} MATCH %s'
+        )
+        params = [*self.weights, self.match_expression(terms)]
+        if within is not None:
+            within_sql, within_params = within.order_by().values('id').query.sql_with_params()
+            sql += f' AND rowid IN ({within_sql})'
+            params += within_params
+        sql += ' ORDER BY 2'
+        if limit is not None:
+            sql += ' LIMIT %s'
+            params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            # bm25() is lower-is-better; flip it so every backend sorts by descending score.
+            return [SearchHit(pk, -rank, render_snippet(snippet)) for pk, rank, snippet in cursor.fetchall()]
+
+
+_backends = {}
+
+
+def get_search_backend():
+    path = getattr(settings, 'COMPLAINTS_SEARCH_BACKEND', 'complaints.search.DatabaseSearchBackend')
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+def filter_matches(queryset, query):
+    """
+    Restrict a complaint queryset to every complaint matching `query`,
+    without the MAX_RESULTS cap of search(). The match runs as a subquery
+    of the same SQL statement, so the ids are streamed by the database and
+    never collected in Python. For callers that need neither ranks nor
+    snippets, such as exports and the admin.
+    """
+    return queryset.filter(id__in=get_search_backend().matches(query))
+
+
+def search_complaints(queryset, query):
+    """
+    Restrict a complaint queryset to the complaints matching `query`.
+    Returns the queryset and a hit for each of its complaints, best first,
+    so callers can order by relevance and show snippets. The queryset's own
+    filters are part of the search, so MAX_RESULTS doesn't apply.
+    """
+    queryset = filter_matches(queryset, query)
+    return queryset, get_search_backend().search(query, within=queryset, limit=None)
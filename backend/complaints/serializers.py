@@ -1,11 +1,31 @@
+from django.contrib.auth.models import User
+from django.db import transaction
 from rest_framework import serializers
+from uploads.models import Upload
+from .bulk import MAX_IDS
+from .images import variant_urls
 from .models import Complaint, ComplaintImage, Upvote, Department, AdminProfile
+from .row_serializers import CATEGORY_LABELS
+
+
+class ImageVariantsField(serializers.Field):
+    """URLs of the resized copies of an image field: {size: {format: url}}, or null until processed."""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        return variant_urls(instance.image.name, instance.variants, self.context.get('request'))
 
 
 class ComplaintImageSerializer(serializers.ModelSerializer):
+    variants = ImageVariantsField()
+
     class Meta:
         model = ComplaintImage
-        fields = ['id', 'image', 'uploaded_at']
+        fields = ['id', 'image', 'variants', 'uploaded_at']
         read_only_fields = ['uploaded_at']
 
 
@@ -35,6 +55,11 @@ class ComplaintSerializer(serializers.ModelSerializer):
     date = serializers.SerializerMethodField()
     submitted_by = serializers.SerializerMethodField()
     images = ComplaintImageSerializer(many=True, read_only=True)
+    image_variants = ImageVariantsField()
+    # Finished chunked uploads (see /api/uploads/) to attach as photos.
+    upload_ids = serializers.ListField(
+        child=serializers.UUIDField(), write_only=True, required=False, max_length=10
+    )
     assigned_department_name = serializers.CharField(
         source='assigned_department.name', read_only=True, default=None
     )
@@ -55,6 +80,7 @@ class ComplaintSerializer(serializers.ModelSerializer):
             'longitude',
             'status',
             'image',
+            'image_variants',
             'images',
             'date',
             'created_at',
@@ -64,9 +90,50 @@ class ComplaintSerializer(serializers.ModelSerializer):
             'assigned_department_name',
             'assigned_to',
             'assigned_to_name',
+            'upload_ids',
         ]
         read_only_fields = ['complaint_id', 'created_at', 'updated_at']
 
+    def validate_upload_ids(self, value):
+        request = self.context.get('request')
+        uploads = Upload.objects.filter(
+            pk__in=value, user=request.user, status='ready', complaint__isnull=True
+        ).in_bulk()
+        missing = [str(pk) for pk in value if pk not in uploads]
+        if missing:
+            raise serializers.ValidationError(f"Uploads not ready or not available: {', '.join(missing)}")
+        return [uploads[pk] for pk in dict.fromkeys(value)]
+
+    @transaction.atomic
+    def create(self, validated_data):
+        uploads = validated_data.pop('upload_ids', [])
+        if uploads and not validated_data.get('image'):
+            # The first upload becomes the main photo.
+            validated_data['image'] = uploads[0].file.name
+        complaint = super().create(validated_data)
+        self.attach_uploads(complaint, uploads)
+        return complaint
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        uploads = validated_data.pop('upload_ids', [])
+        complaint = super().update(instance, validated_data)
+        self.attach_uploads(complaint, uploads)
+        return complaint
+
+    def attach_uploads(self, complaint, uploads):
+        if not uploads:
+            return
+        # Claim conditionally so two complaints can't take the same upload.
+        claimed = Upload.objects.filter(
+            pk__in=[upload.pk for upload in uploads], complaint__isnull=True
+        ).update(complaint=complaint)
+        if claimed != len(uploads):
+            raise serializers.ValidationError({'upload_ids': 'An upload was taken by another complaint.'})
+        for upload in uploads:
+            if upload.file.name != complaint.image.name:
+                ComplaintImage.objects.create(complaint=complaint, image=upload.file.name)
+
     def get_date(self, obj):
         """Format date for frontend compatibility"""
         return obj.created_at.strftime('%Y-%m-%d')
@@ -81,8 +148,7 @@ class ComplaintSerializer(serializers.ModelSerializer):
         """Customize output to match frontend expectations"""
         data = super().to_representation(instance)
         # Map category code to label for display
-        category_map = dict(Complaint.CATEGORY_CHOICES)
-        data['category_display'] = category_map.get(data['category'], data['category'])
+        data['category_display'] = CATEGORY_LABELS.get(data['category'], data['category'])
         return data
 
 
@@ -130,9 +196,10 @@ class PublicComplaintSerializer(serializers.ModelSerializer):
     date = serializers.SerializerMethodField()
     category_display = serializers.SerializerMethodField()
     submitted_by = serializers.SerializerMethodField()
-    upvote_count = serializers.SerializerMethodField()
+    upvote_count = serializers.IntegerField(read_only=True)
     is_upvoted = serializers.SerializerMethodField()
     images = ComplaintImageSerializer(many=True, read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Complaint
@@ -148,6 +215,7 @@ class PublicComplaintSerializer(serializers.ModelSerializer):
             'longitude',
             'status',
             'image',
+            'image_variants',
             'images',
             'date',
             'upvote_count',
@@ -166,11 +234,98 @@ class PublicComplaintSerializer(serializers.ModelSerializer):
             return obj.user.username
         return None
 
-    def get_upvote_count(self, obj):
-        return obj.upvotes.count()
-
     def get_is_upvoted(self, obj):
+        # Feed views preload the caller's upvotes for a whole page in one query.
+        upvoted_ids = self.context.get('upvoted_ids')
+        if upvoted_ids is not None:
+            return obj.pk in upvoted_ids
         request = self.context.get('request')
         if request and request.user and request.user.is_authenticated:
             return obj.upvotes.filter(user=request.user).exists()
         return False
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Search results carry the highlighted text that matched.
+        snippets = self.context.get('snippets')
+        if snippets is not None:
+            data['snippet'] = snippets.get(instance.pk, '')
+        return data
+
+
+class ComplaintBatchItemSerializer(serializers.ModelSerializer):
+    """One complaint in a batch from another intake channel (see complaints.batch)"""
+
+    class Meta:
+        model = Complaint
+        fields = ['title', 'category', 'description', 'location', 'latitude', 'longitude']
+
+
+class BulkChangeSerializer(serializers.Serializer):
+    """An assign or status operation over many complaints, validated once for all of them"""
+
+    OPERATION_CHOICES = [('assign', 'Assign'), ('status', 'Change status')]
+
+    ids = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=MAX_IDS)
+    operation = serializers.ChoiceField(choices=OPERATION_CHOICES)
+    assigned_department = serializers.PrimaryKeyRelatedField(
+        queryset=Department.objects.all(), required=False, allow_null=True
+    )
+    assigned_to = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.filter(is_staff=True), required=False, allow_null=True
+    )
+    status = serializers.ChoiceField(choices=Complaint.STATUS_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if attrs['operation'] == 'assign':
+            if 'assigned_department' not in attrs and 'assigned_to' not in attrs:
+                raise serializers.ValidationError('Give assigned_department and/or assigned_to.')
+        elif 'status' not in attrs:
+            raise serializers.ValidationError({'status': 'This field is required.'})
+        return attrs
+
+    def get_values(self):
+        """The field values the operation sets, for complaints.bulk.apply_bulk_change."""
+        data = self.validated_data
+        if data['operation'] == 'status':
+            return {'status': data['status']}
+        return {
+            f'{field}_id': data[field] and data[field].pk
+            for field in ('assigned_department', 'assigned_to') if field in data
+        }
+
+
+class DuplicateCheckSerializer(serializers.Serializer):
+    """Draft complaint fields used to look for existing duplicates before submitting"""
+
+    title = serializers.CharField(max_length=200)
+    description = serializers.CharField(allow_blank=True, default='')
+    category = serializers.ChoiceField(choices=Complaint.CATEGORY_CHOICES)
+    latitude = serializers.DecimalField(max_digits=9, decimal_places=6, required=False, allow_null=True)
+    longitude = serializers.DecimalField(max_digits=9, decimal_places=6, required=False, allow_null=True)
+
+
+class PossibleDuplicateSerializer(serializers.ModelSerializer):
+    """An existing complaint that looks like the one being drafted"""
+
+    date = serializers.SerializerMethodField()
+    upvote_count = serializers.IntegerField(read_only=True)
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Complaint
+        fields = [
+            'id',
+            'complaint_id',
+            'title',
+            'location',
+            'latitude',
+            'longitude',
+            'status',
+            'date',
+            'upvote_count',
+            'similarity',
+        ]
+
+    def get_date(self, obj):
+        return obj.created_at.strftime('%Y-%m-%d')
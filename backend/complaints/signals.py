@@ -1,30 +1,203 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from .models import Complaint
-from django.contrib.auth.models import User
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+from core.cache import invalidate
+from .blobs import release, retain
+from .clusters import apply_deltas, collect_deltas, removal_deltas
+from .duplicates import store_fingerprints
+from .fanout import NOTIFY_FIELDS
+from .images import needs_variants
+from . import routing, sla, stats
+from .models import Complaint, ComplaintImage, ComplaintStatusEvent, Department, Upvote
+from .search import get_search_backend
+from .tasks import describe_changes, fan_out_notifications, process_image
+
+# Sent after complaints are written, by single saves and by bulk paths alike.
+# Arguments: changes, a list of (complaint, changed_fields) pairs where
+# changed_fields maps each changed tracked field to its previous value, and
+# created, True when the complaints were just inserted.
+complaints_changed = Signal()
+
 
 @receiver(post_save, sender=Complaint)
-def create_complaint_notification(sender, instance, created, **kwargs):
+def announce_complaint_change(sender, instance, created, **kwargs):
+    """Turn a single Complaint save into a complaints_changed batch of one."""
+    changed = {} if created else instance.get_changed_fields()
+    if created or changed:
+        complaints_changed.send(sender=Complaint, changes=[(instance, changed)], created=created)
+
+
+@receiver(complaints_changed)
+def queue_complaint_notifications(sender, changes, created, **kwargs):
+    """
+    Notify the people involved in a complaint when it is filed, when its
+    status changes or when it is (re)assigned. The fan-out itself runs on the
+    job queue; the job commits or rolls back with the complaint write.
+    """
+    changes = [
+        (complaint, {field: old for field, old in changed.items() if field in NOTIFY_FIELDS})
+        for complaint, changed in changes
+    ]
+    if not created:
+        changes = [(complaint, changed) for complaint, changed in changes if changed]
+    if changes:
+        fan_out_notifications.enqueue(changes=describe_changes(changes), created=created)
+
+
+@receiver(complaints_changed)
+def update_clusters(sender, changes, created, **kwargs):
+    """Move complaints between map cluster cells as they are filed, re-categorised, moved or change status."""
+    apply_deltas(collect_deltas(changes, created))
+
+
+@receiver(complaints_changed)
+def update_stats(sender, changes, created, **kwargs):
+    """Move complaints between dashboard stats rows as they are filed, change status or are reassigned."""
+    stats.apply_deltas(stats.collect_deltas(changes, created))
+
+
+@receiver(complaints_changed)
+def log_status_events(sender, changes, created, **kwargs):
+    """Append to the status history when complaints are filed, change status or are reassigned."""
+    events = sla.status_events(changes, created)
+    if events:
+        ComplaintStatusEvent.objects.bulk_create(events)
+
+
+@receiver(complaints_changed)
+def update_officer_workloads(sender, changes, created, **kwargs):
+    """Keep AdminProfile.open_count in step with assignments and resolutions."""
+    routing.apply_workload_deltas(routing.workload_deltas(changes, created))
+
+
+@receiver(complaints_changed)
+def update_fingerprints(sender, changes, created, **kwargs):
+    """Keep the duplicate-detection signatures in step with complaint text."""
+    stale = [
+        complaint for complaint, changed in changes
+        if created or 'title' in changed or 'description' in changed
+    ]
+    if stale:
+        store_fingerprints(stale)
+
+
+@receiver(complaints_changed)
+def update_search_index(sender, changes, created, **kwargs):
+    stale = [
+        complaint for complaint, changed in changes
+        if created or {'title', 'description', 'location'} & changed.keys()
+    ]
+    if stale:
+        get_search_backend().index(stale)
+
+
+@receiver(complaints_changed)
+def count_photo_references(sender, changes, created, **kwargs):
+    """Keep MediaBlob reference counts in step with Complaint.image."""
+    for complaint, changed in changes:
+        if created:
+            retain([complaint.image.name])
+        elif 'image' in changed:
+            release([changed['image']])
+            retain([complaint.image.name])
+
+
+@receiver(post_delete, sender=Complaint)
+def release_complaint_photo(sender, instance, **kwargs):
+    # As last saved; a deferred image was never loaded and is left to the collector's own check.
+    release([getattr(instance, '_loaded_values', {}).get('image')])
+
+
+@receiver(post_save, sender=ComplaintImage)
+def retain_extra_photo(sender, instance, created, **kwargs):
+    if created:
+        retain([instance.image.name])
+
+
+@receiver(post_delete, sender=ComplaintImage)
+def release_extra_photo(sender, instance, **kwargs):
+    release([instance.image.name])
+
+
+# Complaint saves arrive through complaints_changed (see announce_complaint_change).
+@receiver(complaints_changed)
+@receiver(post_delete, sender=Complaint)
+@receiver(post_save, sender=ComplaintImage)
+@receiver(post_delete, sender=ComplaintImage)
+@receiver(post_save, sender=Upvote)
+@receiver(post_delete, sender=Upvote)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def invalidate_public_responses(sender, **kwargs):
+    """Retire the cached public feed and tracking responses (see core.cache) after any write they show."""
+    invalidate('complaints')
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_for_user_change(sender, created=False, update_fields=None, **kwargs):
     """
-    Create a notification when a complaint status changes.
-    Logic:
-    - If created: Notify admin (superuser)
-    - If updated: Notify the user who created it (if we had a user field on Complaint)
-    
-    Current Limitation: Complaint model doesn't link to User yet.
-    We will just notify all superusers for now as a demo.
+    Complaint responses show usernames. New users have no complaints yet,
+    and saves that name their fields without `username` (logins) can't have
+    renamed anyone.
     """
+    if not created and (update_fields is None or 'username' in update_fields):
+        invalidate('complaints')
+
+
+@receiver(post_delete, sender=Complaint)
+def remove_from_clusters(sender, instance, **kwargs):
+    apply_deltas(removal_deltas(instance))
+
+
+@receiver(post_delete, sender=Complaint)
+def remove_from_stats(sender, instance, **kwargs):
+    stats.apply_deltas(stats.removal_deltas(instance))
+
+
+@receiver(post_delete, sender=Complaint)
+def release_officer_workload(sender, instance, **kwargs):
+    routing.apply_workload_deltas(routing.removal_deltas(instance))
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def drop_routing_table(sender, **kwargs):
+    routing.invalidate_routing_table()
+
+
+@receiver(post_delete, sender=Department)
+def recount_stats(sender, instance, **kwargs):
+    # Its complaints were unassigned with a bulk update, which sends no signals.
+    stats.rebuild_stats()
+
+
+@receiver(post_delete, sender=Complaint)
+def remove_from_search_index(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=Complaint)
+@receiver(post_save, sender=ComplaintImage)
+def queue_image_variants(sender, instance, **kwargs):
+    """Resize new or replaced photos on the job queue, away from the upload request."""
+    if {'image', 'variants'} - instance.__dict__.keys():
+        return  # deferred; this save didn't load the image
+    if needs_variants(instance.image, instance.variants):
+        process_image.enqueue(model=sender._meta.model_name, id=instance.pk)
+
+
+@receiver(post_save, sender=Upvote)
+def increment_upvote_count(sender, instance, created, **kwargs):
+    """Keep Complaint.upvote_count in step with new Upvote rows."""
     if created:
-        message = f"New complaint submitted: {instance.title} ({instance.complaint_id})"
-    else:
-        message = f"Complaint {instance.complaint_id} status updated to: {instance.status}"
-    
-    # Notify all admins
-    from notifications.models import Notification
-    admins = User.objects.filter(is_superuser=True)
-    for admin in admins:
-        Notification.objects.create(
-            user=admin,
-            complaint=instance,
-            message=message
-        )
+        Complaint.objects.filter(pk=instance.complaint_id).update(upvote_count=F('upvote_count') + 1)
+
+
+@receiver(post_delete, sender=Upvote)
+def decrement_upvote_count(sender, instance, **kwargs):
+    """Keep Complaint.upvote_count in step with deleted Upvote rows (including cascades)."""
+    Complaint.objects.filter(pk=instance.complaint_id, upvote_count__gt=0).update(
+        upvote_count=F('upvote_count') - 1
+    )
@@ -0,0 +1,103 @@
+"""
+Time-in-status and time-to-resolve analytics.
+
+ComplaintStatusEvent holds each complaint's status and assignment history.
+refresh_sla_stats() has the database do the pairing: a LEAD() window over
+each complaint's events gives every stretch of time spent in one status
+with one department, and the first Resolved event gives the time to
+resolve. Both queries come back grouped by department, category and status
+and sorted by duration, so each group's percentiles are computed as it
+streams past instead of collecting every event first. The results replace
+the rows in ComplaintSLAStats, which the SLA endpoint reads as they are.
+"""
+import statistics
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import DurationField, ExpressionWrapper, F, Value, Window
+from django.db.models.functions import Lead, RowNumber
+from django.utils import timezone
+
+from .models import ComplaintSLAStats, ComplaintStatusEvent
+
+PERCENTILES = (50, 90, 99)
+RESOLVED = 'Resolved'
+
+
+def percentiles(durations):
+    """The PERCENTILES of a list of durations in seconds, interpolated linearly."""
+    if len(durations) == 1:
+        return [float(durations[0])] * len(PERCENTILES)
+    cuts = statistics.quantiles(durations, n=100, method='inclusive')
+    return [cuts[p - 1] for p in PERCENTILES]
+
+
+def status_durations():
+    """
+    (department_id, category, status, duration) for every finished stretch in
+    one status and department, grouped and sorted by duration. A complaint's
+    current stretch has no end yet.
+    """
+    history = {'partition_by': [F('complaint_id')], 'order_by': [F('created_at').asc(), F('id').asc()]}
+    events = ComplaintStatusEvent.objects.annotate(
+        duration=ExpressionWrapper(
+            Window(Lead('created_at'), **history) - F('created_at'), output_field=DurationField(),
+        ),
+    )
+    return events.filter(duration__isnull=False).values_list(
+        'department_id', 'category', 'status', 'duration',
+    ).order_by('department_id', 'category', 'status', 'duration')
+
+
+def resolution_durations():
+    """
+    (department_id, category, '', duration) from filing to first resolution,
+    per resolved complaint, grouped and sorted by duration.
+    """
+    resolutions = ComplaintStatusEvent.objects.filter(status=RESOLVED).annotate(
+        nth=Window(RowNumber(), partition_by=[F('complaint_id')], order_by=[F('created_at').asc(), F('id').asc()]),
+        duration=ExpressionWrapper(F('created_at') - F('complaint__created_at'), output_field=DurationField()),
+    ).filter(nth=1)
+    return resolutions.annotate(no_status=Value('')).values_list(
+        'department_id', 'category', 'no_status', 'duration',
+    ).order_by('department_id', 'category', 'duration')
+
+
+@transaction.atomic
+def refresh_sla_stats():
+    """Recompute every ComplaintSLAStats row from the status history. Returns the number of rows."""
+    now = timezone.now()
+    rows = []
+    for metric, durations in (('in_status', status_durations()), ('to_resolve', resolution_durations())):
+        for (department_id, category, status), group in groupby(durations.iterator(), key=lambda row: row[:3]):
+            seconds = [duration.total_seconds() for *_, duration in group]
+            p50, p90, p99 = percentiles(seconds)
+            rows.append(ComplaintSLAStats(
+                metric=metric, status=status, department_id=department_id, category=category,
+                samples=len(seconds), p50=p50, p90=p90, p99=p99, computed_at=now,
+            ))
+    ComplaintSLAStats.objects.all().delete()
+    ComplaintSLAStats.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def status_events(changes, created):
+    """The ComplaintStatusEvent rows to log for a complaints_changed batch."""
+    events = []
+    for complaint, changed in changes:
+        if created:
+            previous, at = '', complaint.created_at
+        elif {'status', 'assigned_department_id', 'assigned_to_id'} & changed.keys():
+            previous, at = changed.get('status', complaint.status), timezone.now()
+        else:
+            continue
+        events.append(ComplaintStatusEvent(
+            complaint_id=complaint.pk,
+            status=complaint.status,
+            previous_status=previous,
+            category=complaint.category,
+            department_id=complaint.assigned_department_id,
+            assigned_to_id=complaint.assigned_to_id,
+            created_at=at,
+        ))
+    return events
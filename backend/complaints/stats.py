@@ -0,0 +1,128 @@
+"""
+Precomputed dashboard statistics.
+
+Every complaint counts towards one ComplaintStats row: the row for the day
+it was filed, its category, its status and its assigned department.
+Writes apply the difference a change makes to those rows, so the stats
+endpoint sums a few hundred rollup rows instead of counting the
+complaints table.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Complaint, ComplaintStats, Department
+
+STATS_FIELDS = ('category', 'status', 'assigned_department_id')
+
+
+def _add(deltas, day, values, sign):
+    deltas[(day, *values)] += sign
+
+
+def _day(created_at):
+    return timezone.localdate(created_at) if timezone.is_aware(created_at) else created_at.date()
+
+
+def collect_deltas(changes, created):
+    """Stats deltas for a complaints_changed batch."""
+    deltas = defaultdict(int)
+    for complaint, changed in changes:
+        current = tuple(getattr(complaint, field) for field in STATS_FIELDS)
+        day = _day(complaint.created_at)
+        if created:
+            _add(deltas, day, current, 1)
+        elif any(field in changed for field in STATS_FIELDS):
+            previous = tuple(changed.get(field, value) for field, value in zip(STATS_FIELDS, current))
+            _add(deltas, day, previous, -1)
+            _add(deltas, day, current, 1)
+    return deltas
+
+
+def removal_deltas(complaint):
+    """Stats deltas for a deleted complaint, as it was last saved."""
+    deltas = defaultdict(int)
+    saved = {**complaint.__dict__, **getattr(complaint, '_loaded_values', {})}
+    _add(deltas, _day(saved['created_at']), tuple(saved.get(field) for field in STATS_FIELDS), -1)
+    return deltas
+
+
+def apply_deltas(deltas):
+    """Add the deltas to their stats rows, creating and dropping rows as needed."""
+    for (day, category, status, department_id), count in deltas.items():
+        if not count:
+            continue
+        key = {'day': day, 'category': category, 'status': status, 'assigned_department_id': department_id}
+        rows = ComplaintStats.objects.filter(**key)
+        with transaction.atomic():
+            if rows.update(count=F('count') + count):
+                if count < 0:
+                    rows.filter(count__lte=0).delete()
+                continue
+            try:
+                with transaction.atomic():
+                    ComplaintStats.objects.create(**key, count=count)
+            except IntegrityError:
+                # Another writer created the row first.
+                rows.update(count=F('count') + count)
+
+
+@transaction.atomic
+def rebuild_stats():
+    """Recompute every stats row from the complaints table. Returns the number of rows."""
+    ComplaintStats.objects.all().delete()
+    groups = (
+        Complaint.objects.annotate(day=TruncDate('created_at'))
+        .values('day', *STATS_FIELDS)
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    rows = [
+        ComplaintStats(
+            day=group['day'],
+            category=group['category'],
+            status=group['status'],
+            assigned_department_id=group['assigned_department_id'],
+            count=group['total'],
+        )
+        for group in groups
+    ]
+    ComplaintStats.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def summarize_stats(date_from=None, date_to=None, category=None, status=None, department=None):
+    """
+    Complaint totals by category, status, department and day, from the
+    rollup rows matching the filters. `department` is an id, or 0 for
+    unassigned complaints.
+    """
+    rows = ComplaintStats.objects.all()
+    if date_from:
+        rows = rows.filter(day__gte=date_from)
+    if date_to:
+        rows = rows.filter(day__lte=date_to)
+    if category:
+        rows = rows.filter(category=category)
+    if status:
+        rows = rows.filter(status=status)
+    if department is not None:
+        rows = rows.filter(assigned_department_id=department or None)
+
+    def totals(field):
+        return rows.values(field).annotate(total=Sum('count')).order_by(field).values_list(field, 'total')
+
+    names = dict(Department.objects.values_list('id', 'name'))
+    return {
+        'total': rows.aggregate(total=Sum('count'))['total'] or 0,
+        'by_category': dict(totals('category')),
+        'by_status': dict(totals('status')),
+        'by_department': [
+            {'id': pk, 'name': names.get(pk), 'count': total}
+            for pk, total in totals('assigned_department_id')
+        ],
+        'by_day': [{'day': day, 'count': total} for day, total in totals('day')],
+    }
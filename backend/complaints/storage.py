@@ -0,0 +1,77 @@
+"""
+Content-addressed storage for complaint photos.
+
+Files are named after the SHA-256 of their bytes, which is computed while
+the upload is written to disk:
+
+    complaint_images/<sha256><ext>
+
+Identical uploads therefore end up as one file on disk. A name never
+points at different content, so the URLs can be cached indefinitely.
+The rows that reference each file are counted in MediaBlob (see
+complaints.blobs), and `manage.py collect_media_garbage` deletes files
+nobody references any more.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME = re.compile(r'^[0-9a-f]{64}(\.[a-z0-9]+)?$')
+
+
+def is_content_addressed(name):
+    return bool(HASHED_NAME.match(os.path.basename(name)))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save(), so there is no
+        # need for Django's random suffixes.
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        target_dir = self.path(directory)
+        os.makedirs(target_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=target_dir, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+
+            final_name = os.path.join(directory, digest.hexdigest() + extension).replace('\\', '/')
+            final_path = self.path(final_name)
+            if os.path.exists(final_path):
+                # Same bytes are already stored; keep the existing file. Touch it
+                # so collect_media_garbage's grace period starts again: the
+                # caller is about to reference it, maybe after it went unused.
+                os.unlink(temp_path)
+                os.utime(final_path)
+            else:
+                os.replace(temp_path, final_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(final_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return final_name
+
+
+image_storage = ContentAddressedStorage()
+
+
+def get_image_storage():
+    return image_storage
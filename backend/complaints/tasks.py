@@ -0,0 +1,55 @@
+from core.cache import invalidate
+from jobs.registry import task
+
+from . import sla
+from .fanout import NOTIFY_FIELDS, fan_out_complaint_notifications
+from .images import needs_variants, render_variants
+from .models import Complaint, ComplaintImage
+
+IMAGE_MODELS = {'complaint': Complaint, 'complaintimage': ComplaintImage}
+
+
+def describe_changes(changes):
+    """Turn (complaint, changed_fields) pairs into a JSON payload for fan_out_notifications."""
+    return [
+        {
+            'id': complaint.pk,
+            'changed': changed,
+            # Tracked values as of the change, so a later edit can't alter the message.
+            'state': {field: getattr(complaint, field) for field in NOTIFY_FIELDS},
+        }
+        for complaint, changed in changes
+    ]
+
+
+@task('complaints.fan_out_notifications')
+def fan_out_notifications(changes, created):
+    """Background half of the notification fan-out queued by complaints.signals."""
+    complaints = Complaint.objects.in_bulk([change['id'] for change in changes])
+    batch = []
+    for change in changes:
+        complaint = complaints.get(change['id'])
+        if complaint is None:
+            # Deleted before the job ran.
+            continue
+        for field, value in change['state'].items():
+            setattr(complaint, field, value)
+        batch.append((complaint, change['changed']))
+    fan_out_complaint_notifications(batch, created)
+
+
+@task('complaints.process_image')
+def process_image(model, id):
+    """Render the resized variants of a complaint photo (model is 'complaint' or 'complaintimage')."""
+    Model = IMAGE_MODELS[model]
+    instance = Model.objects.filter(pk=id).only('image', 'variants').first()
+    if instance is None or not needs_variants(instance.image, instance.variants):
+        return
+    Model.objects.filter(pk=id).update(variants=render_variants(instance.image))
+    invalidate('complaints')
+
+
+@task('complaints.refresh_sla_stats')
+def refresh_sla_stats():
+    """Queueable form of `manage.py refresh_sla_stats`, for scheduled runs."""
+    sla.refresh_sla_stats()
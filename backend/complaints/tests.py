@@ -1,3 +1,1252 @@
-from django.test import TestCase
+import csv
+import hashlib
+import json
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from core.cache import get_version
+from jobs.models import Job
+from jobs.worker import run_pending
+from notifications.models import Notification
+
+from . import blobs, geo, routing, search
+from .images import variant_dir
+from .models import (
+    AdminProfile, Complaint, ComplaintCluster, ComplaintFingerprint, ComplaintImage, ComplaintSequence,
+    ComplaintSLAStats, ComplaintStats, ComplaintStatusEvent, Department, MediaBlob, Upvote,
+)
+from .row_serializers import ComplaintListRowSerializer, PublicComplaintRowSerializer
+from .serializers import ComplaintListSerializer, PublicComplaintSerializer
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+# Test transactions never commit, so cached responses would never be invalidated.
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def tearDownModule():
+    shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+
+def make_complaint(user=None, **kwargs):
+    defaults = {
+        'title': 'Pothole on Main Street',
+        'category': 'road',
+        'description': 'Large pothole causing traffic issues',
+        'location': 'Main Street, Ward 5',
+    }
+    defaults.update(kwargs)
+    return Complaint.objects.create(user=user, **defaults)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, CACHES=NO_CACHE)
+class PublicFeedTests(APITestCase):
+    url = '/api/complaints/public/'
+
+    def setUp(self):
+        self.citizen = User.objects.create_user('citizen', password='password123')
+        self.voters = [User.objects.create_user(f'voter{i}', password='password123') for i in range(3)]
+
+    def add_complaints(self, count):
+        for i in range(count):
+            complaint = make_complaint(user=self.citizen, title=f'Complaint {i}')
+            ComplaintImage.objects.create(
+                complaint=complaint,
+                image=SimpleUploadedFile(f'c{i}.jpg', b'jpeg', content_type='image/jpeg'),
+            )
+            for voter in self.voters[:i % 4]:
+                Upvote.objects.create(user=voter, complaint=complaint)
+
+    def count_feed_queries(self, params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_constant_per_page(self):
+        self.client.force_authenticate(self.voters[0])
+        for sort in ('recent', 'oldest', 'most_upvoted'):
+            with self.subTest(sort=sort):
+                Complaint.objects.all().delete()
+                self.add_complaints(5)
+                small = self.count_feed_queries({'page_size': 5, 'sort': sort})
+                self.add_complaints(40)
+                large = self.count_feed_queries({'page_size': 40, 'sort': sort})
+                self.assertEqual(small, large)
+
+    def test_unpaginated_query_count_does_not_grow_with_table(self):
+        self.add_complaints(3)
+        small = self.count_feed_queries({})
+        self.add_complaints(20)
+        self.assertEqual(self.count_feed_queries({}), small)
+
+    def test_cursor_walks_every_complaint_once(self):
+        self.add_complaints(13)
+        for sort in ('recent', 'oldest', 'most_upvoted'):
+            with self.subTest(sort=sort):
+                seen = []
+                response = self.client.get(self.url, {'page_size': 4, 'sort': sort})
+                while True:
+                    seen.extend(item['id'] for item in response.data['results'])
+                    if not response.data['next']:
+                        break
+                    response = self.client.get(response.data['next'])
+                self.assertEqual(len(seen), 13)
+                self.assertEqual(len(set(seen)), 13)
+
+    def test_feed_reports_upvotes_for_caller(self):
+        self.add_complaints(4)
+        self.client.force_authenticate(self.voters[0])
+        response = self.client.get(self.url, {'page_size': 10, 'sort': 'most_upvoted'})
+        results = response.data['results']
+        self.assertEqual([item['upvote_count'] for item in results], [3, 2, 1, 0])
+        self.assertEqual([item['is_upvoted'] for item in results], [True, True, True, False])
+        self.assertEqual(results[0]['submitted_by'], 'citizen')
+        self.assertEqual(len(results[0]['images']), 1)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class UpvoteCounterTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('voter', password='password123')
+        self.complaint = make_complaint()
+
+    def test_toggle_upvote_maintains_counter(self):
+        self.client.force_authenticate(self.user)
+        url = f'/api/complaints/{self.complaint.pk}/upvote/'
+        response = self.client.post(url)
+        self.assertEqual(response.data, {'upvoted': True, 'upvote_count': 1})
+        response = self.client.post(url)
+        self.assertEqual(response.data, {'upvoted': False, 'upvote_count': 0})
+
+    def test_stale_instance_save_keeps_counter(self):
+        stale = Complaint.objects.get(pk=self.complaint.pk)
+        Upvote.objects.create(user=self.user, complaint=self.complaint)
+        stale.status = 'In Progress'
+        stale.save()
+        self.complaint.refresh_from_db()
+        self.assertEqual(self.complaint.upvote_count, 1)
+        self.assertEqual(self.complaint.status, 'In Progress')
+
+    def test_partially_loaded_instance_saves_only_loaded_fields(self):
+        partial = Complaint.objects.only('title').get(pk=self.complaint.pk)
+        with CaptureQueriesContext(connection) as queries:
+            partial.title = 'Renamed'
+            partial.save()
+        update = next(q['sql'] for q in queries if q['sql'].startswith('UPDATE "complaints_complaint"'))
+        self.assertIn('"title"', update)
+        self.assertNotIn('"description"', update)
+        self.complaint.refresh_from_db()
+        self.assertEqual(self.complaint.title, 'Renamed')
+
+    def test_cascaded_delete_decrements_counter(self):
+        Upvote.objects.create(user=self.user, complaint=self.complaint)
+        self.user.delete()
+        self.complaint.refresh_from_db()
+        self.assertEqual(self.complaint.upvote_count, 0)
+
+    def test_reconcile_command_fixes_drift(self):
+        Upvote.objects.create(user=self.user, complaint=self.complaint)
+        Complaint.objects.filter(pk=self.complaint.pk).update(upvote_count=7)
+        out = StringIO()
+        call_command('reconcile_upvote_counts', stdout=out)
+        self.complaint.refresh_from_db()
+        self.assertEqual(self.complaint.upvote_count, 1)
+        self.assertIn('1 complaint(s) fixed', out.getvalue())
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'response-cache-tests',
+}})
+class ResponseCacheTests(APITestCase):
+    url = '/api/complaints/public/'
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create_user('voter')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.complaint = make_complaint()
+
+    def get(self, url=None, params=None):
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response['X-Cache'], response.json()
+
+    def test_hit_skips_database_work(self):
+        self.assertEqual(self.get()[0], 'MISS')
+        with self.assertNumQueries(2):  # the namespace version and the ETag aggregate
+            outcome, data = self.get()
+        self.assertEqual(outcome, 'HIT')
+        self.assertEqual(data[0]['id'], self.complaint.pk)
+
+    def test_equivalent_queries_share_an_entry(self):
+        self.get(params={'category': 'road', 'date_from': '2020-01-01'})
+        same = {'date_from': '2020-01-01', 'category': 'road', 'sort': 'recent', 'q': ''}
+        self.assertEqual(self.get(params=same)[0], 'HIT')
+        self.assertEqual(self.get(params={'category': 'road', 'sort': 'oldest'})[0], 'MISS')
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'cdn.example.org'], MEDIA_ROOT=TEST_MEDIA_ROOT)
+    def test_entries_are_per_host(self):
+        Complaint.objects.filter(pk=self.complaint.pk).update(image='complaint_images/a.jpg')
+        self.assertEqual(self.get()[0], 'MISS')
+        response = self.client.get(self.url, HTTP_HOST='cdn.example.org')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertTrue(response.json()[0]['image'].startswith('http://cdn.example.org/'))
+        self.assertEqual(self.client.get(self.url, HTTP_HOST='cdn.example.org', secure=True)['X-Cache'], 'MISS')
+        self.assertEqual(self.get()[0], 'HIT')
+
+    def test_writes_invalidate(self):
+        track_url = f'/api/complaints/track/{self.complaint.complaint_id}/'
+        self.get()
+        self.get(track_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Upvote.objects.create(user=self.user, complaint=self.complaint)
+        outcome, data = self.get()
+        self.assertEqual((outcome, data[0]['upvote_count']), ('MISS', 1))
+        self.assertEqual(self.get(track_url)[0], 'MISS')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.complaint.status = 'Resolved'
+            self.complaint.save()
+        outcome, data = self.get(track_url)
+        self.assertEqual((outcome, data['status']), ('MISS', 'Resolved'))
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertNotIn('X-Cache', response)
+        self.assertEqual(response.data[0]['is_upvoted'], False)
+
+    def test_stats(self):
+        self.get()
+        self.get()
+        self.get(params={'sort': 'oldest'})
+        admin = User.objects.create_user('admin', is_staff=True)
+        self.client.force_authenticate(admin)
+        stats = self.client.get('/api/cache/stats/').data['complaints']
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_ratio']), (1, 2, 0.333))
+
+    def test_file_based_cache(self):
+        with self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': tempfile.mkdtemp(dir=TEST_MEDIA_ROOT),
+        }}):
+            self.assertEqual(self.get()[0], 'MISS')
+            self.assertEqual(self.get()[0], 'HIT')
+
+
+@override_settings(CACHES=NO_CACHE)
+class ConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('citizen')
+        self.voter = User.objects.create_user('voter')
+        self.complaint = make_complaint(user=self.user)
+        self.client.force_authenticate(self.user)
+
+    def test_detail_revalidates_without_serializing(self):
+        url = f'/api/complaints/{self.complaint.pk}/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        self.complaint.description = 'Now twice as deep'
+        self.complaint.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_upvote_changes_public_etags(self):
+        # Upvotes don't touch updated_at; the cache version catches them.
+        self.client.force_authenticate(None)
+        urls = [f'/api/complaints/track/{self.complaint.complaint_id}/', '/api/complaints/public/']
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        with self.captureOnCommitCallbacks(execute=True):
+            Upvote.objects.create(user=self.voter, complaint=self.complaint)
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_complaint_save_bumps_the_version_once(self):
+        version = get_version('complaints')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.complaint.status = 'In Progress'
+            self.complaint.save()
+        self.assertEqual(get_version('complaints'), version + 1)
+
+    def test_related_names_change_etags(self):
+        water = Department.objects.get(slug='water-supply')
+        Complaint.objects.filter(pk=self.complaint.pk).update(assigned_department=water, assigned_to=self.user)
+        url = '/api/complaints/'
+        etag = self.client.get(url)['ETag']
+        # Logging in saves the user too, but can't change what the list shows.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_login(self.voter)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            water.name = 'Water Board'
+            water.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['assigned_department_name'], 'Water Board')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.username = 'resident'
+            self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['assigned_to_name'], 'resident')
+
+    def test_etag_depends_on_caller_and_query(self):
+        etag = self.client.get('/api/complaints/')['ETag']
+        self.assertEqual(self.client.get('/api/complaints/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/api/complaints/?page=1', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.client.force_authenticate(self.voter)
+        self.assertEqual(self.client.get('/api/complaints/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ComplaintIdTests(APITestCase):
+
+    def test_ids_keep_increasing_past_999(self):
+        year = make_complaint().complaint_id.split('-')[1]
+        ComplaintSequence.objects.filter(year=year).update(last_value=999)
+        self.assertEqual(make_complaint().complaint_id, f'HA-{year}-1000')
+        self.assertEqual(make_complaint().complaint_id, f'HA-{year}-1001')
+
+    def test_reserve_block(self):
+        self.assertEqual(list(ComplaintSequence.reserve(2030, count=5)), [1, 2, 3, 4, 5])
+        self.assertEqual(list(ComplaintSequence.reserve(2030, count=3)), [6, 7, 8])
+        self.assertEqual(list(ComplaintSequence.reserve(2031)), [1])
+
+
+class ComplaintIdConcurrencyTests(TransactionTestCase):
+
+    def test_parallel_reservations_never_overlap(self):
+        def reserve_many(_):
+            try:
+                return [n for _ in range(20) for n in ComplaintSequence.reserve(2030, count=3)]
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            batches = list(pool.map(reserve_many, range(8)))
+
+        numbers = [n for batch in batches for n in batch]
+        self.assertEqual(len(numbers), 8 * 20 * 3)
+        self.assertEqual(sorted(numbers), list(range(1, len(numbers) + 1)))
+
+
+@override_settings(CACHES=NO_CACHE)
+class SpatialFilterTests(APITestCase):
+    url = '/api/complaints/public/'
+
+    def setUp(self):
+        # Around Kathmandu: ~1.1km between ratna_park and thamel, ~5km to bhaktapur_road.
+        self.ratna_park = make_complaint(title='Ratna Park', latitude='27.704000', longitude='85.315000')
+        self.thamel = make_complaint(title='Thamel', latitude='27.714000', longitude='85.312000')
+        self.bhaktapur_road = make_complaint(title='Bhaktapur Road', latitude='27.690000', longitude='85.365000')
+        self.unlocated = make_complaint(title='Somewhere')
+
+    def titles(self, response):
+        self.assertEqual(response.status_code, 200)
+        return sorted(c['title'] for c in response.data)
+
+    def test_geohash_follows_coordinates(self):
+        self.assertEqual(self.ratna_park.geohash[:5], 'tuutt')
+        self.assertEqual(self.unlocated.geohash, '')
+        self.thamel.latitude = self.bhaktapur_road.latitude
+        self.thamel.longitude = self.bhaktapur_road.longitude
+        self.thamel.save(update_fields=['latitude', 'longitude'])
+        self.thamel.refresh_from_db()
+        self.assertEqual(self.thamel.geohash, self.bhaktapur_road.geohash)
+
+    def test_bbox(self):
+        response = self.client.get(self.url, {'bbox': '85.30,27.70,85.32,27.72'})
+        self.assertEqual(self.titles(response), ['Ratna Park', 'Thamel'])
+
+    def test_near(self):
+        response = self.client.get(self.url, {'near': '27.704,85.315', 'radius': 500})
+        self.assertEqual(self.titles(response), ['Ratna Park'])
+        response = self.client.get(self.url, {'near': '27.704,85.315', 'radius': 2000})
+        self.assertEqual(self.titles(response), ['Ratna Park', 'Thamel'])
+        response = self.client.get(self.url, {'near': '27.704,85.315', 'radius': 10000})
+        self.assertEqual(self.titles(response), ['Bhaktapur Road', 'Ratna Park', 'Thamel'])
+
+    def test_near_filters_in_one_query(self):
+        with self.assertNumQueries(0):
+            queryset = geo.filter_near(Complaint.objects.all(), 27.704, 85.315, 2000)
+        with self.assertNumQueries(1):
+            self.assertEqual(sorted(queryset.values_list('title', flat=True)), ['Ratna Park', 'Thamel'])
+
+    def test_invalid_parameters(self):
+        for params in ({'bbox': '1,2,3'}, {'bbox': '85.32,27.70,85.30,27.72'},
+                       {'near': 'a,b'}, {'near': '27.7,85.3', 'radius': '0'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+class ClusterTests(APITestCase):
+    url = '/api/complaints/clusters/'
+    bbox = '85.25,27.65,85.40,27.75'
+
+    def setUp(self):
+        self.complaints = [
+            make_complaint(latitude='27.704000', longitude='85.315000'),
+            make_complaint(latitude='27.705000', longitude='85.316000'),
+            make_complaint(latitude='27.690000', longitude='85.365000', category='waste'),
+        ]
+
+    def snapshot(self):
+        return {
+            (c.precision, c.cell, c.category, c.status): (c.count, round(c.latitude_sum, 6), round(c.longitude_sum, 6))
+            for c in ComplaintCluster.objects.all()
+        }
+
+    def get(self, **params):
+        response = self.client.get(self.url, {'bbox': self.bbox, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_zoomed_out_collapses_to_one_cluster(self):
+        clusters = self.get(zoom=5)
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(clusters[0]['count'], 3)
+        self.assertAlmostEqual(clusters[0]['latitude'], (27.704 + 27.705 + 27.69) / 3, places=5)
+
+    def test_zoomed_in_splits_clusters_and_filters(self):
+        self.assertEqual(sorted(c['count'] for c in self.get(zoom=14)), [1, 2])
+        self.assertEqual([c['count'] for c in self.get(zoom=14, category='waste')], [1])
+
+    def test_incremental_updates_match_rebuild(self):
+        first, second, third = self.complaints
+        first.status = 'Resolved'
+        first.save()
+        second.latitude, second.longitude = '27.720000', '85.330000'
+        second.save()
+        third.category = 'road'
+        third.save()
+        third.delete()
+        make_complaint(latitude='27.700000', longitude='85.300000')
+        incremental = self.snapshot()
+        call_command('rebuild_complaint_clusters', stdout=StringIO())
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(sum(c['count'] for c in self.get(zoom=5)), 3)
+        self.assertEqual(sum(c['count'] for c in self.get(zoom=5, status='Resolved')), 1)
+
+    def test_requires_bbox_and_zoom(self):
+        self.assertEqual(self.client.get(self.url, {'zoom': 10}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'bbox': self.bbox, 'zoom': 'x'}).status_code, 400)
+
+
+class StatsTests(APITestCase):
+    url = '/api/complaints/stats/'
+
+    def setUp(self):
+        self.roads = Department.objects.create(name='Roads Test', slug='roads-test', categories='road')
+        self.water = Department.objects.create(name='Water Test', slug='water-test', categories='water')
+        self.complaints = [
+            make_complaint(),
+            make_complaint(category='water'),
+            make_complaint(category='water', assigned_department=self.water),
+        ]
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+    def snapshot(self):
+        return {
+            (s.day, s.category, s.status, s.assigned_department_id): s.count
+            for s in ComplaintStats.objects.all()
+        }
+
+    def test_incremental_updates_match_rebuild(self):
+        first, second, third = self.complaints
+        first.status = 'Resolved'
+        first.save()
+        second.assigned_department = self.water
+        second.status = 'Assigned'
+        second.save()
+        third.category = 'road'
+        third.assigned_department = self.roads
+        third.save()
+        first.delete()
+        make_complaint(category='waste')
+        incremental = self.snapshot()
+        call_command('rebuild_complaint_stats', stdout=StringIO())
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_endpoint_totals(self):
+        self.complaints[0].status = 'Resolved'
+        self.complaints[0].save()
+        data = self.client.get(self.url).data
+        self.assertEqual(data['total'], 3)
+        self.assertEqual(data['by_category'], {'road': 1, 'water': 2})
+        self.assertEqual(data['by_status'], {'Resolved': 1, 'Submitted': 2})
+        self.assertEqual(
+            [(d['name'], d['count']) for d in data['by_department']], [(None, 2), ('Water Test', 1)],
+        )
+        self.assertEqual(self.client.get(self.url, {'department': 'none'}).data['total'], 2)
+        self.assertEqual(self.client.get(self.url, {'category': 'water', 'status': 'Submitted'}).data['total'], 2)
+        self.assertEqual(self.client.get(self.url, {'date_to': '2000-01-01'}).data['total'], 0)
+        self.assertEqual(self.client.get(self.url, {'date_from': 'yesterday'}).status_code, 400)
+
+    def test_deleting_a_department_recounts(self):
+        self.water.delete()
+        data = self.client.get(self.url).data
+        self.assertEqual([(d['id'], d['count']) for d in data['by_department']], [(None, 3)])
+
+    def test_unassigned_rows_are_unique_too(self):
+        row = ComplaintStats.objects.get(category='road', assigned_department__isnull=True)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ComplaintStats.objects.create(day=row.day, category='road', status=row.status, count=1)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(User.objects.create_user('citizen'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class SLATests(APITestCase):
+    url = '/api/complaints/sla/'
+
+    def setUp(self):
+        self.water = Department.objects.create(name='Water Test', slug='water-test', categories='water')
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+    def handle(self, complaint, hours_waiting, hours_working):
+        """Walk a complaint through to Resolved and backdate its history."""
+        complaint.assigned_department = self.water
+        complaint.status = 'In Progress'
+        complaint.save()
+        complaint.status = 'Resolved'
+        complaint.save()
+        start = timezone.now() - timedelta(days=10)
+        Complaint.objects.filter(pk=complaint.pk).update(created_at=start)
+        times = [start, start + timedelta(hours=hours_waiting), start + timedelta(hours=hours_waiting + hours_working)]
+        for event, at in zip(complaint.status_events.all(), times):
+            ComplaintStatusEvent.objects.filter(pk=event.pk).update(created_at=at)
+
+    def test_history_is_logged(self):
+        complaint = make_complaint(category='water')
+        complaint.title = 'Renamed'
+        complaint.save()
+        self.handle(complaint, 1, 1)
+        self.assertEqual(
+            [(e.previous_status, e.status, e.department_id) for e in complaint.status_events.all()],
+            [('', 'Submitted', None), ('Submitted', 'In Progress', self.water.pk), ('In Progress', 'Resolved', self.water.pk)],
+        )
+
+    def test_percentiles_per_department_and_category(self):
+        for hours in (1, 2, 3, 4, 10):
+            self.handle(make_complaint(category='water'), hours, 2)
+        self.assertIn('Computed 3 SLA row(s)', self.refresh())
+        results = {(r['metric'], r['status']): r for r in self.client.get(self.url).data['results']}
+        submitted = results[('in_status', 'Submitted')]
+        self.assertEqual((submitted['department'], submitted['samples']), (None, 5))
+        for percentile, hours in (('p50', 3), ('p90', 7.6), ('p99', 9.76)):
+            self.assertAlmostEqual(submitted[percentile], hours * 3600)
+        self.assertEqual(results[('in_status', 'In Progress')]['p99'], 2 * 3600.0)
+        resolve = results[('to_resolve', None)]
+        self.assertEqual((resolve['department']['name'], resolve['category']), ('Water Test', 'water'))
+        self.assertEqual(resolve['p50'], 5 * 3600.0)
+        self.assertEqual(len(self.client.get(self.url, {'metric': 'to_resolve'}).data['results']), 1)
+
+    def test_single_sample(self):
+        self.handle(make_complaint(), 5, 1)
+        self.refresh()
+        row = ComplaintSLAStats.objects.get(metric='to_resolve')
+        self.assertEqual((row.p50, row.p99), (6 * 3600.0, 6 * 3600.0))
+
+    def refresh(self):
+        out = StringIO()
+        call_command('refresh_sla_stats', stdout=out)
+        return out.getvalue()
+
+
+class RoutingTests(APITestCase):
+    url = '/api/complaints/'
+
+    def setUp(self):
+        self.addCleanup(routing.invalidate_routing_table)
+        self.water = Department.objects.get(slug='water-supply')
+        self.officers = [User.objects.get(username='water_admin')]
+        for name in ('water_officer1', 'water_officer2'):
+            officer = User.objects.create_user(name, is_staff=True)
+            AdminProfile.objects.create(user=officer, department=self.water)
+            self.officers.append(officer)
+        self.client.force_authenticate(User.objects.create_user('citizen'))
+
+    def file(self, category='water'):
+        response = self.client.post(self.url, {
+            'title': 'No water', 'category': category, 'description': 'Dry taps', 'location': 'Ward 3',
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        return Complaint.objects.get(pk=response.data['id'])
+
+    def open_counts(self):
+        return [AdminProfile.objects.get(user=officer).open_count for officer in self.officers]
+
+    def test_new_complaints_are_routed_to_least_loaded_officer(self):
+        complaints = [self.file() for _ in range(4)]
+        self.assertEqual({c.assigned_department_id for c in complaints}, {self.water.pk})
+        self.assertEqual({c.status for c in complaints}, {'Assigned'})
+        self.assertEqual([c.assigned_to for c in complaints], [*self.officers, self.officers[0]])
+        self.assertEqual(self.open_counts(), [2, 1, 1])
+
+    def test_open_counts_follow_resolution_and_reassignment(self):
+        first, second = self.file(), self.file()
+        first.status = 'Resolved'
+        first.save()
+        second.assigned_to = self.officers[2]
+        second.save()
+        self.assertEqual(self.open_counts(), [0, 0, 1])
+        second.delete()
+        self.assertEqual(self.open_counts(), [0, 0, 0])
+
+    def test_department_changes_update_routing(self):
+        self.assertEqual(self.file('other').assigned_department.slug, 'general-administration')
+        self.water.categories = 'water,other'
+        self.water.save()
+        Department.objects.filter(slug='general-administration').delete()
+        self.assertEqual(self.file('other').assigned_department, self.water)
+
+    def test_explicit_assignment_is_kept(self):
+        roads = Department.objects.get(slug='road-department')
+        response = self.client.post(self.url, {
+            'title': 'No water', 'category': 'water', 'description': 'Dry taps', 'location': 'Ward 3',
+            'assigned_department': roads.pk,
+        })
+        complaint = Complaint.objects.get(pk=response.data['id'])
+        self.assertEqual((complaint.assigned_department, complaint.assigned_to), (roads, None))
+
+
+class BulkChangeTests(APITestCase):
+    url = '/api/complaints/bulk/'
+
+    def setUp(self):
+        self.water = Department.objects.get(slug='water-supply')
+        self.officer = User.objects.get(username='water_admin')
+        self.citizen = User.objects.create_user('citizen')
+        self.client.force_authenticate(User.objects.create_superuser('triage', 'triage@example.com', None))
+
+    def file(self, count):
+        return [make_complaint(user=self.citizen, latitude='27.7', longitude='85.3').pk for _ in range(count)]
+
+    def post(self, ids, **body):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, {'ids': ids, **body}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data, len(ctx.captured_queries)
+
+    def test_assign_in_bulk(self):
+        ids = self.file(3)
+        Complaint.objects.filter(pk=ids[0]).update(status='In Progress')
+        run_pending()
+        Job.objects.all().delete()
+        data, _ = self.post([*ids, 0], operation='assign', assigned_department=self.water.pk, assigned_to=self.officer.pk)
+        self.assertEqual(data['updated'], 3)
+        self.assertEqual(data['results'][-1], {'id': 0, 'result': 'not_found'})
+        self.assertEqual(
+            list(Complaint.objects.filter(pk__in=ids).order_by('pk').values_list('status', 'assigned_to')),
+            [('In Progress', self.officer.pk), ('Assigned', self.officer.pk), ('Assigned', self.officer.pk)],
+        )
+        self.assertEqual(ComplaintStatusEvent.objects.filter(department=self.water).count(), 3)
+        self.assertEqual(AdminProfile.objects.get(user=self.officer).open_count, 3)
+        self.assertEqual(Job.objects.filter(task='complaints.fan_out_notifications').count(), 1)
+        run_pending()
+        self.assertEqual(Notification.objects.filter(user=self.citizen).count(), 3)
+
+        data, _ = self.post(ids[:1], operation='assign', assigned_to=self.officer.pk)
+        self.assertEqual(data['results'], [{'id': ids[0], 'result': 'unchanged'}])
+
+    def test_status_change_keeps_derived_data_in_step(self):
+        ids = self.file(4)
+        self.post(ids[:2], operation='status', status='Resolved')
+        self.assertEqual(Complaint.objects.filter(status='Resolved').count(), 2)
+        clusters, stats = self.cluster_snapshot(), list(ComplaintStats.objects.values_list('status', 'count').order_by('status'))
+        call_command('rebuild_complaint_clusters', stdout=StringIO())
+        call_command('rebuild_complaint_stats', stdout=StringIO())
+        self.assertEqual(clusters, self.cluster_snapshot())
+        self.assertEqual(stats, [('Resolved', 2), ('Submitted', 2)])
+
+    def cluster_snapshot(self):
+        return set(ComplaintCluster.objects.values_list('precision', 'cell', 'status', 'count'))
+
+    def test_query_count_does_not_grow_with_ids(self):
+        first, few, many = self.file(1), self.file(3), self.file(40)
+        # The first move creates the In Progress cluster and stats rows.
+        self.post(first, operation='status', status='In Progress')
+        self.assertEqual(
+            self.post(few, operation='status', status='In Progress')[1],
+            self.post(many, operation='status', status='In Progress')[1],
+        )
+
+    def test_validation(self):
+        self.assertEqual(self.client.post(self.url, {'ids': [1], 'operation': 'assign'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(self.url, {'ids': [1], 'operation': 'status'}, format='json').status_code, 400)
+        response = self.client.post(
+            self.url, {'ids': [1], 'operation': 'assign', 'assigned_to': self.citizen.pk}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(self.citizen)
+        self.assertEqual(self.client.post(self.url, {'ids': [1], 'operation': 'status', 'status': 'Resolved'}, format='json').status_code, 403)
+
+
+class ExportTests(APITestCase):
+    url = '/api/complaints/export/'
+
+    def setUp(self):
+        citizen = User.objects.create_user('citizen')
+        water = Department.objects.get(slug='water-supply')
+        make_complaint(user=citizen, title='Pothole, "deep"', latitude='27.700000', longitude='85.300000')
+        make_complaint(category='water', assigned_department=water)
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+    def fetch(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, body = self.fetch()
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual([row['title'] for row in rows], ['Pothole, "deep"', 'Pothole on Main Street'])
+        self.assertEqual((rows[0]['submitted_by'], rows[0]['latitude'], rows[0]['department']), ('citizen', '27.700000', ''))
+        self.assertEqual(rows[1]['department'], 'Water Supply')
+
+    def test_ndjson_with_feed_filters(self):
+        response, body = self.fetch(format='ndjson', category='water')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="complaints.ndjson"')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(row['category'], row['department'], row['submitted_by']) for row in rows], [('water', 'Water Supply', None)])
+        response = self.client.get(self.url, {'format': 'ndjson', 'bbox': 'nope'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('bbox', json.loads(response.content))
+
+    def test_one_query_regardless_of_rows(self):
+        with self.assertNumQueries(1):
+            self.fetch(format='ndjson')
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'JSON_STREAM_CHUNK_SIZE': 1})
+    def test_json_array_in_chunks(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 3)
+        rows = json.loads(b''.join(chunks))
+        self.assertEqual([row['latitude'] for row in rows], ['27.700000', None])
+        _, body = self.fetch(format='ndjson')
+        self.assertEqual(rows, [json.loads(line) for line in body.splitlines()])
+
+    def test_search_is_not_capped(self):
+        Complaint.objects.bulk_create([
+            Complaint(complaint_id=f'HA-IMPORT-{i}', title=f'Sinkhole {i}', category='road', description='Road caved in', location='Ward 2')
+            for i in range(search.MAX_RESULTS + 20)
+        ])
+        search.get_search_backend().rebuild()
+        for backend in ('SQLiteSearchBackend', 'DatabaseSearchBackend'):
+            with self.subTest(backend), override_settings(COMPLAINTS_SEARCH_BACKEND=f'complaints.search.{backend}'):
+                _, body = self.fetch(format='ndjson', q='sinkhole')
+                self.assertEqual(len(body.splitlines()), search.MAX_RESULTS + 20)
+        out = StringIO()
+        call_command('export_complaints', '--format', 'ndjson', '--q', 'sinkhole', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), search.MAX_RESULTS + 20)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_complaints', '--format', 'ndjson', '--category', 'road', stdout=out)
+        self.assertEqual([json.loads(line)['category'] for line in out.getvalue().splitlines()], ['road'])
+
+
+class BatchIngestTests(APITestCase):
+    url = '/api/complaints/batch/'
+
+    def setUp(self):
+        self.addCleanup(routing.invalidate_routing_table)
+        self.client.force_authenticate(User.objects.create_superuser('gateway', 'gateway@example.com', None))
+
+    def items(self, count, category='water'):
+        return [
+            {'title': f'No water {i}', 'category': category, 'description': 'Dry taps since morning',
+             'location': 'Ward 3', 'latitude': '27.710000', 'longitude': '85.320000'}
+            for i in range(count)
+        ]
+
+    def post(self, items):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, {'complaints': items}, format='json')
+        return response, len(ctx.captured_queries)
+
+    def test_batch_is_filed_with_per_item_errors(self):
+        items = self.items(3)
+        items.insert(1, {'title': 'Missing fields'})
+        response, _ = self.post(items)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (3, 1))
+        results = response.data['results']
+        self.assertEqual(results[1]['index'], 1)
+        self.assertIn('category', results[1]['errors'])
+        numbers = [int(result['complaint_id'].split('-')[2]) for result in results if 'id' in result]
+        self.assertEqual(numbers, list(range(numbers[0], numbers[0] + 3)))
+
+        complaints = Complaint.objects.filter(pk__in=[r['id'] for r in results if 'id' in r])
+        self.assertEqual({c.status for c in complaints}, {'Assigned'})
+        self.assertTrue(all(c.geohash for c in complaints))
+        self.assertEqual(ComplaintStatusEvent.objects.filter(complaint__in=complaints).count(), 3)
+        self.assertEqual(ComplaintStats.objects.get(category='water').count, 3)
+        self.assertEqual(ComplaintFingerprint.objects.filter(complaint__in=complaints).count(), 3)
+        self.assertEqual(Job.objects.filter(task='complaints.fan_out_notifications').count(), 1)
+        self.assertEqual(AdminProfile.objects.get(user__username='water_admin').open_count, 3)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        self.post(self.items(1))
+        self.assertEqual(self.post(self.items(5))[1], self.post(self.items(50))[1])
+
+    def test_rejects_bad_batches(self):
+        self.assertEqual(self.post([])[0].status_code, 400)
+        self.assertEqual(self.post([{'title': 'x'}])[0].status_code, 400)
+        self.assertFalse(Complaint.objects.exists())
+
+    def test_import_command(self):
+        path = os.path.join(tempfile.mkdtemp(dir=TEST_MEDIA_ROOT), 'calls.ndjson')
+        with open(path, 'w') as f:
+            for item in self.items(3, category='road'):
+                f.write(json.dumps(item) + '\n')
+            f.write('{not json\n')
+        out, err = StringIO(), StringIO()
+        call_command('import_complaints', path, '--batch-size', '2', stdout=out, stderr=err)
+        self.assertIn('3 complaint(s) filed, 1 line(s) rejected.', out.getvalue())
+        self.assertIn('line 4: invalid JSON', err.getvalue())
+        self.assertEqual(Complaint.objects.filter(category='road').count(), 3)
+
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class RowSerializerTests(APITestCase):
+
+    def setUp(self):
+        self.citizen = User.objects.create_user('citizen')
+        water = Department.objects.get(slug='water-supply')
+        self.complaints = [
+            make_complaint(user=self.citizen, latitude='27.7', longitude='85.3'),
+            make_complaint(category='water', assigned_department=water, assigned_to=self.citizen),
+            make_complaint(category='other', image='complaint_images/a.jpg'),
+        ]
+        photo = self.complaints[2]
+        Complaint.objects.filter(pk=photo.pk).update(variants={
+            'source': 'complaint_images/a.jpg', 'thumb': {'jpeg': 'complaint_images/variants/a/thumb.jpeg'},
+        })
+        ComplaintImage.objects.create(complaint=photo, image='complaint_images/b.jpg')
+        ComplaintImage.objects.create(complaint=photo, image='complaint_images/c.jpg')
+        Upvote.objects.create(user=self.citizen, complaint=photo)
+        self.request = RequestFactory().get('/api/complaints/public/')
+        self.request.user = self.citizen
+
+    def test_same_output_as_model_serializers(self):
+        queryset = Complaint.objects.order_by('id')
+        context = {'request': self.request, 'snippets': {self.complaints[0].pk: '<mark>Pothole</mark>'}}
+        cases = [
+            (ComplaintListSerializer, ComplaintListRowSerializer),
+            (PublicComplaintSerializer, PublicComplaintRowSerializer),
+        ]
+        for model_serializer, row_serializer in cases:
+            with self.subTest(model_serializer.__name__):
+                expected = json.dumps(model_serializer(queryset, many=True, context=context).data)
+                rows = row_serializer(context).serialize(row_serializer().rows(queryset))
+                self.assertEqual(json.dumps(rows), expected)
+        photo = PublicComplaintRowSerializer(context).serialize(PublicComplaintRowSerializer().rows(queryset))[2]
+        self.assertTrue(photo['is_upvoted'])
+        self.assertEqual(photo['image_variants']['thumb']['jpeg'], 'http://testserver/media/complaint_images/variants/a/thumb.jpeg')
+        self.assertEqual(len(photo['images']), 2)
+
+    def test_public_feed_queries_do_not_grow_with_images(self):
+        self.client.force_authenticate(self.citizen)
+        with CaptureQueriesContext(connection) as before:
+            self.client.get('/api/complaints/public/', {'page_size': 10})
+        for complaint in self.complaints:
+            ComplaintImage.objects.create(complaint=complaint, image='complaint_images/d.jpg')
+        with CaptureQueriesContext(connection) as after:
+            self.client.get('/api/complaints/public/', {'page_size': 10})
+        self.assertEqual(len(before), len(after))
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_serializers', '--rows', '20', '--repeat', '1', stdout=out)
+        self.assertIn('list: 20 rows', out.getvalue())
+        self.assertIn('public: 20 rows', out.getvalue())
+        self.assertFalse(Complaint.objects.filter(complaint_id__startswith='BENCH-').exists())
+
+
+class DuplicateDetectionTests(APITestCase):
+    url = '/api/complaints/check_duplicates/'
+
+    def setUp(self):
+        self.user = User.objects.create_user('citizen')
+        self.client.force_authenticate(self.user)
+        self.pothole = make_complaint(
+            title='Huge pothole on Main Street',
+            description='Deep pothole near the bus stop is damaging cars',
+            latitude='27.704000', longitude='85.315000',
+        )
+        make_complaint(
+            title='Garbage not collected',
+            description='Waste has piled up for a week',
+            category='waste', latitude='27.704100', longitude='85.315100',
+        )
+        make_complaint(
+            title='Huge pothole on Main Street',
+            description='Deep pothole near the bus stop is damaging cars',
+            latitude='27.800000', longitude='85.400000',
+        )
+
+    def check(self, **overrides):
+        draft = {
+            'title': 'Pothole on Main Street',
+            'description': 'Deep pothole by the bus stop damaging cars',
+            'category': 'road',
+            'latitude': '27.704200',
+            'longitude': '85.315200',
+            **overrides,
+        }
+        response = self.client.post(self.url, draft)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_finds_nearby_similar_complaint(self):
+        matches = self.check()
+        self.assertEqual([m['complaint_id'] for m in matches], [self.pothole.complaint_id])
+        self.assertGreater(matches[0]['similarity'], 0.5)
+
+    def test_ignores_different_text_and_category(self):
+        self.assertEqual(self.check(title='Streetlight broken', description='Lamp has been dark for days'), [])
+        self.assertEqual(self.check(category='water'), [])
+
+    def test_signature_follows_text_edits(self):
+        self.pothole.title = 'Broken water pipe'
+        self.pothole.description = 'Water is leaking onto the road from a burst main'
+        self.pothole.save()
+        self.assertEqual(self.check(), [])
+
+    def test_without_coordinates_uses_recent_complaints(self):
+        matches = self.check(latitude='', longitude='')
+        self.assertEqual(len(matches), 2)
+
+
+@override_settings(CACHES=NO_CACHE)
+class SearchTests(APITestCase):
+    url = '/api/complaints/public/'
+
+    def setUp(self):
+        self.pothole = make_complaint(
+            title='Pothole on Main Street',
+            description='A deep pothole is damaging <b>cars</b> near the bus stop',
+        )
+        self.light = make_complaint(
+            title='Streetlight out',
+            description='The light near the pothole repair site has been dark for days',
+            category='streetlight',
+        )
+        make_complaint(title='Garbage pile', description='Waste not collected', category='waste')
+
+    def search(self, q, **params):
+        response = self.client.get(self.url, {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_results_are_ranked_with_snippets(self):
+        results = self.search('pothole')
+        self.assertEqual([r['id'] for r in results], [self.pothole.pk, self.light.pk])
+        self.assertIn('<mark>Pothole</mark>', results[0]['snippet'])
+        self.assertIn('&lt;b&gt;<mark>cars</mark>&lt;/b&gt;', self.search('cars')[0]['snippet'])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.assertEqual(self.search('garbage')[0]['title'], 'Garbage pile')
+        self.pothole.title = 'Sinkhole on Main Street'
+        self.pothole.description = 'Road collapsed'
+        self.pothole.save()
+        self.assertEqual([r['id'] for r in self.search('pothole')], [self.light.pk])
+        self.light.delete()
+        self.assertEqual(self.search('pothole'), [])
+        self.assertEqual([r['id'] for r in self.search('sinkhole')], [self.pothole.pk])
+
+    def test_query_syntax_is_treated_as_text(self):
+        self.assertEqual(self.search('"pothole OR NEAR(*'), [])
+        self.assertEqual(len(self.search('pothole', category='road')), 1)
+
+    def test_filters_apply_before_the_result_cap(self):
+        count = search.MAX_RESULTS + 20
+        Complaint.objects.bulk_create([
+            Complaint(complaint_id=f'HA-IMPORT-{i}', title=f'Sinkhole {i}', category='road', description='Caved in', location='Ward 2')
+            for i in range(count)
+        ] + [
+            # Weaker matches, outside the best MAX_RESULTS.
+            Complaint(complaint_id=f'HA-WASTE-{i}', title='Waste', category='waste', description='Near the sinkhole', location='Ward 3')
+            for i in range(3)
+        ])
+        search.get_search_backend().rebuild()
+        for backend in ('SQLiteSearchBackend', 'DatabaseSearchBackend'):
+            with self.subTest(backend), override_settings(COMPLAINTS_SEARCH_BACKEND=f'complaints.search.{backend}'):
+                self.assertEqual(len(self.search('sinkhole')), count + 3)
+                self.assertEqual(len(self.search('sinkhole', category='waste')), 3)
+                results = self.search('sinkhole', category='waste', page_size=2)['results']
+                self.assertEqual(len(results), 2)
+                self.assertIn('<mark>sinkhole</mark>', results[0]['snippet'])
+
+    def test_admin_search(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', None)
+        self.client.force_login(admin)
+        response = self.client.get('/admin/complaints/complaint/', {'q': 'streetlight'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.light])
+        response = self.client.get('/admin/complaints/complaint/', {'q': self.pothole.complaint_id.lower()})
+        self.assertEqual(list(response.context['cl'].result_list), [self.pothole])
+
+    def test_rebuild_and_fallback_backend(self):
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 complaint(s)', out.getvalue())
+        with override_settings(COMPLAINTS_SEARCH_BACKEND='complaints.search.DatabaseSearchBackend'):
+            results = self.search('pothole')
+        self.assertEqual([r['id'] for r in results], [self.pothole.pk, self.light.pk])
+        self.assertIn('<mark>pothole</mark>', results[0]['snippet'])
+
+
+def make_jpeg(name='photo.jpg', size=(2400, 1800)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 80, 40)).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ImageVariantTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('citizen')
+        self.client.force_authenticate(self.user)
+
+    def test_upload_is_resized_off_the_request_path(self):
+        response = self.client.post('/api/complaints/', {
+            'title': 'Pothole', 'category': 'road', 'description': 'Deep', 'location': 'Ward 5',
+            'image': make_jpeg(), 'images': [make_jpeg('extra.jpg', (800, 600))],
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.data['image_variants'])
+
+        run_pending()
+        data = self.client.get(f"/api/complaints/{response.data['id']}/").data
+        self.assertEqual(set(data['image_variants']), {'thumb', 'card', 'full'})
+        self.assertTrue(data['image_variants']['card']['webp'].endswith('/card.webp'))
+        self.assertTrue(data['images'][0]['variants']['thumb']['jpeg'].endswith('/thumb.jpeg'))
+
+        complaint = Complaint.objects.get(pk=response.data['id'])
+        storage = complaint.image.storage
+        with storage.open(complaint.variants['full']['jpeg']) as f:
+            self.assertEqual(Image.open(f).size, (1600, 1200))
+        with storage.open(complaint.variants['thumb']['webp']) as f:
+            self.assertEqual(Image.open(f).size, (160, 120))
+        extra = complaint.images.get()
+        with storage.open(extra.variants['full']['webp']) as f:
+            # Never upscaled.
+            self.assertEqual(Image.open(f).size, (800, 600))
+
+    def test_backfill_command(self):
+        complaint = make_complaint(image=make_jpeg())
+        Job.objects.all().delete()
+        out = StringIO()
+        call_command('process_complaint_images', stdout=out)
+        self.assertIn('1 photo(s) processed', out.getvalue())
+        complaint.refresh_from_db()
+        self.assertEqual(complaint.variants['source'], complaint.image.name)
+        out = StringIO()
+        call_command('process_complaint_images', stdout=out)
+        self.assertIn('0 photo(s) processed', out.getvalue())
+
+
+class ContentAddressedStorageTests(APITestCase):
+
+    def setUp(self):
+        # A fresh media root per test, since the collector looks at every stored file.
+        self.enterContext(override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=TEST_MEDIA_ROOT)))
+
+    def blob(self, name):
+        return MediaBlob.objects.filter(name=name).values_list('refcount', flat=True).first()
+
+    def collect(self, *args):
+        out = StringIO()
+        call_command('collect_media_garbage', '--grace-hours', '0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_identical_uploads_share_one_file(self):
+        first = make_complaint(image=make_jpeg('Screenshot.png'))
+        second = make_complaint(image=make_jpeg('Screenshot.png'))
+        ComplaintImage.objects.create(complaint=second, image=make_jpeg('copy.jpg'))
+        digest = hashlib.sha256(make_jpeg().read()).hexdigest()
+        self.assertEqual(first.image.name, f'complaint_images/{digest}.png')
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(self.blob(first.image.name), 2)
+        self.assertEqual(len(list(blobs.stored_files())), 2)
+
+    def test_garbage_collection_waits_for_last_reference(self):
+        first = make_complaint(image=make_jpeg())
+        second = make_complaint(image=make_jpeg())
+        run_pending()
+        name = first.image.name
+        storage = first.image.storage
+        first.delete()
+        self.assertEqual(self.blob(name), 1)
+        self.assertIn('0 unreferenced file(s) deleted', self.collect())
+        self.assertTrue(storage.exists(name))
+
+        second.delete()
+        self.assertEqual(self.blob(name), 0)
+        self.assertIn('1 unreferenced file(s) would be deleted', self.collect('--dry-run'))
+        self.assertIn('1 unreferenced file(s) deleted', self.collect())
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(storage.exists(variant_dir(name)))
+        self.assertIsNone(self.blob(name))
+
+    def test_reupload_of_collectable_file_restarts_grace_period(self):
+        complaint = make_complaint(image=make_jpeg())
+        name = complaint.image.name
+        storage = complaint.image.storage
+        complaint.delete()
+        three_days_ago = (timezone.now() - timedelta(days=3)).timestamp()
+        os.utime(storage.path(name), (three_days_ago, three_days_ago))
+        MediaBlob.objects.filter(name=name).update(updated_at=timezone.now() - timedelta(days=3))
+
+        # The same bytes again, saved before any row references them.
+        self.assertEqual(storage.save('complaint_images/again.jpg', make_jpeg()), name)
+        out = StringIO()
+        call_command('collect_media_garbage', '--grace-hours', '24', stdout=out)
+        self.assertIn('0 unreferenced file(s) deleted', out.getvalue())
+        self.assertTrue(storage.exists(name))
+
+    def test_file_touched_after_the_scan_is_kept(self):
+        complaint = make_complaint(image=make_jpeg())
+        name = complaint.image.name
+        complaint.delete()
+        MediaBlob.objects.filter(name=name).update(updated_at=timezone.now() - timedelta(days=3))
+        # The scan saw an old file, then a dedupe hit touched it before the delete.
+        three_days_ago = (timezone.now() - timedelta(days=3)).timestamp()
+        with mock.patch.object(blobs, 'stored_files', return_value=[(name, three_days_ago)]):
+            self.assertEqual(blobs.collect_garbage(grace=timedelta(hours=24)), [])
+        self.assertTrue(complaint.image.storage.exists(name))
+
+    def test_variants_are_keyed_by_the_full_name(self):
+        jpeg = make_complaint(image=make_jpeg())
+        png = make_complaint(image=make_jpeg('Screenshot.png'))
+        run_pending()
+        self.assertNotEqual(variant_dir(jpeg.image.name), variant_dir(png.image.name))
+        png.delete()
+        self.collect()
+        storage = jpeg.image.storage
+        self.assertTrue(storage.exists(variant_dir(jpeg.image.name)))
+        jpeg.refresh_from_db()
+        self.assertTrue(all(storage.exists(path) for path in jpeg.variants['thumb'].values()))
+
+    def test_replacing_image_moves_the_reference(self):
+        complaint = make_complaint(image=make_jpeg())
+        old_name = complaint.image.name
+        complaint.image = make_jpeg('other.jpg', (300, 300))
+        complaint.save()
+        self.assertEqual(self.blob(old_name), 0)
+        self.assertEqual(self.blob(complaint.image.name), 1)
+
+    def test_rehash_legacy_uploads(self):
+        complaint = make_complaint()
+        storage = complaint.image.storage
+        os.makedirs(storage.path('complaint_images'))
+        legacy = []
+        for suffix in ('', '_hALdHrJ'):
+            name = f'complaint_images/Screenshot_20260212_234718{suffix}.png'
+            with open(storage.path(name), 'wb') as f:
+                f.write(make_jpeg().read())
+            legacy.append(name)
+            ComplaintImage.objects.bulk_create([ComplaintImage(complaint=complaint, image=name)])
+
+        output = self.collect('--rehash')
+        self.assertIn('2 photo(s) moved', output)
+        self.assertIn('2 unreferenced file(s) deleted', output)
+        names = set(complaint.images.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertTrue(storage.exists(names.pop()))
+        self.assertFalse(any(storage.exists(name) for name in legacy))
+
+
+class NotificationFanOutTests(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('triage', 'triage@example.com', None)
+        self.citizen = User.objects.create_user('citizen')
+        self.department = Department.objects.create(name='Potholes', slug='potholes', categories='road')
+        self.officers = [User.objects.create_user(f'officer{i}', is_staff=True) for i in range(3)]
+        for officer in self.officers:
+            AdminProfile.objects.create(user=officer, department=self.department)
+        self.complaint = make_complaint(user=self.citizen)
+
+    def recipients(self):
+        run_pending()
+        return set(Notification.objects.values_list('user__username', flat=True))
+
+    def test_unassigned_complaint_goes_to_superusers(self):
+        self.assertEqual(self.recipients(), {'triage'})
+
+    def test_assignment_notifies_department_and_citizen_in_one_insert(self):
+        run_pending()
+        Notification.objects.all().delete()
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(
+            f'/api/complaints/{self.complaint.pk}/assign/',
+            {'assigned_department': self.department.pk},
+        )
+        self.assertEqual(response.status_code, 200)
+        with CaptureQueriesContext(connection) as ctx:
+            run_pending()
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "notifications_notification"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.recipients(), {'citizen', 'officer0', 'officer1', 'officer2'})
+        self.assertEqual(
+            set(Notification.objects.values_list('message', flat=True)),
+            {f'Complaint {self.complaint.complaint_id} status updated to: Assigned'},
+        )
+
+    def test_save_without_tracked_changes_notifies_nobody(self):
+        run_pending()
+        Notification.objects.all().delete()
+        complaint = Complaint.objects.get(pk=self.complaint.pk)
+        complaint.title = 'Bigger pothole on Main Street'
+        complaint.save()
+        complaint.status = 'Submitted'
+        complaint.save()
+        self.assertEqual(run_pending(), 0)
+        self.assertFalse(Notification.objects.exists())
@@ -1,16 +1,130 @@
+import math
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
-from django.db.models import Count
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.contrib.auth.models import User
-from .models import Complaint, ComplaintImage, Upvote, Department, AdminProfile
+from django.utils.dateparse import parse_date
+from core.cache import cache_anonymous_response
+from core.conditional import conditional_response
+from core.renderers import CSVRenderer, JSONArrayRenderer, NDJSONRenderer
+from .models import Complaint, ComplaintImage, ComplaintSLAStats, Upvote, Department, AdminProfile
 from .serializers import (
     ComplaintSerializer,
     ComplaintListSerializer,
-    PublicComplaintSerializer,
     DepartmentSerializer,
+    BulkChangeSerializer,
+    DuplicateCheckSerializer,
+    PossibleDuplicateSerializer,
 )
+from .pagination import PublicFeedPagination
+from .row_serializers import ComplaintListRowSerializer, PublicComplaintRowSerializer
+from .batch import MAX_ITEMS, ingest_complaints
+from .bulk import apply_bulk_change
+from .clusters import find_clusters
+from .duplicates import find_duplicates
+from .export import FORMATS, export_lines
+from .routing import route
+from .search import filter_matches, search_complaints
+from .stats import summarize_stats
+from . import geo
+
+DEFAULT_NEAR_RADIUS = 1000
+MAX_NEAR_RADIUS = 50000
+MAX_ZOOM = 22
+
+
+def parse_coordinates(params, name, count):
+    """Parse a comma-separated list of `count` floats from a query parameter."""
+    try:
+        values = [float(v) for v in params[name].split(',')]
+    except ValueError:
+        values = []
+    if len(values) != count or not all(math.isfinite(v) for v in values):
+        raise ValidationError({name: f'Expected {count} comma-separated numbers.'})
+    return values
+
+
+def parse_bbox(params):
+    """Parse bbox=min_lng,min_lat,max_lng,max_lat into (min_lat, min_lng, max_lat, max_lng)."""
+    min_lng, min_lat, max_lng, max_lat = parse_coordinates(params, 'bbox', 4)
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise ValidationError({'bbox': 'Expected min_lng,min_lat,max_lng,max_lat within world bounds.'})
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def filter_public_complaints(queryset, params):
+    """
+    Apply the public feed filters (category, date_from, date_to, status,
+    bbox, near/radius) to a queryset.
+    """
+    # Filter by category
+    category = params.get('category')
+    if category:
+        queryset = queryset.filter(category=category)
+
+    # Filter by date range
+    date_from = params.get('date_from')
+    date_to = params.get('date_to')
+    if date_from:
+        queryset = queryset.filter(created_at__date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(created_at__date__lte=date_to)
+
+    # Filter by status
+    status_filter = params.get('status')
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+
+    # Filter by map viewport: bbox=min_lng,min_lat,max_lng,max_lat
+    if params.get('bbox'):
+        queryset = geo.filter_bbox(queryset, *parse_bbox(params))
+
+    # Filter by distance: near=lat,lng&radius=<metres>
+    if params.get('near'):
+        lat, lng = parse_coordinates(params, 'near', 2)
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ValidationError({'near': 'Expected lat,lng within world bounds.'})
+        try:
+            radius = float(params.get('radius', DEFAULT_NEAR_RADIUS))
+        except ValueError:
+            radius = -1
+        if not 0 < radius <= MAX_NEAR_RADIUS:
+            raise ValidationError({'radius': f'Expected a distance in metres up to {MAX_NEAR_RADIUS}.'})
+        queryset = geo.filter_near(queryset, lat, lng, radius)
+
+    return queryset
+
+
+def listed_rows(view, request, *args, **kwargs):
+    return view.filter_queryset(view.get_queryset())
+
+
+def detail_rows(view, request, pk=None, **kwargs):
+    try:
+        return view.get_queryset().filter(pk=pk)
+    except (TypeError, ValueError):
+        return Complaint.objects.none()
+
+
+def tracked_rows(view, request, complaint_id=None, **kwargs):
+    return Complaint.objects.filter(complaint_id=complaint_id)
+
+
+def public_complaints(request):
+    """The public feed filters applied to all complaints, built once per request for the validators and the view."""
+    if not hasattr(request, 'public_complaints'):
+        request.public_complaints = filter_public_complaints(Complaint.objects.all(), request.query_params)
+    return request.public_complaints
+
+
+def public_rows(view, request, *args, **kwargs):
+    # The search index only changes with complaints, so filtering without `q` is enough for validators.
+    return public_complaints(request)
 
 
 class ComplaintViewSet(viewsets.ModelViewSet):
@@ -29,15 +143,52 @@ class ComplaintViewSet(viewsets.ModelViewSet):
         qs = Complaint.objects.select_related('assigned_department', 'assigned_to').all()
         return qs
 
+    @conditional_response('complaints', listed_rows)
+    def list(self, request, *args, **kwargs):
+        # Built from values() rows; ComplaintListSerializer describes the same output.
+        serializer = ComplaintListRowSerializer(self.get_serializer_context())
+        queryset = serializer.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(queryset))
+
+    @conditional_response('complaints', detail_rows)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        """Associate the complaint with the authenticated user and save additional images."""
-        complaint = serializer.save(user=self.request.user)
+        """
+        Associate the complaint with the authenticated user, route it to a
+        department and officer, and save additional images.
+        """
+        data = serializer.validated_data
+        # An assignment given by the client wins over the routing table.
+        assignment = {} if {'assigned_department', 'assigned_to'} & data.keys() else route(data.get('category'))
+        complaint = serializer.save(user=self.request.user, **assignment)
         # Handle multiple image uploads
         images = self.request.FILES.getlist('images')
         for img in images:
             ComplaintImage.objects.create(complaint=complaint, image=img)
 
+    @action(detail=False, methods=['post'], url_path='check_duplicates')
+    def check_duplicates(self, request):
+        """
+        Look for existing complaints that describe the same issue as a draft,
+        so the citizen can upvote one instead of filing a copy.
+        Body: title, description, category, latitude, longitude (optional)
+        """
+        draft = DuplicateCheckSerializer(data=request.data)
+        draft.is_valid(raise_exception=True)
+        matches = find_duplicates(**draft.validated_data)
+        for complaint, score in matches:
+            complaint.similarity = round(score, 2)
+        serializer = PossibleDuplicateSerializer([complaint for complaint, _ in matches], many=True)
+        return Response(serializer.data)
+
     @action(detail=False, methods=['get'], url_path='track/(?P<complaint_id>[^/.]+)', permission_classes=[AllowAny])
+    @conditional_response('complaints', tracked_rows)
+    @cache_anonymous_response('complaints')
     def track_complaint(self, request, complaint_id=None):
         """
         Custom action to track a complaint by its complaint_id (e.g., HA-2025-001).
@@ -54,52 +205,219 @@ class ComplaintViewSet(viewsets.ModelViewSet):
             )
 
     @action(detail=False, methods=['get'], url_path='public', permission_classes=[AllowAny])
+    @conditional_response('complaints', public_rows)
+    @cache_anonymous_response('complaints', defaults={'sort': 'recent'})
     def public_list(self, request):
         """
         Public endpoint listing all complaints with filtering and sorting.
-        Query params: category, date_from, date_to, sort (recent|oldest|most_upvoted)
-        """
-        queryset = Complaint.objects.all()
-
-        # Filter by category
-        category = request.query_params.get('category')
-        if category:
-            queryset = queryset.filter(category=category)
+        Query params: category, date_from, date_to, sort (recent|oldest|most_upvoted),
+        bbox (min_lng,min_lat,max_lng,max_lat), near (lat,lng) with radius (metres),
+        q (full-text search; results are ranked by relevance unless `sort` is given
+        and each carries a highlighted `snippet`)
 
-        # Filter by date range
-        date_from = request.query_params.get('date_from')
-        date_to = request.query_params.get('date_to')
-        if date_from:
-            queryset = queryset.filter(created_at__date__gte=date_from)
-        if date_to:
-            queryset = queryset.filter(created_at__date__lte=date_to)
+        Passing `page_size` or `cursor` switches to the paginated feed mode,
+        which returns {"next": <url>, "results": [...]} one keyset page at a time.
+        Pages always follow `sort` (recent by default), also with `q`: the keyset
+        needs a stored ordering, which relevance is not.
+        """
+        queryset = public_complaints(request)
+        query = request.query_params.get('q')
+        serializer = PublicComplaintRowSerializer()
 
-        # Filter by status
-        status_filter = request.query_params.get('status')
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
+        if 'cursor' in request.query_params or 'page_size' in request.query_params:
+            if query:
+                queryset = filter_matches(queryset, query)
+            paginator = PublicFeedPagination()
+            page = paginator.paginate_queryset(serializer.rows(queryset), request, view=self)
+            ids = [row['id'] for row in page]
+            # Snippets for this page only.
+            hits = search_complaints(Complaint.objects.filter(pk__in=ids), query)[1] if query else None
+            serializer.context = self.get_feed_context(request, ids, hits)
+            return paginator.get_paginated_response(serializer.serialize(page))
 
-        # Sort
+        hits = None
+        if query:
+            queryset, hits = search_complaints(queryset, query)
+        queryset = serializer.rows(queryset)
         sort = request.query_params.get('sort', 'recent')
         if sort == 'oldest':
             queryset = queryset.order_by('created_at')
         elif sort == 'most_upvoted':
-            queryset = queryset.annotate(upvote_count=Count('upvotes')).order_by('-upvote_count', '-created_at')
+            queryset = queryset.order_by('-upvote_count', '-created_at', '-id')
         else:
             queryset = queryset.order_by('-created_at')
 
-        serializer = PublicComplaintSerializer(queryset, many=True, context={'request': request})
-        return Response(serializer.data)
+        complaints = list(queryset)
+        if hits is not None and 'sort' not in request.query_params:
+            rank = {hit.id: position for position, hit in enumerate(hits)}
+            complaints.sort(key=lambda row: rank.get(row['id'], len(rank)))
+        serializer.context = self.get_feed_context(request, [row['id'] for row in complaints], hits)
+        return Response(serializer.serialize(complaints))
+
+    @action(
+        detail=False, methods=['get'], url_path='export',
+        permission_classes=[IsAdminUser], renderer_classes=[CSVRenderer, NDJSONRenderer, JSONArrayRenderer],
+    )
+    def export(self, request):
+        """
+        Stream every complaint matching the public feed filters (and `q`) as
+        CSV, newline-delimited JSON or one JSON array. Choose with
+        ?format=csv|ndjson|json or the Accept header; CSV by default.
+        """
+        queryset = filter_public_complaints(Complaint.objects.all(), request.query_params)
+        if request.query_params.get('q'):
+            queryset = filter_matches(queryset, request.query_params['q'])
+        format = request.accepted_renderer.format
+        response = StreamingHttpResponse(export_lines(queryset, format), content_type=FORMATS[format])
+        response['Content-Disposition'] = f'attachment; filename="complaints.{format}"'
+        return response
+
+    def get_feed_context(self, request, ids, hits=None):
+        """Load the caller's upvotes for a page of complaint ids in one query."""
+        upvoted_ids = set()
+        if ids and request.user and request.user.is_authenticated:
+            upvoted_ids = set(
+                Upvote.objects.filter(user=request.user, complaint_id__in=ids)
+                .values_list('complaint_id', flat=True)
+            )
+        context = {'request': request, 'upvoted_ids': upvoted_ids}
+        if hits is not None:
+            context['snippets'] = {hit.id: hit.snippet for hit in hits}
+        return context
+
+    @action(detail=False, methods=['get'], url_path='clusters', permission_classes=[AllowAny])
+    def clusters(self, request):
+        """
+        Public map clusters: one centroid and count per grid cell in view.
+        Query params: zoom (0-22), bbox (min_lng,min_lat,max_lng,max_lat), category, status
+        """
+        params = request.query_params
+        if not params.get('bbox'):
+            raise ValidationError({'bbox': 'This parameter is required.'})
+        bbox = parse_bbox(params)
+        try:
+            zoom = int(params.get('zoom', ''))
+        except ValueError:
+            zoom = -1
+        if not 0 <= zoom <= MAX_ZOOM:
+            raise ValidationError({'zoom': f'Expected a whole number from 0 to {MAX_ZOOM}.'})
+        return Response(find_clusters(
+            *bbox, zoom,
+            category=params.get('category'),
+            status=params.get('status'),
+        ))
+
+    @action(detail=False, methods=['post'], url_path='batch', permission_classes=[IsAdminUser])
+    def batch(self, request):
+        """
+        File many complaints at once for another intake channel (call centre, SMS gateway).
+        Body: {"complaints": [{title, category, description, location, latitude, longitude}, ...]}
+        Returns one result per item, in order: {"index", "id", "complaint_id"} or {"index", "errors"}.
+        """
+        items = request.data.get('complaints') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'complaints': 'Expected a non-empty list.'})
+        if len(items) > MAX_ITEMS:
+            raise ValidationError({'complaints': f'Send at most {MAX_ITEMS} complaints per batch.'})
+        results = ingest_complaints(items)
+        created = sum(1 for result in results if 'id' in result)
+        return Response(
+            {'created': created, 'failed': len(results) - created, 'results': results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(detail=False, methods=['post'], url_path='bulk', permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        """
+        Assign, or change the status of, many complaints at once.
+        Body: ids (complaint pks), operation (assign|status), and assigned_department
+        and/or assigned_to for assign, status for status.
+        Returns one {"id", "result"} per id, result being updated, unchanged or not_found.
+        """
+        serializer = BulkChangeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        results = apply_bulk_change(ids, serializer.get_values())
+        return Response({
+            'updated': sum(1 for result in results.values() if result == 'updated'),
+            'results': [{'id': pk, 'result': result} for pk, result in results.items()],
+        })
+
+    @action(detail=False, methods=['get'], url_path='stats', permission_classes=[IsAdminUser])
+    def stats(self, request):
+        """
+        Dashboard totals by category, status, department and day, read from the stats rollup.
+        Query params: date_from, date_to (YYYY-MM-DD), category, status, department (id, or `none`)
+        """
+        params = request.query_params
+        filters = {'category': params.get('category'), 'status': params.get('status')}
+        for name in ('date_from', 'date_to'):
+            if params.get(name):
+                filters[name] = parse_date(params[name])
+                if filters[name] is None:
+                    raise ValidationError({name: 'Expected a date as YYYY-MM-DD.'})
+        department = params.get('department')
+        if department == 'none':
+            filters['department'] = 0
+        elif department:
+            if not department.isdigit():
+                raise ValidationError({'department': 'Expected a department id or `none`.'})
+            filters['department'] = int(department)
+        return Response(summarize_stats(**filters))
+
+    @action(detail=False, methods=['get'], url_path='sla', permission_classes=[IsAdminUser])
+    def sla(self, request):
+        """
+        p50/p90/p99 time in each status and time to resolve (in seconds) per
+        department and category, as of the last `refresh_sla_stats` run.
+        Query params: metric (in_status|to_resolve), category, department (id, or `none`)
+        """
+        params = request.query_params
+        rows = ComplaintSLAStats.objects.select_related('department').order_by(
+            'metric', 'department_id', 'category', 'status',
+        )
+        if params.get('metric'):
+            rows = rows.filter(metric=params['metric'])
+        if params.get('category'):
+            rows = rows.filter(category=params['category'])
+        department = params.get('department')
+        if department == 'none':
+            rows = rows.filter(department__isnull=True)
+        elif department:
+            if not department.isdigit():
+                raise ValidationError({'department': 'Expected a department id or `none`.'})
+            rows = rows.filter(department_id=department)
+        rows = list(rows)
+        return Response({
+            'computed_at': max((row.computed_at for row in rows), default=None),
+            'results': [
+                {
+                    'metric': row.metric,
+                    'status': row.status or None,
+                    'department': row.department_id and {'id': row.department_id, 'name': row.department.name},
+                    'category': row.category,
+                    'samples': row.samples,
+                    'p50': row.p50,
+                    'p90': row.p90,
+                    'p99': row.p99,
+                }
+                for row in rows
+            ],
+        })
 
     @action(detail=True, methods=['post'], url_path='upvote', permission_classes=[IsAuthenticated])
     def toggle_upvote(self, request, pk=None):
         """Toggle upvote on a complaint. Creates upvote if not exists, deletes if exists."""
         complaint = self.get_object()
-        upvote, created = Upvote.objects.get_or_create(user=request.user, complaint=complaint)
+        # The Upvote write and the upvote_count increment (see signals) commit together.
+        with transaction.atomic():
+            upvote, created = Upvote.objects.get_or_create(user=request.user, complaint=complaint)
+            if not created:
+                upvote.delete()
+            upvote_count = Complaint.objects.values_list('upvote_count', flat=True).get(pk=complaint.pk)
         if not created:
-            upvote.delete()
-            return Response({'upvoted': False, 'upvote_count': complaint.upvotes.count()})
-        return Response({'upvoted': True, 'upvote_count': complaint.upvotes.count()}, status=status.HTTP_201_CREATED)
+            return Response({'upvoted': False, 'upvote_count': upvote_count})
+        return Response({'upvoted': True, 'upvote_count': upvote_count}, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['post'], url_path='assign', permission_classes=[IsAdminUser])
     def assign(self, request, pk=None):
@@ -1,3 +1,7 @@
 from django.contrib import admin
+from .models import CacheVersion
 
-# Register your models here.
+
+@admin.register(CacheVersion)
+class CacheVersionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'version']
@@ -0,0 +1,163 @@
+"""
+Versioned response cache for public endpoints.
+
+Cached responses are grouped into namespaces. Each namespace has a version
+number in the database (CacheVersion), and the version is part of every
+cache key. invalidate() bumps the version, which retires every cached
+response in the namespace at once without having to find them. All server
+processes read the same counter, so this works with a per-process cache
+(local memory) as well as a shared one (file-based, memcached, ...).
+
+Only anonymous GET requests are cached, since their responses don't depend
+on who is asking. Responses are stored after rendering, so a hit costs one
+primary-key lookup for the version and no serialization. Hits and misses
+are counted per namespace; get_stats() reports them.
+"""
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+
+from .models import CacheVersion
+
+DEFAULTS = {
+    # Alias in CACHES that holds the responses and hit/miss counters.
+    'ALIAS': 'default',
+    # Seconds a response is kept if nothing invalidates it first.
+    'TIMEOUT': 300,
+}
+NAMESPACES = set()
+
+
+def get_setting(name):
+    return getattr(settings, 'RESPONSE_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return caches[get_setting('ALIAS')]
+
+
+def get_version(namespace):
+    return CacheVersion.objects.filter(name=namespace).values_list('version', flat=True).first() or 0
+
+
+def request_version(request, namespace):
+    """The namespace's CacheVersion, read once per request and shared by the decorators on a view."""
+    versions = request.__dict__.setdefault('_cache_versions', {})
+    if namespace not in versions:
+        versions[namespace] = (
+            CacheVersion.objects.filter(name=namespace).first() or CacheVersion(name=namespace)
+        )
+    return versions[namespace]
+
+
+def bump_version(namespace):
+    now = timezone.now()
+    if CacheVersion.objects.filter(name=namespace).update(version=F('version') + 1, updated_at=now):
+        return
+    try:
+        with transaction.atomic():
+            CacheVersion.objects.create(name=namespace, version=1, updated_at=now)
+    except IntegrityError:
+        CacheVersion.objects.filter(name=namespace).update(version=F('version') + 1, updated_at=now)
+
+
+def invalidate(namespace):
+    """
+    Retire the namespace's cached responses once the current transaction
+    commits. Bumping any earlier would let a request that still sees the old
+    rows cache them under the new version.
+    """
+    transaction.on_commit(lambda: bump_version(namespace))
+
+
+def normalize_params(query_params, defaults=None):
+    """Query params in a canonical order, without blank values or values equal to their default."""
+    defaults = defaults or {}
+    return sorted(
+        (key, value.strip())
+        for key, values in query_params.lists()
+        for value in values
+        if value.strip() and defaults.get(key) != value.strip()
+    )
+
+
+def cache_key(namespace, version, request, defaults=None):
+    signature = json.dumps([
+        # Responses carry absolute media URLs built for the requested host.
+        request.scheme,
+        request.get_host(),
+        request.path,
+        request.accepted_renderer.format,
+        normalize_params(request.query_params, defaults),
+    ])
+    return f'response:{namespace}:{version}:{hashlib.md5(signature.encode()).hexdigest()}'
+
+
+def count(namespace, outcome):
+    cache = get_cache()
+    key = f'response-stats:{namespace}:{outcome}'
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr().
+        cache.set(key, 1, timeout=None)
+
+
+def get_stats():
+    cache = get_cache()
+    stats = {}
+    for namespace in sorted(NAMESPACES):
+        hits = cache.get(f'response-stats:{namespace}:hit', 0)
+        misses = cache.get(f'response-stats:{namespace}:miss', 0)
+        stats[namespace] = {
+            'version': get_version(namespace),
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+    return stats
+
+
+def cache_anonymous_response(namespace, defaults=None):
+    """
+    Cache the successful responses of a DRF view method to anonymous GET requests.
+
+    `defaults` maps query params to their default values, so that for
+    example `?sort=recent` and no `sort` at all share one entry.
+    """
+    NAMESPACES.add(namespace)
+
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view_method(self, request, *args, **kwargs)
+
+            cache = get_cache()
+            key = cache_key(namespace, request_version(request, namespace).version, request, defaults)
+            cached = cache.get(key)
+            if cached is not None:
+                count(namespace, 'hit')
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            count(namespace, 'miss')
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                def store(rendered):
+                    cache.set(key, (rendered.content, rendered['Content-Type']), get_setting('TIMEOUT'))
+                response.add_post_render_callback(store)
+                response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
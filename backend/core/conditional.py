@@ -0,0 +1,62 @@
+"""
+Conditional GET (ETag / Last-Modified) for DRF view methods.
+
+The validators are worked out before the view runs, from one aggregate
+query over the rows the response is built from (their count and latest
+updated_at) and the version of a response cache namespace (see
+core.cache). The version changes on writes that leave updated_at alone,
+such as upvotes or new photo variants. A request whose If-None-Match or
+If-Modified-Since still matches gets a 304 without the view being called,
+so nothing is fetched, serialized or rendered.
+"""
+import functools
+import hashlib
+import json
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .cache import normalize_params, request_version
+
+
+def compute_validators(request, namespace, queryset):
+    """Strong ETag and last-modified datetime of the response to `request` built from `queryset`."""
+    version = request_version(request, namespace)
+    rows = queryset.order_by().aggregate(count=Count('pk'), latest=Max('updated_at'))
+    user = request.user.pk if request.user.is_authenticated else None
+    signature = json.dumps([
+        namespace, version.version, rows['count'], rows['latest'] and rows['latest'].isoformat(),
+        user, request.path, request.accepted_renderer.format, normalize_params(request.query_params),
+    ])
+    etag = f'"{hashlib.md5(signature.encode()).hexdigest()}"'
+    last_modified = max(filter(None, [rows['latest'], version.updated_at]), default=None)
+    return etag, last_modified
+
+
+def conditional_response(namespace, get_rows):
+    """
+    Add ETag and Last-Modified headers to a view method's successful GET
+    responses and answer matching conditional requests with 304.
+
+    `get_rows(view, request, *args, **kwargs)` returns the queryset of
+    rows (with an updated_at field) that the response shows.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_method(self, request, *args, **kwargs)
+
+            etag, last_modified = compute_validators(request, namespace, get_rows(self, request, *args, **kwargs))
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view_method(self, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if timestamp is not None:
+                    response['Last-Modified'] = http_date(timestamp)
+            return response
+        return wrapper
+    return decorator
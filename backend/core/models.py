@@ -1,3 +1,12 @@
 from django.db import models
 
-# Create your models here.
+
+class CacheVersion(models.Model):
+    """Version of a namespace of cached responses (see core.cache); bumping it retires them all."""
+    name = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    # When the version was last bumped, i.e. the last write to anything the namespace covers.
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
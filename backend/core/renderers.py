@@ -0,0 +1,110 @@
+"""
+Renderers for API responses.
+
+JSONRenderer is DRF's JSON renderer with orjson doing the encoding when it
+is installed, and the standard library otherwise. Values orjson doesn't
+know (Decimal, timedelta, lazy strings, querysets, ...) go through DRF's
+encoder, so both produce the same JSON. JSONArrayRenderer adds stream(),
+which encodes an iterable as one JSON array a chunk of items at a time for
+a StreamingHttpResponse. Choose the default renderers with
+REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] and the number of items per
+streamed chunk with REST_FRAMEWORK['JSON_STREAM_CHUNK_SIZE'].
+"""
+import csv
+import io
+from itertools import islice
+
+from django.conf import settings
+from rest_framework import renderers
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+DEFAULTS = {
+    # Items encoded per chunk by JSONArrayRenderer.stream().
+    'JSON_STREAM_CHUNK_SIZE': 500,
+}
+
+_encoder = JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+
+
+def get_setting(name):
+    return getattr(settings, 'REST_FRAMEWORK', {}).get(name, DEFAULTS[name])
+
+
+def dumps(data):
+    """Compact UTF-8 JSON for `data`, as bytes."""
+    if orjson is not None:
+        content = orjson.dumps(data, default=_encoder.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+    else:
+        content = _encoder.encode(data).encode()
+    # Like DRF, escape the two characters that are valid JSON but not valid JavaScript.
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """DRF's JSONRenderer, encoding with orjson when it is installed. Indented output is left to DRF."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class JSONArrayRenderer(JSONRenderer):
+    """
+    JSON renderer that can also stream a list. Use it for content
+    negotiation and errors, and pass the items through stream() to a
+    StreamingHttpResponse.
+    """
+
+    def stream(self, items):
+        """Encode an iterable as one JSON array, yielding JSON_STREAM_CHUNK_SIZE items at a time."""
+        items = iter(items)
+        size = get_setting('JSON_STREAM_CHUNK_SIZE')
+        prefix = b'['
+        while chunk := list(islice(items, size)):
+            yield prefix + b','.join(map(dumps, chunk))
+            prefix = b','
+        yield b'[]' if prefix == b'[' else b']'
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Render a list of flat dicts (or a single dict, such as error details) as
+    CSV with a header row. Large exports stream their rows themselves and
+    only rely on this for content negotiation and errors.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        buffer = io.StringIO()
+        if rows:
+            writer = csv.DictWriter(buffer, fieldnames=list(rows[0]), extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        return buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Render a list as newline-delimited JSON, one item per line (a single object is one line)."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return b''.join(dumps(row) + b'\n' for row in rows)
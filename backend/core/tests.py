@@ -1,3 +1,51 @@
-from django.test import TestCase
+import json
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+
+from . import renderers
+
+
+class JSONRendererTests(SimpleTestCase):
+    data = {
+        'latitude': Decimal('27.700000'),
+        'created_at': datetime(2026, 10, 17, 9, 30, 5, 123456, tzinfo=dt_timezone.utc),
+        'date': datetime(2026, 10, 17).date(),
+        'took': timedelta(seconds=90),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'label': gettext_lazy('Road Issues'),
+        'text': 'line\u2028separator, न',
+        'by_day': {1: [1, 2.5, None, True]},
+    }
+
+    def render(self, **kwargs):
+        return renderers.JSONRenderer().render(self.data, 'application/json', **kwargs)
+
+    @skipIf(renderers.orjson is None, 'orjson is not installed')
+    def test_orjson_matches_stdlib(self):
+        fast = self.render()
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(self.render(), fast)
+
+    def test_output(self):
+        content = self.render()
+        self.assertIn(b'line\\u2028separator', content)
+        self.assertEqual(json.loads(content), {
+            'latitude': 27.7, 'created_at': '2026-10-17T09:30:05.123456Z', 'date': '2026-10-17',
+            'took': '90.0', 'id': '12345678-1234-5678-1234-567812345678', 'label': 'Road Issues',
+            'text': 'line\u2028separator, न', 'by_day': {'1': [1, 2.5, None, True]},
+        })
+        # Indented output for the browsable API still works.
+        indented = renderers.JSONRenderer().render(self.data, 'application/json; indent=2')
+        self.assertEqual(json.loads(indented), json.loads(content))
+
+    @override_settings(REST_FRAMEWORK={'JSON_STREAM_CHUNK_SIZE': 2})
+    def test_stream_array_in_chunks(self):
+        chunks = list(renderers.JSONArrayRenderer().stream({'n': n} for n in range(5)))
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(json.loads(b''.join(chunks)), [{'n': n} for n in range(5)])
+        self.assertEqual(b''.join(renderers.JSONArrayRenderer().stream([])), b'[]')
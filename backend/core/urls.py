@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import cache_stats
+
+urlpatterns = [
+    path('cache/stats/', cache_stats, name='cache-stats'),
+]
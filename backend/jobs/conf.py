@@ -0,0 +1,20 @@
+from django.conf import settings
+
+DEFAULTS = {
+    # Number of jobs run at once by `manage.py runworker`.
+    'CONCURRENCY': 4,
+    # 'thread' or 'process' pool; 'inline' runs jobs one by one in the worker itself.
+    'MODE': 'thread',
+    # How long a claimed job stays reserved before another worker may take it over.
+    'LEASE_SECONDS': 300,
+    # Seconds the worker sleeps when the queue is empty.
+    'POLL_INTERVAL': 1.0,
+    'MAX_ATTEMPTS': 5,
+    # Retry delay is BACKOFF_SECONDS * 2 ** (attempts - 1), capped at MAX_BACKOFF_SECONDS.
+    'BACKOFF_SECONDS': 10,
+    'MAX_BACKOFF_SECONDS': 3600,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'JOBS', {}).get(name, DEFAULTS[name])
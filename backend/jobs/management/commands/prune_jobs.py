@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from jobs.retention import prune_jobs
+
+
+class Command(BaseCommand):
+    help = "Delete finished background jobs: done ones after a week, failed ones after a month."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--done-days', type=int, default=7,
+            help="Delete done jobs finished more than this many days ago (default: 7).",
+        )
+        parser.add_argument(
+            '--failed-days', type=int, default=30,
+            help="Delete failed jobs that gave up more than this many days ago (default: 30).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Rows deleted per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help="Seconds to sleep between batches to give workers room.",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = prune_jobs(
+            now - timedelta(days=options['done_days']),
+            now - timedelta(days=options['failed_days']),
+            options['batch_size'],
+            options['pause'],
+        )
+        self.stdout.write(f"Deleted {deleted['done']} done job(s) older than {options['done_days']} day(s).")
+        self.stdout.write(f"Deleted {deleted['failed']} failed job(s) older than {options['failed_days']} day(s).")
+        self.stdout.write(self.style.SUCCESS(f"Reclaimed {deleted['done'] + deleted['failed']} row(s)."))
@@ -0,0 +1,48 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from jobs.conf import get_setting
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Run a background job worker that pulls jobs from the database queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=get_setting('CONCURRENCY'),
+            help="Number of jobs to run at once.",
+        )
+        parser.add_argument(
+            '--mode', choices=['thread', 'process', 'inline'], default=get_setting('MODE'),
+            help="Run jobs on a thread pool, a process pool, or one at a time in this process.",
+        )
+        parser.add_argument(
+            '--lease', type=int, default=get_setting('LEASE_SECONDS'),
+            help="Seconds a claimed job stays reserved for this worker.",
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help="Exit once the queue has no ready jobs instead of waiting for more.",
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options['concurrency'],
+            mode=options['mode'],
+            lease_seconds=options['lease'],
+        )
+
+        def shut_down(signum, frame):
+            self.stdout.write("Finishing running jobs, then stopping...")
+            worker.stop()
+
+        signal.signal(signal.SIGINT, shut_down)
+        signal.signal(signal.SIGTERM, shut_down)
+
+        self.stdout.write(
+            f"Worker {worker.worker_id} started ({options['mode']}, concurrency {options['concurrency']})."
+        )
+        processed = worker.run(burst=options['burst'])
+        self.stdout.write(self.style.SUCCESS(f"Worker stopped after {processed} job(s)."))
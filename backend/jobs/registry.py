@@ -0,0 +1,44 @@
+from django.utils import timezone
+
+from .conf import get_setting
+from .models import Job
+
+_tasks = {}
+
+
+def task(name=None, max_attempts=None):
+    """
+    Register a function as a background task.
+
+    The function receives the job payload as keyword arguments, so both must
+    be JSON-serializable. The decorated function gains an ``enqueue(**payload)``
+    helper and can still be called directly.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        _tasks[task_name] = func
+        func.task_name = task_name
+        func.enqueue = lambda **payload: enqueue(task_name, max_attempts=max_attempts, **payload)
+        return func
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise LookupError(f"No background task registered as '{name}'.")
+
+
+def enqueue(task_name, *, run_at=None, max_attempts=None, **payload):
+    """
+    Queue a job. Enqueueing inside a transaction makes the job part of it:
+    workers only see the job once the surrounding transaction commits.
+    """
+    get_task(task_name)
+    return Job.objects.create(
+        task=task_name,
+        payload=payload,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or get_setting('MAX_ATTEMPTS'),
+    )
@@ -0,0 +1,38 @@
+"""
+Retention for the job queue.
+
+Finished jobs stay in the table after they run: done ones as a record of
+what happened, failed ones with the traceback that stopped them.
+prune_jobs() deletes them once they are older than a cutoff, in bounded
+batches each in its own short transaction, so the queue table stays small
+without holding a long lock on it. Queued and running jobs are never
+touched.
+"""
+import time
+
+from django.db import transaction
+
+from .models import Job
+
+
+def prune_jobs(done_before, failed_before, batch_size=1000, pause=0):
+    """
+    Delete done jobs last updated before `done_before` and failed jobs last
+    updated before `failed_before`. Returns {status: rows deleted}.
+    """
+    deleted = {}
+    for status, cutoff in (('done', done_before), ('failed', failed_before)):
+        deleted[status] = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    Job.objects.filter(status=status, updated_at__lt=cutoff)
+                    .order_by('id').values_list('id', flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                Job.objects.filter(id__in=ids).delete()
+            deleted[status] += len(ids)
+            if pause:
+                time.sleep(pause)
+    return deleted
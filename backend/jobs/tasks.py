@@ -0,0 +1,13 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .registry import task
+from .retention import prune_jobs
+
+
+@task('jobs.prune')
+def prune(done_days=7, failed_days=30, batch_size=1000):
+    """Queueable form of `manage.py prune_jobs`, for scheduled runs."""
+    now = timezone.now()
+    prune_jobs(now - timedelta(days=done_days), now - timedelta(days=failed_days), batch_size)
@@ -0,0 +1,129 @@
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .registry import enqueue, task
+from .worker import Worker, claim_jobs, execute_job, run_pending
+
+calls = []
+
+
+@task('jobs.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task('jobs.tests.explode')
+def explode():
+    raise RuntimeError('boom')
+
+
+@task('jobs.tests.outlive_lease')
+def outlive_lease(seconds):
+    time.sleep(seconds)
+    # Another worker looking for work once the original lease has run out.
+    calls.append(claim_jobs('worker-b', 1, 60))
+
+
+class QueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueued_job_runs_once(self):
+        job = record.enqueue(value=42)
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, [42])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 1))
+        self.assertEqual(run_pending(), 0)
+
+    def test_unknown_task_is_rejected_at_enqueue(self):
+        with self.assertRaises(LookupError):
+            enqueue('jobs.tests.missing')
+
+    def test_future_jobs_wait_for_run_at(self):
+        record.enqueue(value=1)
+        enqueue('jobs.tests.record', value=2, run_at=timezone.now() + timedelta(hours=1))
+        run_pending()
+        self.assertEqual(calls, [1])
+
+    @override_settings(JOBS={'BACKOFF_SECONDS': 30})
+    def test_failures_retry_with_backoff_then_fail(self):
+        job = enqueue('jobs.tests.explode', max_attempts=2)
+        with self.assertLogs('jobs.worker', 'WARNING'):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=25))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_a_job_is_claimed_by_one_worker_only(self):
+        job = record.enqueue(value=1)
+        self.assertEqual(claim_jobs('worker-a', 5, 60), [job.pk])
+        self.assertEqual(claim_jobs('worker-b', 5, 60), [])
+        # worker-b can't finish a job it doesn't hold.
+        self.assertIsNone(execute_job(job.pk, 'worker-b'))
+        self.assertEqual(execute_job(job.pk, 'worker-a'), 'done')
+
+    def test_expired_lease_is_reclaimed(self):
+        job = record.enqueue(value=7)
+        claim_jobs('crashed-worker', 1, 60)
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim_jobs('worker-b', 1, 60), [job.pk])
+        self.assertEqual(execute_job(job.pk, 'worker-b'), 'done')
+        self.assertIsNone(execute_job(job.pk, 'crashed-worker'))
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(calls, [7])
+
+
+    def test_prune_deletes_old_finished_jobs(self):
+        now = timezone.now()
+        for status, days in [('done', 8), ('done', 1), ('failed', 8), ('failed', 31), ('queued', 60)]:
+            job = record.enqueue(value=status)
+            Job.objects.filter(pk=job.pk).update(status=status, updated_at=now - timedelta(days=days))
+        out = StringIO()
+        call_command('prune_jobs', stdout=out)
+        self.assertIn('Reclaimed 2 row(s)', out.getvalue())
+        self.assertEqual(
+            sorted(Job.objects.values_list('status', flat=True)), ['done', 'failed', 'queued'],
+        )
+
+
+class WorkerPoolTests(TransactionTestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_thread_pool_drains_queue(self):
+        for value in range(25):
+            record.enqueue(value=value)
+        processed = Worker(concurrency=4, mode='thread', poll_interval=0.05).run(burst=True)
+        self.assertEqual(processed, 25)
+        self.assertEqual(sorted(calls), list(range(25)))
+        self.assertEqual(Job.objects.filter(status='done').count(), 25)
+
+    def test_runworker_command_in_burst_mode(self):
+        record.enqueue(value='cli')
+        out = StringIO()
+        call_command('runworker', '--burst', '--mode', 'thread', '--concurrency', '2', stdout=out)
+        self.assertIn('after 1 job(s)', out.getvalue())
+        self.assertEqual(calls, ['cli'])
+
+    def test_lease_is_renewed_while_a_job_runs(self):
+        outlive_lease.enqueue(seconds=1.0)
+        Worker(mode='inline', lease_seconds=0.6).run(burst=True)
+        self.assertEqual(calls, [[]])
+        self.assertEqual(Job.objects.get().status, 'done')
@@ -0,0 +1,229 @@
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .conf import get_setting
+from .models import Job
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+
+def ready_jobs(now):
+    """Jobs that are due, plus running jobs whose worker let the lease expire."""
+    return Q(status='queued', run_at__lte=now) | Q(status='running', locked_until__lt=now)
+
+
+def get_backoff(attempts):
+    delay = get_setting('BACKOFF_SECONDS') * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, get_setting('MAX_BACKOFF_SECONDS')))
+
+
+def claim_jobs(worker_id, limit, lease_seconds):
+    """
+    Claim up to `limit` ready jobs for `worker_id` and return their ids.
+
+    Each claim is an UPDATE that re-checks readiness in its WHERE clause, so
+    when several workers race for the same row exactly one of them wins. This
+    holds on SQLite as well as on databases with row locks.
+    """
+    if limit < 1:
+        return []
+    now = timezone.now()
+    candidates = list(
+        Job.objects.filter(ready_jobs(now)).order_by('run_at', 'id').values_list('id', flat=True)[:limit]
+    )
+    claimed = []
+    for job_id in candidates:
+        won = Job.objects.filter(ready_jobs(now), id=job_id).update(
+            status='running',
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=lease_seconds),
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+        if won:
+            claimed.append(job_id)
+    return claimed
+
+
+def renew_lease(job_id, worker_id, lease_seconds):
+    """Extend the lease on a job `worker_id` is running. Returns False if the lease was lost."""
+    now = timezone.now()
+    return bool(Job.objects.filter(id=job_id, locked_by=worker_id, status='running').update(
+        locked_until=now + timedelta(seconds=lease_seconds), updated_at=now,
+    ))
+
+
+class LeaseHeartbeat(threading.Thread):
+    """
+    Renews a running job's lease every third of the lease, so a job that
+    runs longer than the lease isn't handed to another worker while its own
+    worker is still alive. Uses its own database connection.
+    """
+
+    def __init__(self, job_id, worker_id, lease_seconds):
+        super().__init__(name=f'jobs-heartbeat-{job_id}', daemon=True)
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.lease_seconds / 3):
+                try:
+                    if not renew_lease(self.job_id, self.worker_id, self.lease_seconds):
+                        return
+                except DatabaseError:
+                    logger.warning("Could not renew the lease on job %s", self.job_id, exc_info=True)
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def execute_job(job_id, worker_id, lease_seconds=None):
+    """
+    Run a claimed job, renewing its lease while it runs, and record the
+    outcome. Returns the job's final status.
+    """
+    try:
+        job = Job.objects.get(id=job_id, locked_by=worker_id, status='running')
+    except Job.DoesNotExist:
+        # Our lease expired and another worker took the job over.
+        return None
+    # Only write the outcome while we still hold the lease.
+    owned = Job.objects.filter(id=job.id, locked_by=worker_id, status='running')
+
+    if job.attempts > job.max_attempts:
+        owned.update(status='failed', locked_until=None, updated_at=timezone.now(),
+                     last_error=job.last_error or 'Lease expired on every attempt.')
+        return 'failed'
+
+    heartbeat = LeaseHeartbeat(job.id, worker_id, lease_seconds or get_setting('LEASE_SECONDS'))
+    heartbeat.start()
+    try:
+        with transaction.atomic():
+            get_task(job.task)(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.error("Job %s (%s) failed permanently:\n%s", job.id, job.task, error)
+            owned.update(status='failed', locked_until=None, last_error=error, updated_at=timezone.now())
+            return 'failed'
+        logger.warning("Job %s (%s) failed on attempt %s, retrying.", job.id, job.task, job.attempts)
+        now = timezone.now()
+        owned.update(status='queued', locked_by='', locked_until=None, last_error=error,
+                     run_at=now + get_backoff(job.attempts), updated_at=now)
+        return 'queued'
+    finally:
+        heartbeat.stop()
+
+    owned.update(status='done', locked_until=None, last_error='', updated_at=timezone.now())
+    return 'done'
+
+
+def execute_pooled_job(job_id, worker_id, lease_seconds):
+    """Pool entry point: like execute_job, but on a connection owned by the pool thread or process."""
+    close_old_connections()
+    try:
+        return execute_job(job_id, worker_id, lease_seconds)
+    finally:
+        close_old_connections()
+
+
+class Worker:
+    """
+    Pulls jobs from the database queue and runs them on a thread or process pool.
+
+    Any number of workers, on any number of machines, can share the queue.
+    """
+
+    def __init__(self, concurrency=None, mode=None, lease_seconds=None, poll_interval=None):
+        self.concurrency = concurrency or get_setting('CONCURRENCY')
+        self.mode = mode or get_setting('MODE')
+        self.lease_seconds = lease_seconds or get_setting('LEASE_SECONDS')
+        self.poll_interval = poll_interval if poll_interval is not None else get_setting('POLL_INTERVAL')
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.stopping = False
+        if self.mode not in ('thread', 'process', 'inline'):
+            raise ValueError(f"Unknown worker mode '{self.mode}'.")
+
+    def stop(self):
+        """Stop claiming jobs; jobs already running are allowed to finish."""
+        self.stopping = True
+
+    def make_pool(self):
+        if self.mode == 'process':
+            # Spawned children start clean (no inherited DB connections) and set Django up themselves.
+            return ProcessPoolExecutor(
+                self.concurrency,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return ThreadPoolExecutor(self.concurrency, thread_name_prefix='jobs-worker')
+
+    def run(self, burst=False):
+        """
+        Process jobs until stop() is called. With burst=True, return as soon as
+        no ready jobs are left. Returns the number of jobs processed.
+        """
+        if self.mode == 'inline':
+            return self.run_inline(burst)
+
+        processed = 0
+        in_flight = set()
+        pool = self.make_pool()
+        try:
+            while not self.stopping:
+                claimed = claim_jobs(self.worker_id, self.concurrency - len(in_flight), self.lease_seconds)
+                in_flight.update(
+                    pool.submit(execute_pooled_job, job_id, self.worker_id, self.lease_seconds) for job_id in claimed
+                )
+                if not in_flight:
+                    if burst:
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+                done, in_flight = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    processed += 1
+                    if future.exception():
+                        logger.error("Worker pool crashed running a job", exc_info=future.exception())
+        finally:
+            pool.shutdown(wait=True)
+        # Anything still in flight when we stopped has finished by now.
+        return processed + len(in_flight)
+
+    def run_inline(self, burst):
+        processed = 0
+        while not self.stopping:
+            claimed = claim_jobs(self.worker_id, 1, self.lease_seconds)
+            if not claimed:
+                if burst:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            execute_job(claimed[0], self.worker_id, self.lease_seconds)
+            processed += 1
+        return processed
+
+
+def run_pending():
+    """Run every ready job in the current thread and return how many ran."""
+    return Worker(mode='inline').run(burst=True)
@@ -0,0 +1,132 @@
+"""
+Pub/sub for live notification delivery to the SSE stream.
+
+A broker fans events out to the streams connected to this server process.
+InProcessBroker only sees notifications published in the same process.
+DatabaseBroker instead tails the notifications table, so every server
+process sees rows written by any process (web workers, `runworker`, ...).
+Pick one with the NOTIFICATIONS_BROKER setting.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import Notification
+from .serializers import NotificationSerializer
+
+
+def notification_event(notification):
+    return dict(NotificationSerializer(notification).data)
+
+
+class InProcessBroker:
+    """Delivers events published in this process to this process's subscribers."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, event):
+        """Send an event to a user's open streams. Safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        """Yield an asyncio.Queue receiving the user's events while the context is open."""
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers[user_id].add(entry)
+        try:
+            await self.listen()
+            yield entry[1]
+        finally:
+            with self._lock:
+                self._subscribers[user_id].discard(entry)
+                if not self._subscribers[user_id]:
+                    del self._subscribers[user_id]
+
+    async def listen(self):
+        """Hook run when a stream subscribes, to start receiving events from elsewhere."""
+
+    def subscribed_users(self):
+        with self._lock:
+            return list(self._subscribers)
+
+
+class DatabaseBroker(InProcessBroker):
+    """
+    Shares events between processes by tailing the notifications table.
+
+    Each server process runs one poller, however many streams it has open.
+    The poller makes one primary-key range query per interval and hands new
+    rows to the local subscribers.
+    """
+    poll_interval = 1.0
+    batch_size = 500
+
+    def __init__(self):
+        super().__init__()
+        self._poller = None
+
+    def publish(self, user_id, event):
+        # The committed row is the message; the pollers pick it up.
+        pass
+
+    async def listen(self):
+        if self._poller is None or self._poller.done():
+            last_id = await sync_to_async(self._latest_id)()
+            self._poller = asyncio.get_running_loop().create_task(self._poll(last_id))
+
+    def _latest_id(self):
+        return Notification.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    def _fetch_since(self, last_id, user_ids):
+        rows = list(Notification.objects.filter(id__gt=last_id).order_by('id')[:self.batch_size])
+        if rows:
+            last_id = rows[-1].id
+        return last_id, [(n.user_id, notification_event(n)) for n in rows if n.user_id in user_ids]
+
+    async def _poll(self, last_id):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            user_ids = set(self.subscribed_users())
+            if not user_ids:
+                self._poller = None
+                return
+            last_id, events = await sync_to_async(self._fetch_since)(last_id, user_ids)
+            for user_id, event in events:
+                InProcessBroker.publish(self, user_id, event)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        path = getattr(settings, 'NOTIFICATIONS_BROKER', 'notifications.broker.DatabaseBroker')
+        _broker = import_string(path)()
+    return _broker
+
+
+def publish_notifications(notifications):
+    """Push saved notifications to connected streams once the current transaction commits."""
+    events = [(n.user_id, notification_event(n)) for n in notifications if n.pk]
+    if not events:
+        return
+    broker = get_broker()
+
+    def send():
+        for user_id, event in events:
+            broker.publish(user_id, event)
+
+    transaction.on_commit(send)
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notifications.retention import compact_status_updates, purge_read
+
+
+class Command(BaseCommand):
+    help = "Collapse superseded status updates into digests and delete old read notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=30,
+            help="Delete read notifications older than this many days (default: 30).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Rows handled per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help="Seconds to sleep between batches to give other writers room.",
+        )
+        parser.add_argument(
+            '--archive', metavar='FILE',
+            help="Append deleted notifications to FILE as JSON lines before deleting them.",
+        )
+        parser.add_argument('--no-compact', action='store_true', help="Skip digest compaction.")
+        parser.add_argument('--no-purge', action='store_true', help="Skip deleting old read notifications.")
+
+    def handle(self, *args, **options):
+        compacted = purged = 0
+        if not options['no_compact']:
+            compacted = compact_status_updates(batch_size=options['batch_size'], pause=options['pause'])
+        if not options['no_purge']:
+            cutoff = timezone.now() - timedelta(days=options['days'])
+            if options['archive']:
+                with open(options['archive'], 'a') as archive:
+                    purged = purge_read(cutoff, options['batch_size'], options['pause'], archive)
+            else:
+                purged = purge_read(cutoff, options['batch_size'], options['pause'])
+
+        self.stdout.write(f"Collapsed {compacted} superseded status update(s) into digests.")
+        self.stdout.write(f"Deleted {purged} read notification(s) older than {options['days']} day(s).")
+        self.stdout.write(self.style.SUCCESS(f"Reclaimed {compacted + purged} row(s)."))
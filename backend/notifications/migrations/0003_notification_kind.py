@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:27
+
+from django.db import migrations, models
+
+
+def classify_existing(apps, schema_editor):
+    Notification = apps.get_model('notifications', 'Notification')
+    Notification.objects.filter(message__startswith='New complaint submitted:').update(kind='new_complaint')
+    Notification.objects.filter(message__contains=' status updated to: ').update(kind='status_update')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_inbox_indexes_notificationcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(choices=[('general', 'General'), ('new_complaint', 'New Complaint'), ('status_update', 'Status Update'), ('assignment', 'Assignment'), ('digest', 'Status Digest')], default='general', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='update_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(classify_existing, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,91 @@
+from collections import Counter
+
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
 
+
+class NotificationManager(models.Manager):
+
+    def deliver(self, notifications):
+        """
+        Insert notifications with one query, bump the recipients' unread
+        counters and push the rows to any open live streams.
+        """
+        from .broker import publish_notifications
+
+        notifications = self.bulk_create(notifications)
+        NotificationCounter.add_unread(Counter(n.user_id for n in notifications if not n.is_read))
+        publish_notifications(notifications)
+        return notifications
+
+
 class Notification(models.Model):
+    KIND_CHOICES = [
+        ('general', 'General'),
+        ('new_complaint', 'New Complaint'),
+        ('status_update', 'Status Update'),
+        ('assignment', 'Assignment'),
+        ('digest', 'Status Digest'),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
     complaint = models.ForeignKey('complaints.Complaint', on_delete=models.CASCADE, null=True, blank=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='general')
     message = models.TextField()
+    # How many status updates a digest row stands for.
+    update_count = models.PositiveIntegerField(default=1)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = NotificationManager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_inbox_idx'),
+            models.Index(fields=['user', 'is_read', 'created_at'], name='notification_unread_idx'),
+        ]
 
     def __str__(self):
         return f"Notification for {self.user.username}: {self.message[:20]}"
+
+
+class NotificationCounter(models.Model):
+    """Per-user count of unread notifications, kept in step with Notification writes"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread} unread"
+
+    @classmethod
+    def get_unread(cls, user):
+        try:
+            return cls.objects.values_list('unread', flat=True).get(user=user)
+        except cls.DoesNotExist:
+            # First request for this user: seed the counter from their notifications.
+            unread = Notification.objects.filter(user=user, is_read=False).count()
+            counter, _ = cls.objects.get_or_create(user=user, defaults={'unread': unread})
+            return counter.unread
+
+    @classmethod
+    def add_unread(cls, counts):
+        """Add {user_id: n} to the unread counters, using one UPDATE per distinct n."""
+        counts = {user_id: n for user_id, n in counts.items() if n}
+        if not counts:
+            return
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, unread=0) for user_id in counts], ignore_conflicts=True
+        )
+        by_amount = {}
+        for user_id, n in counts.items():
+            by_amount.setdefault(n, []).append(user_id)
+        for n, user_ids in by_amount.items():
+            cls.objects.filter(user_id__in=user_ids).update(unread=F('unread') + n)
+
+    @classmethod
+    def remove_unread(cls, user_id, n=1):
+        if n:
+            cls.objects.filter(user_id=user_id).update(unread=Greatest(F('unread') - n, 0))
@@ -0,0 +1,110 @@
+"""
+Retention for the notifications table.
+
+compact_status_updates() collapses the status-update notifications a user
+has for one complaint into a single digest row. purge_read() removes read
+notifications past a given age. Both work in bounded batches, each in its
+own short transaction, so neither holds a long lock on the table.
+"""
+import json
+import time
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Notification, NotificationCounter
+
+DIGEST_KINDS = ('status_update', 'digest')
+
+
+def compact_status_updates(batch_size=500, pause=0):
+    """
+    Collapse superseded status updates per (user, complaint) into one digest
+    row and return how many rows were removed.
+
+    The newest row in each group survives. It becomes a digest that counts
+    every update it replaces, and it stays unread if any replaced row was unread.
+    """
+    removed = 0
+    last_group = (0, 0)
+    while True:
+        groups = list(
+            Notification.objects.filter(kind__in=DIGEST_KINDS, complaint__isnull=False)
+            .filter(Q(user_id__gt=last_group[0]) | Q(user_id=last_group[0], complaint_id__gt=last_group[1]))
+            .values_list('user_id', 'complaint_id')
+            .annotate(rows=Count('id'))
+            .filter(rows__gt=1)
+            .order_by('user_id', 'complaint_id')[:batch_size]
+        )
+        if not groups:
+            return removed
+        last_group = groups[-1][:2]
+        removed += _compact_groups({(user_id, complaint_id) for user_id, complaint_id, _ in groups})
+        if pause:
+            time.sleep(pause)
+
+
+@transaction.atomic
+def _compact_groups(groups):
+    rows = Notification.objects.filter(
+        kind__in=DIGEST_KINDS,
+        user_id__in={user_id for user_id, _ in groups},
+        complaint_id__in={complaint_id for _, complaint_id in groups},
+    ).order_by('id')
+    by_group = {}
+    for notification in rows:
+        key = (notification.user_id, notification.complaint_id)
+        if key in groups:
+            by_group.setdefault(key, []).append(notification)
+
+    superseded = []
+    digests = []
+    # Unread rows that disappear into a digest; the digest itself counts once.
+    unread_removed = Counter()
+    for (user_id, _), notifications in by_group.items():
+        *older, latest = notifications
+        if not older:
+            continue
+        unread = sum(1 for n in notifications if not n.is_read)
+        unread_removed[user_id] += max(unread - 1, 0)
+        total = sum(n.update_count for n in notifications)
+        if latest.kind == 'status_update':
+            latest.message = f"{latest.message} (latest of {total} updates)"
+        latest.kind = 'digest'
+        latest.update_count = total
+        latest.is_read = not unread
+        digests.append(latest)
+        superseded.extend(n.pk for n in older)
+
+    Notification.objects.bulk_update(digests, ['kind', 'message', 'update_count', 'is_read'])
+    for user_id, n in unread_removed.items():
+        NotificationCounter.remove_unread(user_id, n)
+    # Mark as read first so the post_delete counter hook has nothing left to adjust.
+    doomed = Notification.objects.filter(pk__in=superseded)
+    doomed.update(is_read=True)
+    doomed.delete()
+    return len(superseded)
+
+
+def purge_read(cutoff, batch_size=1000, pause=0, archive=None):
+    """
+    Delete read notifications created before `cutoff`, oldest first, and
+    return how many were deleted. Rows are written to the `archive` file
+    object as JSON lines before they are deleted.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            batch = Notification.objects.filter(is_read=True, created_at__lt=cutoff).order_by('id')
+            ids = list(batch.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            if archive is not None:
+                for row in Notification.objects.filter(id__in=ids).values().iterator():
+                    archive.write(json.dumps(row, default=str) + '\n')
+            Notification.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        if pause:
+            time.sleep(pause)
+
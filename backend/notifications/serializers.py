@@ -4,5 +4,5 @@ from .models import Notification
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
-        fields = ['id', 'user', 'complaint', 'message', 'is_read', 'created_at']
-        read_only_fields = ['user', 'created_at']
+        fields = ['id', 'user', 'complaint', 'kind', 'message', 'update_count', 'is_read', 'created_at']
+        read_only_fields = ['user', 'kind', 'update_count', 'created_at']
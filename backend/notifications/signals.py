@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import Notification, NotificationCounter
+
+
+@receiver(post_delete, sender=Notification)
+def discount_deleted_notification(sender, instance, **kwargs):
+    """Deleting an unread notification (directly or by cascade) lowers the unread count."""
+    if not instance.is_read:
+        NotificationCounter.remove_unread(instance.user_id)
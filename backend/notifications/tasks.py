@@ -0,0 +1,14 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from jobs.registry import task
+
+from .retention import compact_status_updates, purge_read
+
+
+@task('notifications.prune')
+def prune(days=30, batch_size=1000):
+    """Queueable form of `manage.py prune_notifications`, for scheduled runs."""
+    compact_status_updates(batch_size=batch_size)
+    purge_read(timezone.now() - timedelta(days=days), batch_size=batch_size)
@@ -1,3 +1,190 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import json
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import broker
+from complaints.models import Complaint
+from .models import Notification, NotificationCounter
+
+
+class NotificationStreamTests(TestCase):
+    url = '/api/notifications/stream/'
+
+    def setUp(self):
+        self.user = User.objects.create_user('citizen')
+        self.token = str(AccessToken.for_user(self.user))
+        broker._broker = None
+
+    def tearDown(self):
+        broker._broker = None
+
+    async def open_stream(self, **params):
+        response = await self.async_client.get(self.url, {'token': self.token, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        return stream
+
+    async def disconnect(self, stream):
+        # Cancel a pending read, the way the ASGI server does when the client goes away.
+        read = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        read.cancel()
+        with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+            await read
+
+    async def next_event(self, stream):
+        chunk = (await asyncio.wait_for(anext(stream), timeout=5)).decode()
+        lines = dict(line.split(': ', 1) for line in chunk.strip().splitlines())
+        return int(lines['id']), json.loads(lines['data'])
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(self.url, {'token': 'garbage'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_resumes_from_last_event_id(self):
+        first, second, third = [
+            await Notification.objects.acreate(user=self.user, message=f'n{i}') for i in range(3)
+        ]
+        stream = await self.open_stream(last_event_id=first.pk)
+        self.assertEqual((await self.next_event(stream))[0], second.pk)
+        event_id, data = await self.next_event(stream)
+        self.assertEqual((event_id, data['message']), (third.pk, 'n2'))
+        await self.disconnect(stream)
+
+    @override_settings(NOTIFICATIONS_BROKER='notifications.broker.InProcessBroker')
+    async def test_in_process_broker_pushes_published_notifications(self):
+        stream = await self.open_stream()
+        pending = asyncio.ensure_future(self.next_event(stream))
+        await asyncio.sleep(0)
+        notification = await Notification.objects.acreate(user=self.user, message='live')
+        broker.get_broker().publish(self.user.pk, await sync_to_async(broker.notification_event)(notification))
+        event_id, data = await pending
+        self.assertEqual((event_id, data['message']), (notification.pk, 'live'))
+        await self.disconnect(stream)
+
+    async def test_database_broker_picks_up_new_rows(self):
+        broker.DatabaseBroker.poll_interval = 0.05
+        try:
+            stream = await self.open_stream()
+            pending = asyncio.ensure_future(self.next_event(stream))
+            await asyncio.sleep(0.1)
+            other = await User.objects.acreate(username='someone-else')
+            await Notification.objects.acreate(user=other, message='not for you')
+            notification = await Notification.objects.acreate(user=self.user, message='from the worker')
+            event_id, data = await pending
+            self.assertEqual((event_id, data['message']), (notification.pk, 'from the worker'))
+            await self.disconnect(stream)
+        finally:
+            broker.DatabaseBroker.poll_interval = 1.0
+
+
+class UnreadCounterTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('citizen')
+        self.client.force_authenticate(self.user)
+
+    def unread_count(self):
+        response = self.client.get('/api/notifications/unread_count/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['unread_count']
+
+    def test_counter_follows_delivery_and_reads(self):
+        delivered = Notification.objects.deliver([
+            Notification(user=self.user, message=f'n{i}') for i in range(3)
+        ])
+        self.assertEqual(self.unread_count(), 3)
+
+        self.client.post(f'/api/notifications/{delivered[0].pk}/mark_read/')
+        self.client.post(f'/api/notifications/{delivered[0].pk}/mark_read/')
+        self.assertEqual(self.unread_count(), 2)
+
+        self.client.delete(f'/api/notifications/{delivered[1].pk}/')
+        self.assertEqual(self.unread_count(), 1)
+
+        self.client.post('/api/notifications/mark_all_read/')
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_unread_count_is_a_single_lookup(self):
+        Notification.objects.deliver([Notification(user=self.user, message='hello')])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.unread_count(), 1)
+
+    def test_inbox_is_cursor_paginated(self):
+        Notification.objects.deliver([Notification(user=self.user, message=f'n{i}') for i in range(25)])
+        first = self.client.get('/api/notifications/').data
+        self.assertEqual(len(first['results']), 20)
+        second = self.client.get(first['next']).data
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+        messages = [n['message'] for n in first['results'] + second['results']]
+        self.assertEqual(messages, [f'n{i}' for i in reversed(range(25))])
+
+
+class RetentionTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('citizen')
+        self.complaint = Complaint.objects.create(
+            title='Broken pipe', category='water', description='Leak', location='Ward 3'
+        )
+
+    def status_update(self, status, is_read=False):
+        return Notification.objects.deliver([Notification(
+            user=self.user, complaint=self.complaint, kind='status_update', is_read=is_read,
+            message=f'Complaint {self.complaint.complaint_id} status updated to: {status}',
+        )])[0]
+
+    def prune(self, *args):
+        out = StringIO()
+        call_command('prune_notifications', *args, stdout=out)
+        return out.getvalue()
+
+    def test_status_updates_collapse_into_one_digest(self):
+        self.status_update('Assigned', is_read=True)
+        self.status_update('In Progress')
+        latest = self.status_update('Resolved')
+        Notification.objects.deliver([Notification(user=self.user, complaint=self.complaint, message='other')])
+
+        output = self.prune('--no-purge')
+
+        self.assertIn('Collapsed 2 superseded', output)
+        digest = Notification.objects.get(kind='digest')
+        self.assertEqual(digest.pk, latest.pk)
+        self.assertEqual(digest.update_count, 3)
+        self.assertFalse(digest.is_read)
+        self.assertTrue(digest.message.endswith('status updated to: Resolved (latest of 3 updates)'))
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(NotificationCounter.get_unread(self.user), 2)
+
+        # A later update folds into the existing digest.
+        self.status_update('Resolved')
+        self.prune('--no-purge')
+        self.assertEqual(Notification.objects.get(kind='digest').update_count, 4)
+
+    def test_old_read_notifications_are_purged_in_batches(self):
+        old = timezone.now() - timedelta(days=45)
+        for i in range(5):
+            self.status_update(f's{i}', is_read=True)
+        unread = self.status_update('unread')
+        Notification.objects.update(created_at=old)
+        fresh = self.status_update('fresh', is_read=True)
+
+        output = self.prune('--no-compact', '--days', '30', '--batch-size', '2')
+
+        self.assertIn('Deleted 5 read notification(s)', output)
+        self.assertIn('Reclaimed 5 row(s)', output)
+        self.assertEqual(set(Notification.objects.values_list('pk', flat=True)), {unread.pk, fresh.pk})
+        self.assertEqual(NotificationCounter.get_unread(self.user), 1)
@@ -1,10 +1,25 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Notification
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework.exceptions import AuthenticationFailed
+from .broker import get_broker, notification_event, publish_notifications
+from core.pagination import KeysetPagination
+from .models import Notification, NotificationCounter
 from .serializers import NotificationSerializer
 
+STREAM_KEEPALIVE_SECONDS = 15
+STREAM_REPLAY_LIMIT = 100
+
+
 class NotificationViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing notifications.
@@ -12,21 +27,115 @@ class NotificationViewSet(viewsets.ModelViewSet):
     """
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            notification = serializer.save(user=self.request.user)
+            if not notification.is_read:
+                NotificationCounter.add_unread({notification.user_id: 1})
+        publish_notifications([notification])
+
+    def perform_update(self, serializer):
+        was_read = serializer.instance.is_read
+        with transaction.atomic():
+            notification = serializer.save()
+            if was_read and not notification.is_read:
+                NotificationCounter.add_unread({notification.user_id: 1})
+            elif notification.is_read and not was_read:
+                NotificationCounter.remove_unread(notification.user_id)
 
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        with transaction.atomic():
+            # Only a row that was still unread lowers the counter.
+            if Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True):
+                NotificationCounter.remove_unread(request.user.pk)
         return Response({'status': 'marked as read'})
 
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
-        self.get_queryset().update(is_read=True)
+        with transaction.atomic():
+            updated = self.get_queryset().filter(is_read=False).update(is_read=True)
+            NotificationCounter.remove_unread(request.user.pk, updated)
         return Response({'status': 'all marked as read'})
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """Number of unread notifications, read from the per-user counter."""
+        return Response({'unread_count': NotificationCounter.get_unread(request.user)})
+
+
+def _authenticate_stream(request):
+    """
+    Resolve the user for a stream request. Browsers' EventSource can't set
+    headers, so the JWT access token may also be passed as ?token=.
+    """
+    jwt = JWTAuthentication()
+    try:
+        token = request.GET.get('token')
+        if token:
+            return jwt.get_user(jwt.get_validated_token(token))
+        result = jwt.authenticate(request)
+        if result:
+            return result[0]
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+    user = request.user
+    return user if user.is_authenticated else None
+
+
+def _replay(user, last_event_id):
+    notifications = Notification.objects.filter(user=user, id__gt=last_event_id).order_by('id')
+    return [notification_event(n) for n in notifications[:STREAM_REPLAY_LIMIT]]
+
+
+def _format_event(event):
+    return f"id: {event['id']}\nevent: notification\ndata: {json.dumps(event)}\n\n"
+
+
+async def notification_stream(request):
+    """
+    Server-Sent Events stream of the user's new notifications.
+    URL: /api/notifications/stream/
+
+    Reconnecting clients send Last-Event-ID (or ?last_event_id=) and first
+    receive every notification they missed. Needs an ASGI server.
+    """
+    user = await sync_to_async(_authenticate_stream)(request)
+    if user is None:
+        return HttpResponse(status=401)
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0)
+    except ValueError:
+        last_event_id = 0
+
+    async def events():
+        nonlocal last_event_id
+        yield "retry: 3000\n\n"
+        # Subscribe before replaying so nothing published in between is lost.
+        async with get_broker().subscribe(user.pk) as queue:
+            if last_event_id:
+                for event in await sync_to_async(_replay)(user, last_event_id):
+                    last_event_id = event['id']
+                    yield _format_event(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event['id'] <= last_event_id:
+                    continue
+                last_event_id = event['id']
+                yield _format_event(event)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,22 @@
+from django.conf import settings
+
+DEFAULTS = {
+    # Largest file a client may announce, in bytes.
+    'MAX_SIZE': 20 * 1024 * 1024,
+    # Largest single chunk request, in bytes.
+    'MAX_CHUNK_SIZE': 5 * 1024 * 1024,
+    'ALLOWED_TYPES': ('image/jpeg', 'image/png', 'image/webp', 'image/gif'),
+    # Where chunks are assembled until the upload is complete.
+    'PARTIAL_DIR': settings.BASE_DIR / 'upload_parts',
+    # Normalized images are scaled down to fit within this many pixels.
+    'MAX_DIMENSION': 2560,
+    'JPEG_QUALITY': 85,
+    # Size of the process pool that normalizes finished uploads; 0 normalizes in the job itself.
+    'PROCESSES': 2,
+    # Unfinished or unused uploads are deleted after this long.
+    'EXPIRE_HOURS': 24,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'UPLOADS', {}).get(name, DEFAULTS[name])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from uploads.tasks import purge_expired_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete chunked uploads that were never finished or never attached to a complaint."
+
+    def handle(self, *args, **options):
+        count = purge_expired_uploads()
+        self.stdout.write(self.style.SUCCESS(f"{count} expired upload(s) deleted."))
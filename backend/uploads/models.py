@@ -0,0 +1,52 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+from complaints.storage import get_image_storage
+
+from .conf import get_setting
+
+
+class Upload(models.Model):
+    """An image sent in chunks, resumable after a dropped connection"""
+
+    STATUS_CHOICES = [
+        ('receiving', 'Receiving'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    # Total size announced by the client, and how much of it has arrived.
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='receiving')
+    # The normalized image, once processing has finished.
+    file = models.ImageField(upload_to='complaint_images/', storage=get_image_storage, blank=True)
+    error = models.TextField(blank=True)
+    # Set when a complaint takes the upload; an upload can only be used once.
+    complaint = models.ForeignKey(
+        'complaints.Complaint',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='uploads',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} [{self.status}]"
+
+    @property
+    def partial_path(self):
+        return os.path.join(get_setting('PARTIAL_DIR'), str(self.id))
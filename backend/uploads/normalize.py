@@ -0,0 +1,51 @@
+"""
+Ingest-time normalization of uploaded images.
+
+normalize_image() auto-rotates by the EXIF orientation, scales the image
+down to fit the configured dimension and re-encodes it as a baseline
+progressive JPEG without any metadata (EXIF, GPS and so on). It only deals
+with file paths and bytes, so it can run in a spawned worker process
+without Django. normalize() hands it to a shared process pool.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def normalize_image(path, max_dimension, quality):
+    """Return the normalized JPEG bytes for the image at `path`."""
+    with Image.open(path) as image:
+        image.draft('RGB', (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        buffer = BytesIO()
+        # No exif= argument, so none of the original metadata is written.
+        image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+        return buffer.getvalue()
+
+
+def get_pool(processes):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def normalize(path, max_dimension, quality, processes):
+    """Normalize an image on the process pool (or in this process when `processes` is 0)."""
+    if not processes:
+        return normalize_image(path, max_dimension, quality)
+    return get_pool(processes).submit(normalize_image, path, max_dimension, quality).result()
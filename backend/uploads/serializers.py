@@ -0,0 +1,40 @@
+from rest_framework import serializers
+
+from .conf import get_setting
+from .models import Upload
+
+
+class UploadSerializer(serializers.ModelSerializer):
+    """A chunked upload; `offset` is where the next chunk must start"""
+
+    offset = serializers.IntegerField(source='received', read_only=True)
+    max_chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Upload
+        fields = [
+            'id',
+            'filename',
+            'content_type',
+            'size',
+            'offset',
+            'max_chunk_size',
+            'status',
+            'file',
+            'error',
+            'created_at',
+        ]
+        read_only_fields = ['status', 'file', 'error', 'created_at']
+
+    def get_max_chunk_size(self, obj):
+        return get_setting('MAX_CHUNK_SIZE')
+
+    def validate_content_type(self, value):
+        if value not in get_setting('ALLOWED_TYPES'):
+            raise serializers.ValidationError(f"Unsupported image type '{value}'.")
+        return value
+
+    def validate_size(self, value):
+        if not 0 < value <= get_setting('MAX_SIZE'):
+            raise serializers.ValidationError(f"Size must be between 1 and {get_setting('MAX_SIZE')} bytes.")
+        return value
@@ -0,0 +1,60 @@
+import os
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image
+
+from jobs.registry import task
+
+from .conf import get_setting
+from .models import Upload
+from .normalize import normalize
+
+
+def discard_partial(upload):
+    try:
+        os.remove(upload.partial_path)
+    except FileNotFoundError:
+        pass
+
+
+@task('uploads.normalize')
+def normalize_upload(upload_id):
+    """Turn a fully received upload into a normalized image ready to attach to a complaint."""
+    upload = Upload.objects.filter(pk=upload_id, status='processing').first()
+    if upload is None:
+        return
+    try:
+        data = normalize(
+            upload.partial_path,
+            get_setting('MAX_DIMENSION'),
+            get_setting('JPEG_QUALITY'),
+            get_setting('PROCESSES'),
+        )
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        # Not a usable image; retrying won't help.
+        Upload.objects.filter(pk=upload.pk).update(
+            status='failed', error=f"Could not read image: {exc}", updated_at=timezone.now()
+        )
+        discard_partial(upload)
+        return
+
+    stem = os.path.splitext(os.path.basename(upload.filename))[0] or 'upload'
+    upload.file.save(f'{stem}.jpg', ContentFile(data), save=False)
+    Upload.objects.filter(pk=upload.pk).update(status='ready', file=upload.file.name, updated_at=timezone.now())
+    discard_partial(upload)
+
+
+@task('uploads.purge_expired')
+def purge_expired_uploads():
+    """Delete uploads that were never finished or never attached to a complaint."""
+    cutoff = timezone.now() - timedelta(hours=get_setting('EXPIRE_HOURS'))
+    expired = Upload.objects.filter(complaint__isnull=True, updated_at__lt=cutoff)
+    count = 0
+    for upload in expired.iterator():
+        discard_partial(upload)
+        count += 1
+    # The normalized files are left to collect_media_garbage, like any unreferenced photo.
+    expired.delete()
+    return count
@@ -0,0 +1,148 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from complaints.models import Complaint
+from jobs.worker import run_pending
+
+from .models import Upload
+from .views import UploadViewSet
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+TEST_PARTIAL_DIR = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+    shutil.rmtree(TEST_PARTIAL_DIR, ignore_errors=True)
+
+
+def make_photo(size=(300, 200), orientation=None):
+    exif = Image.Exif()
+    exif[0x010F] = 'PhoneMaker'  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    Image.new('RGB', size, (10, 120, 200)).save(buffer, 'JPEG', exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+@override_settings(
+    MEDIA_ROOT=TEST_MEDIA_ROOT,
+    UPLOADS={'PARTIAL_DIR': TEST_PARTIAL_DIR, 'PROCESSES': 0, 'MAX_DIMENSION': 100, 'MAX_SIZE': 100_000},
+)
+class ChunkedUploadTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('citizen')
+        self.client.force_authenticate(self.user)
+
+    def start(self, data, **fields):
+        response = self.client.post('/api/uploads/', {
+            'filename': 'IMG_0001.jpg', 'content_type': 'image/jpeg', 'size': len(data), **fields,
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        return f"/api/uploads/{response.data['id']}/"
+
+    def send(self, url, chunk, offset):
+        return self.client.generic(
+            'PATCH', url, chunk, content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def upload(self, data, chunk_size=1000):
+        url = self.start(data)
+        for offset in range(0, len(data), chunk_size):
+            response = self.send(url, data[offset:offset + chunk_size], offset)
+            self.assertEqual(response.status_code, 200, response.data)
+        run_pending()
+        return self.client.get(url).data
+
+    def test_resume_after_dropped_chunk(self):
+        data = make_photo(orientation=6)
+        url = self.start(data)
+        self.assertEqual(self.send(url, data[:500], 0).data['offset'], 500)
+        # The client lost the response and resends from the wrong place.
+        response = self.send(url, data[1000:1500], 1000)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 500)
+        self.assertEqual(self.client.get(url).data['offset'], 500)
+        response = self.send(url, data[500:], 500)
+        self.assertEqual(response.data['status'], 'processing')
+
+        run_pending()
+        upload = Upload.objects.get()
+        self.assertEqual(upload.status, 'ready')
+        with upload.file.open('rb') as f:
+            image = Image.open(f)
+            image.load()
+        # Rotated upright, scaled to fit 100px and stripped of EXIF.
+        self.assertEqual(image.size, (67, 100))
+        self.assertEqual(dict(image.getexif()), {})
+
+    def test_racing_duplicate_chunk_is_not_written(self):
+        data = make_photo()
+        url = self.start(data)
+        stale = Upload.objects.get()
+        self.assertEqual(self.send(url, data[:500], 0).data['offset'], 500)
+        # A second copy of the chunk that read the upload before the first one was claimed.
+        with mock.patch.object(UploadViewSet, 'get_object', return_value=stale):
+            response = self.send(url, b'x' * 500, 0)
+        self.assertEqual(response.data['offset'], 500)
+        with open(stale.partial_path, 'rb') as partial:
+            self.assertEqual(partial.read(), data[:500])
+
+    def test_limits_are_enforced(self):
+        response = self.client.post('/api/uploads/', {
+            'filename': 'big.jpg', 'content_type': 'image/jpeg', 'size': 200_000,
+        })
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/uploads/', {
+            'filename': 'doc.pdf', 'content_type': 'application/pdf', 'size': 10,
+        })
+        self.assertEqual(response.status_code, 400)
+        url = self.start(b'x' * 10)
+        self.assertEqual(self.send(url, b'x' * 11, 0).status_code, 413)
+        self.assertEqual(self.client.get(url).data['offset'], 0)
+
+    def test_unreadable_image_fails(self):
+        self.assertEqual(self.upload(b'not an image' * 10)['status'], 'failed')
+
+    def test_complaint_takes_uploads_by_id(self):
+        first = self.upload(make_photo())
+        second = self.upload(make_photo((150, 150)))
+        payload = {
+            'title': 'Pothole', 'category': 'road', 'description': 'Deep', 'location': 'Ward 5',
+            'upload_ids': [first['id'], second['id']],
+        }
+        response = self.client.post('/api/complaints/', payload)
+        self.assertEqual(response.status_code, 201, response.data)
+        complaint = Complaint.objects.get(pk=response.data['id'])
+        self.assertEqual(complaint.image.name, Upload.objects.get(pk=first['id']).file.name)
+        self.assertEqual(complaint.images.count(), 1)
+        self.assertTrue(default_storage.exists(complaint.images.get().image.name))
+
+        # An upload can only be used once.
+        response = self.client.post('/api/complaints/', payload)
+        self.assertEqual(response.status_code, 400)
+
+    def test_garbage_collection_keeps_unclaimed_uploads(self):
+        upload = Upload.objects.get(pk=self.upload(make_photo())['id'])
+        call_command('collect_media_garbage', '--grace-hours', '0', stdout=StringIO())
+        self.assertTrue(default_storage.exists(upload.file.name))
+        response = self.client.post('/api/complaints/', {
+            'title': 'Pothole', 'category': 'road', 'description': 'Deep', 'location': 'Ward 5',
+            'upload_ids': [upload.pk],
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+
+    @override_settings(UPLOADS={'PARTIAL_DIR': TEST_PARTIAL_DIR, 'PROCESSES': 1})
+    def test_normalizes_on_process_pool(self):
+        self.assertEqual(self.upload(make_photo())['status'], 'ready')
@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import mixins, status, viewsets
+from rest_framework.response import Response
+
+from .conf import get_setting
+from .models import Upload
+from .serializers import UploadSerializer
+from .tasks import discard_partial, normalize_upload
+
+READ_SIZE = 64 * 1024
+
+
+class UploadViewSet(mixins.CreateModelMixin,
+                    mixins.RetrieveModelMixin,
+                    mixins.DestroyModelMixin,
+                    viewsets.GenericViewSet):
+    """
+    Resumable image uploads.
+
+    POST   /api/uploads/       announce filename, content_type and size
+    PATCH  /api/uploads/{id}/  send the next chunk as the raw request body,
+                               with an Upload-Offset header saying where it starts
+    GET    /api/uploads/{id}/  current offset and status, to resume after a dropped connection
+
+    Once the last byte arrives the image is normalized in the background; when
+    `status` is "ready" pass the id to a complaint in `upload_ids`.
+    """
+    serializer_class = UploadSerializer
+
+    def get_queryset(self):
+        return Upload.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        upload = serializer.save(user=self.request.user)
+        os.makedirs(os.path.dirname(upload.partial_path), exist_ok=True)
+        open(upload.partial_path, 'wb').close()
+
+    def perform_destroy(self, instance):
+        discard_partial(instance)
+        instance.delete()
+
+    def partial_update(self, request, *args, **kwargs):
+        upload = self.get_object()
+        if upload.status != 'receiving':
+            return Response({'detail': 'This upload is already complete.'}, status=status.HTTP_409_CONFLICT)
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return Response(
+                {'detail': 'Upload-Offset and Content-Length headers are required.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if offset != upload.received:
+            # Tell the client where to resume from.
+            return Response({'offset': upload.received}, status=status.HTTP_409_CONFLICT)
+        if length > get_setting('MAX_CHUNK_SIZE') or offset + length > upload.size:
+            return Response(
+                {'detail': 'Chunk is larger than allowed or runs past the announced size.'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        # Spool the body and copy it into the partial file only after claiming the offset.
+        with tempfile.TemporaryFile(dir=os.path.dirname(upload.partial_path)) as chunk:
+            written = self.read_chunk(request.stream, chunk, length)
+            if written is None:
+                return Response(
+                    {'detail': 'Request body was longer than its Content-Length.'},
+                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                )
+
+            received = offset + written
+            finished = received == upload.size
+            with transaction.atomic():
+                # Conditional on the old offset, so of two racing copies of a chunk only one counts.
+                claimed = Upload.objects.filter(pk=upload.pk, status='receiving', received=offset).update(
+                    received=received,
+                    status='processing' if finished else 'receiving',
+                    updated_at=timezone.now(),
+                )
+                if claimed:
+                    self.write_chunk(upload, chunk, offset, written)
+                    if finished:
+                        normalize_upload.enqueue(upload_id=str(upload.pk))
+        upload.refresh_from_db()
+        return Response(self.get_serializer(upload).data)
+
+    def read_chunk(self, stream, chunk, length):
+        """
+        Copy the request body into the file `chunk`, a block at a time.
+        Returns the number of bytes read, or None if the body is longer than
+        `length`.
+        """
+        written = 0
+        while True:
+            block = stream.read(READ_SIZE) if stream is not None else b''
+            if not block:
+                return written
+            written += len(block)
+            if written > length:
+                return None
+            chunk.write(block)
+
+    def write_chunk(self, upload, chunk, offset, length):
+        """Copy the `length` bytes spooled in `chunk` into the partial file at `offset`."""
+        chunk.seek(0)
+        with open(upload.partial_path, 'r+b') as partial:
+            partial.seek(offset)
+            shutil.copyfileobj(chunk, partial, READ_SIZE)
+            partial.truncate(offset + length)